@@ -1,3 +1,5 @@
+from core.admin import LargeTableAdminMixin
+
 from django.conf import settings
 from django.contrib import admin, messages
 from django.contrib.admin.options import IS_POPUP_VAR
@@ -23,7 +25,7 @@ sensitive_post_parameters_m = method_decorator(sensitive_post_parameters())
 
 
 @admin.register(User)
-class UserAdmin(admin.ModelAdmin):
+class UserAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     change_user_password_template = None
     add_form_template = "admin/auth/user/add_form.html"
 
@@ -0,0 +1,76 @@
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from cachetools import TTLCache
+from core.cache import record
+
+from django.conf import settings
+
+from .models import User
+
+LineUser = namedtuple("LineUser", ["pk", "line_uid"])
+
+_users = TTLCache(maxsize=settings.LINE_USER_CACHE_SIZE, ttl=settings.LINE_USER_CACHE_TTL)
+_line_uids = {}
+_lock = threading.Lock()
+_request_users = ContextVar("request_users", default=None)
+
+
+@contextmanager
+def line_user_scope():
+    """
+    Memoize `resolve_line_user` for the duration of one webhook event.
+    """
+    token = _request_users.set({})
+    try:
+        yield
+    finally:
+        _request_users.reset(token)
+
+
+def resolve_line_user(line_uid):
+    """
+    Resolve a LINE user id to a lightweight `LineUser` record.
+
+    Records are kept for the current event and, for LINE_USER_CACHE_TTL seconds, in this process.
+    Saving or deleting a user only invalidates the cache of the process that did it, so other
+    workers may resolve a changed or deleted user to its old record until the TTL expires. Raises
+    User.DoesNotExist for unknown LINE users.
+    """
+    request_users = _request_users.get()
+    if request_users is not None and line_uid in request_users:
+        record("line_user", "hits")
+        return request_users[line_uid]
+
+    with _lock:
+        user = _users.get(line_uid)
+    record("line_user", "hits" if user is not None else "misses")
+    if user is None:
+        row = User.objects.filter(line_uid=line_uid).values_list("pk", "line_uid").first()
+        if row is None:
+            raise User.DoesNotExist(f"No user with line_uid {line_uid}")
+        user = LineUser(*row)
+        with _lock:
+            _users[line_uid] = user
+            _line_uids[user.pk] = line_uid
+
+    if request_users is not None:
+        request_users[line_uid] = user
+    return user
+
+
+def invalidate_line_user(line_uid=None, pk=None):
+    """
+    Drop the cached records of a LINE user id and of a user, which may have been cached under an
+    older LINE user id.
+    """
+    with _lock:
+        line_uids = {line_uid, _line_uids.pop(pk, None)} - {None}
+        for cached_line_uid in line_uids:
+            _users.pop(cached_line_uid, None)
+    request_users = _request_users.get()
+    if request_users is not None:
+        for cached_line_uid in line_uids:
+            request_users.pop(cached_line_uid, None)
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:37
+
+import core.models.uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0002_user_line_uid"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="user",
+            name="uuid",
+            field=models.UUIDField(
+                default=core.models.uuid.generate_uuid, editable=False, primary_key=True, serialize=False, unique=True
+            ),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:06
+
+from django.db import migrations
+
+
+def create_trigram_index(apps, schema_editor):
+    """
+    Back the admin's `icontains` search of user names with a pg_trgm GIN index, like the book
+    search indexes of bookmanager. Nothing to do on other databases.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS "user_name_trgm_idx" ON "account_user" USING gin (UPPER("name"::text) gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS "user_name_trgm_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("account", "0003_uuid_default"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
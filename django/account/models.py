@@ -67,4 +67,4 @@ class User(UuidModelMixin, AbstractBaseUser, PermissionsMixin):
 
     @property
     def borrowing_books_count(self):
-        return RentalLog.objects.filter(borrower__line_uid=self.line_uid, returned_at=None).count()
+        return RentalLog.objects.filter(borrower=self, returned_at=None).count()
@@ -1,5 +1,9 @@
 from .book import BookAdmin
+from .book_availability import BookAvailabilityAdmin
+from .daily_book_stat import DailyBookStatAdmin
+from .rental_history import RentalHistoryAdmin
 from .rental_log import RentalLogAdmin
 from .reservation import ReservationAdmin
 from .tag import TagAdmin
+from .tag_facet import TagFacetAdmin
 from .tagging import TaggingAdmin
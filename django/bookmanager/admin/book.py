@@ -7,3 +7,12 @@ from ..models import Book
 class BookAdmin(admin.ModelAdmin):
 
     list_display = ("title", "author", "description", "can_borrow", "image")
+    search_fields = ("title",)
+    ordering = ("title",)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_availability()
+
+    @admin.display(boolean=True, description="can borrow", ordering="is_borrowed")
+    def can_borrow(self, obj):
+        return not obj.is_borrowed
@@ -0,0 +1,15 @@
+from core.admin import LargeTableAdminMixin
+
+from django.contrib import admin
+
+from ..models import BookAvailability
+
+
+@admin.register(BookAvailability)
+class BookAvailabilityAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+
+    list_display = ("book", "state", "borrower", "reserver", "updated_at")
+    list_filter = ("state",)
+    list_select_related = ("book", "borrower", "reserver")
+    search_fields = ("book__title",)
+    readonly_fields = ("book", "state", "rental", "borrower", "reserver")
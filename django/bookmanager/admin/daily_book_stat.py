@@ -0,0 +1,70 @@
+import datetime
+
+from bookmanager.services import lending_stats
+
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.utils import timezone
+
+from ..models import Book, DailyBookStat
+
+# Periods the dashboard can show, in days.
+DASHBOARD_PERIODS = (7, 30, 90, 365)
+
+
+@admin.register(DailyBookStat)
+class DailyBookStatAdmin(admin.ModelAdmin):
+    """
+    Lending statistics dashboard. Everything on it is read from the daily rollups, never from the
+    rental log; run roll_up_lending_stats to bring them up to date.
+    """
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+    def changelist_view(self, request, extra_context=None):
+        if not self.has_view_or_change_permission(request):
+            raise PermissionDenied
+        try:
+            days = int(request.GET.get("days", 30))
+        except ValueError:
+            days = 30
+        if days not in DASHBOARD_PERIODS:
+            days = 30
+        until = timezone.localdate()
+        since = until - datetime.timedelta(days=days - 1)
+
+        summary = lending_stats.lending_summary(since, until)
+        # Share of the period the catalog spent lent out, counted from the returned loans.
+        book_seconds = Book.objects.count() * days * 24 * 60 * 60
+        summary["utilization"] = summary["loan_seconds"] / book_seconds if book_seconds else None
+        for name in ("average_loan_seconds", "average_queue_wait_seconds"):
+            if summary[name] is not None:
+                summary[name] = datetime.timedelta(seconds=round(summary[name]))
+        context = {
+            **self.admin_site.each_context(request),
+            **(extra_context or {}),
+            "title": "Lending statistics",
+            "opts": self.model._meta,
+            "days": days,
+            "periods": DASHBOARD_PERIODS,
+            "since": since,
+            "until": until,
+            "summary": summary,
+            "daily_loans": lending_stats.daily_loans(since, until),
+            "rankings": [
+                ("Most borrowed books", lending_stats.popular_books(since, until)),
+                ("Most borrowed tags", lending_stats.popular_tags(since, until)),
+                ("Most active borrowers", lending_stats.active_borrowers(since, until)),
+                ("Most overdue returns", lending_stats.overdue_borrowers(since, until)),
+            ],
+            "checkpoint": lending_stats.high_water_mark(),
+        }
+        return TemplateResponse(request, "admin/bookmanager/lending_dashboard.html", context)
@@ -0,0 +1,37 @@
+from core.admin import AutocompleteFilter, LargeTableAdminMixin
+
+from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
+
+from ..models import RentalHistory
+
+
+@admin.register(RentalHistory)
+class RentalHistoryAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """
+    All rentals, live and archived, read from the RentalHistory view. This is the rental list to
+    browse and report from. The view cannot be written, so live rentals link to RentalLogAdmin to
+    be edited; archived ones are final.
+    """
+
+    list_display = ("borrower", "book", "borrowed_at", "returned_at", "archived", "edit_link")
+    list_filter = (("borrower", AutocompleteFilter), ("book", AutocompleteFilter), "archived", "borrowed_at")
+    list_select_related = ("borrower", "book")
+    search_fields = ("borrower__name", "book__title")
+    ordering = ("-borrowed_at",)
+
+    @admin.display(description="Edit")
+    def edit_link(self, obj):
+        if obj.archived:
+            return "-"
+        return format_html('<a href="{}">Edit</a>', reverse("admin:bookmanager_rentallog_change", args=[obj.pk]))
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
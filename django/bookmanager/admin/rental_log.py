@@ -1,10 +1,17 @@
+from core.admin import AutocompleteFilter, LargeTableAdminMixin
+
 from django.contrib import admin
 
 from ..models import RentalLog
 
 
 @admin.register(RentalLog)
-class RentalLogAdmin(admin.ModelAdmin):
+class RentalLogAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """
+    Live rentals only: the open ones and the closed ones archive_rental_logs has not moved yet. It
+    stays on RentalLog because rentals are added and edited here, and the RentalHistory view over
+    both tiers is read-only. The full history is listed by RentalHistoryAdmin.
+    """
 
     list_display = (
         "borrower",
@@ -12,7 +19,9 @@ class RentalLogAdmin(admin.ModelAdmin):
         "borrowed_at",
         "returned_at",
     )
-    list_filter = ("borrower", "book", "returned_at")
+    list_filter = (("borrower", AutocompleteFilter), ("book", AutocompleteFilter), "returned_at")
+    list_select_related = ("borrower", "book")
+    autocomplete_fields = ("borrower", "book")
     search_fields = (
         "borrower__name",
         "book__title",
@@ -1,10 +1,16 @@
+from core.admin import AutocompleteFilter, LargeTableAdminMixin
+
 from django.contrib import admin
 
 from ..models import Reservation
 
 
 @admin.register(Reservation)
-class ReservationAdmin(admin.ModelAdmin):
+class ReservationAdmin(LargeTableAdminMixin, admin.ModelAdmin):
 
-    list_display = ("book", "user", "created_at")
-    list_filter = ("user",)
+    list_display = ("book", "position", "user", "held_until", "created_at")
+    list_filter = (("user", AutocompleteFilter), ("book", AutocompleteFilter))
+    list_select_related = ("book", "user")
+    autocomplete_fields = ("book", "user")
+    search_fields = ("book__title", "user__name")
+    ordering = ("book", "position")
@@ -1,9 +1,27 @@
 from django.contrib import admin
 
-from ..models import Tag
+from ..models import Tag, TagFacet
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
 
-    list_display = ("name",)
+    list_display = ("name", "book_count", "available_book_count")
+    list_select_related = ("facet",)
+    search_fields = ("name",)
+
+    @admin.display(description="books", ordering="facet__book_count")
+    def book_count(self, obj):
+        return self.facet_count(obj, "book_count")
+
+    @admin.display(description="available books", ordering="facet__available_book_count")
+    def available_book_count(self, obj):
+        return self.facet_count(obj, "available_book_count")
+
+    def facet_count(self, obj, name):
+        # Tags created without the post_save signal, e.g. by bulk_create, have no facet until
+        # rebuild_tag_facets runs.
+        try:
+            return getattr(obj.facet, name)
+        except TagFacet.DoesNotExist:
+            return 0
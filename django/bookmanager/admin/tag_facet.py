@@ -0,0 +1,13 @@
+from django.contrib import admin
+
+from ..models import TagFacet
+
+
+@admin.register(TagFacet)
+class TagFacetAdmin(admin.ModelAdmin):
+
+    list_display = ("tag", "book_count", "available_book_count", "updated_at")
+    list_select_related = ("tag",)
+    ordering = ("tag__name",)
+    search_fields = ("tag__name",)
+    readonly_fields = ("tag", "book_count", "available_book_count")
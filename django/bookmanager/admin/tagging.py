@@ -1,10 +1,15 @@
+from core.admin import AutocompleteFilter, LargeTableAdminMixin
+
 from django.contrib import admin
 
 from ..models import Tagging
 
 
 @admin.register(Tagging)
-class TaggingAdmin(admin.ModelAdmin):
+class TaggingAdmin(LargeTableAdminMixin, admin.ModelAdmin):
 
     list_display = ("book", "tag")
-    list_filter = ("book", "tag")
+    list_filter = (("tag", AutocompleteFilter),)
+    list_select_related = ("book", "tag")
+    autocomplete_fields = ("book", "tag")
+    search_fields = ("book__title", "tag__name")
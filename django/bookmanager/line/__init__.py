@@ -0,0 +1,5 @@
+from .carousel_cache import PrebuiltMessage, bump_generation, cached_carousel
+from .client import PooledRequestsHttpClient, create_line_bot_api, get_latency_histograms
+from .dispatcher import EventDispatcher
+from .notifications import notification_batch, notify_on_commit, send_notifications
+from .outbox import Outbox, get_counters, get_current_outbox
@@ -0,0 +1,79 @@
+import functools
+import time
+
+from core.cache import cached
+from linebot.models.base import Base
+
+from django.conf import settings
+from django.core.cache import caches
+
+GENERATION_KEY = "carousel:generation"
+
+
+class PrebuiltMessage(Base):
+    """
+    A send message whose JSON payload was serialized earlier, e.g. by `cached_carousel`.
+    LineBotApi only calls `as_json_dict` on the messages it sends.
+    """
+
+    def __init__(self, payload):
+        self.payload = payload
+
+    def as_json_dict(self):
+        return self.payload
+
+
+def get_cache():
+    return caches[settings.CAROUSEL_CACHE_ALIAS]
+
+
+def get_generation():
+    """
+    Current availability generation. A missing counter (first use or eviction) restarts from the
+    clock in microseconds, which is always ahead of any generation handed out before.
+    """
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def bump_generation():
+    """
+    Invalidate every cached carousel. Call it after the change is committed, so that a carousel
+    built under the new generation cannot have read the old rows.
+
+    The new generation is taken from the clock instead of incrementing the old one: backends such
+    as the file-based cache implement `incr` as get-then-set, and two concurrent bumps could
+    otherwise both write the same value and lose an invalidation.
+    """
+    get_cache().set(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+
+
+def cached_carousel(name):
+    """
+    Cache the JSON payload of the message returned by the decorated template function, keyed by
+    `name`, the availability generation and the call arguments (e.g. the LINE user id and cursor).
+    Cached payloads are returned as `PrebuiltMessage`s, so neither the database nor the message
+    serialization is touched on a hit.
+    """
+
+    def decorator(build):
+        @cached(
+            f"carousel:{name}",
+            timeout=settings.CAROUSEL_CACHE_TTL,
+            version=get_generation,
+            alias=settings.CAROUSEL_CACHE_ALIAS,
+        )
+        def build_payload(*args, **kwargs):
+            return build(*args, **kwargs).as_json_dict()
+
+        @functools.wraps(build)
+        def wrapper(*args, **kwargs):
+            return PrebuiltMessage(build_payload(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
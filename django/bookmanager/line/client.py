@@ -0,0 +1,211 @@
+import bisect
+import random
+import threading
+import time
+import uuid
+from email.utils import parsedate_to_datetime
+from functools import partial
+from logging import getLogger
+
+import requests
+from linebot import LineBotApi
+from linebot.http_client import HttpClient, RequestsHttpResponse
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from django.conf import settings
+from django.utils import timezone
+
+logger = getLogger(__name__)
+
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+IDEMPOTENT_METHODS = frozenset(("GET", "PUT", "DELETE"))
+# POST endpoints that deduplicate requests carrying the same X-Line-Retry-Key.
+RETRY_KEY_PATHS = (
+    "/v2/bot/message/push",
+    "/v2/bot/message/multicast",
+    "/v2/bot/message/narrowcast",
+    "/v2/bot/message/broadcast",
+)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class LatencyHistogram:
+    """
+    Cumulative latency histogram with fixed millisecond buckets.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum_ms = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, ms):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+            self.count += 1
+            self.sum_ms += ms
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "count": self.count,
+                "sum_ms": self.sum_ms,
+                "buckets": dict(zip([*map(str, self.buckets), "+Inf"], self.counts)),
+            }
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def observe_latency(endpoint, ms):
+    with _histograms_lock:
+        histogram = _histograms.setdefault(endpoint, LatencyHistogram())
+    histogram.observe(ms)
+
+
+def get_latency_histograms():
+    """
+    Per-endpoint latency histograms of the LINE API calls made by this process.
+    """
+    with _histograms_lock:
+        histograms = dict(_histograms)
+    return {endpoint: histogram.snapshot() for endpoint, histogram in histograms.items()}
+
+
+def endpoint_label(method, url):
+    # Collapse ids (user ids, message ids, ...) so that e.g. every get_profile call shares a label.
+    path = url.split("://", 1)[-1].split("?", 1)[0].split("/", 1)[-1]
+    segments = ["{id}" if len(segment) >= 20 or segment.isdigit() else segment for segment in path.split("/")]
+    return f"{method} /{'/'.join(segments)}"
+
+
+class PooledRequestsHttpClient(HttpClient):
+    """
+    `linebot.http_client.HttpClient` backed by one keep-alive `requests.Session`.
+
+    Requests answered with 429 or 5xx, or that failed to connect, are retried up to `max_retries`
+    times. The wait honors `Retry-After` and otherwise backs off exponentially with full jitter.
+
+    A POST may have been carried out even though it failed, so only those LINE can deduplicate are
+    retried after a 5xx or a dropped connection: the push, multicast, narrowcast and broadcast
+    calls, which are sent with an `X-Line-Retry-Key` kept across attempts. Any other POST (e.g.
+    a reply, whose token is spent by the first attempt) is only retried when it was rejected
+    unprocessed: a 429, or a connection that could not be opened.
+    """
+
+    def __init__(self, timeout=HttpClient.DEFAULT_TIMEOUT, pool_size=10, max_retries=2, backoff=0.5, max_backoff=8):
+        super().__init__(timeout)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, pool_block=False)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, url, headers=None, params=None, stream=False, timeout=None):
+        return self.request("GET", url, headers=headers, params=params, stream=stream, timeout=timeout)
+
+    def post(self, url, headers=None, data=None, timeout=None):
+        return self.request("POST", url, headers=headers, data=data, timeout=timeout)
+
+    def delete(self, url, headers=None, data=None, timeout=None):
+        return self.request("DELETE", url, headers=headers, data=data, timeout=timeout)
+
+    def put(self, url, headers=None, data=None, timeout=None):
+        return self.request("PUT", url, headers=headers, data=data, timeout=timeout)
+
+    def request(self, method, url, timeout=None, **kwargs):
+        label = endpoint_label(method, url)
+        retry_safe = method in IDEMPOTENT_METHODS
+        if method == "POST" and url.split("?", 1)[0].endswith(RETRY_KEY_PATHS):
+            # Not LineBotApi's retry_key argument: it sticks to every later call of the instance.
+            kwargs["headers"] = {"X-Line-Retry-Key": str(uuid.uuid4()), **(kwargs.get("headers") or {})}
+            retry_safe = True
+        attempt = 0
+        while True:
+            started = time.monotonic()
+            try:
+                response = self.session.request(method, url, timeout=timeout or self.timeout, **kwargs)
+            except requests.exceptions.ConnectionError as e:
+                # The request may have reached LINE unless the connection could not even be opened.
+                if attempt >= self.max_retries or not (retry_safe or self.not_sent(e)):
+                    raise
+                delay = self.backoff_delay(attempt)
+            else:
+                observe_latency(label, (time.monotonic() - started) * 1000)
+                if attempt and response.status_code == 409 and "X-Line-Accepted-Request-Id" in response.headers:
+                    # An earlier attempt with this retry key was carried out after all.
+                    return RequestsHttpResponse(self.accepted(response))
+                if (
+                    response.status_code not in RETRY_STATUS_CODES
+                    or attempt >= self.max_retries
+                    or not (retry_safe or response.status_code == 429)
+                ):
+                    return RequestsHttpResponse(response)
+                delay = self.retry_after(response)
+                if delay is None:
+                    delay = self.backoff_delay(attempt)
+                response.close()
+            attempt += 1
+            logger.warning("Retrying %s in %.2fs (attempt %d)", label, delay, attempt)
+            time.sleep(delay)
+
+    @staticmethod
+    def not_sent(error):
+        if isinstance(error, requests.exceptions.ConnectTimeout):
+            return True
+        reason = getattr(error.args[0], "reason", None) if error.args else None
+        return isinstance(reason, NewConnectionError)
+
+    @staticmethod
+    def accepted(response):
+        """
+        Empty 200 response standing for the earlier, accepted attempt answered by `response`.
+        """
+        result = requests.Response()
+        result.status_code = 200
+        result.headers = response.headers
+        result.url = response.url
+        result.encoding = "utf-8"
+        result._content = b"{}"
+        response.close()
+        return result
+
+    def backoff_delay(self, attempt):
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2**attempt))
+
+    def retry_after(self, response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = (parsedate_to_datetime(value) - timezone.now()).total_seconds()
+            except (TypeError, ValueError):
+                return None
+        return min(self.max_backoff, max(0.0, seconds))
+
+
+def create_line_bot_api(channel_access_token):
+    """
+    LineBotApi configured from the LINE_API_* settings.
+    """
+    return LineBotApi(
+        channel_access_token,
+        endpoint=settings.LINE_API_ENDPOINT,
+        data_endpoint=settings.LINE_API_DATA_ENDPOINT,
+        timeout=(settings.LINE_API_CONNECT_TIMEOUT, settings.LINE_API_READ_TIMEOUT),
+        http_client=partial(
+            PooledRequestsHttpClient,
+            pool_size=settings.LINE_API_POOL_SIZE,
+            max_retries=settings.LINE_API_MAX_RETRIES,
+            backoff=settings.LINE_API_RETRY_BACKOFF,
+        ),
+    )
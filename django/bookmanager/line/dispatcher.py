@@ -0,0 +1,117 @@
+import atexit
+import os
+import queue
+import threading
+import zlib
+from logging import getLogger
+
+from account.cache import line_user_scope
+from core.db import close_unusable_connections
+from linebot.models import MessageEvent
+
+from django.db import close_old_connections
+
+from .outbox import Outbox
+
+logger = getLogger(__name__)
+
+_STOP = object()
+
+
+class EventDispatcher:
+    """
+    Run the functions registered on a `linebot.WebhookHandler` for already parsed events.
+
+    `dispatch` runs a handler in the calling thread. `submit` hands events to a pool of worker
+    threads instead, each draining its own bounded queue. Events are routed to a worker by their
+    source user id, so the events of one user are always processed in the order LINE sent them.
+    When a worker queue is full, `submit` blocks until there is room.
+
+    Given a `line_bot_api`, every handler runs inside an `Outbox` so all the messages it sends are
+    batched into a single reply.
+    """
+
+    def __init__(self, handler, line_bot_api=None, workers=4, queue_size=100):
+        self.handler = handler
+        self.line_bot_api = line_bot_api
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queues = []
+        self._threads = []
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get_handler_func(self, event):
+        func = None
+        if isinstance(event, MessageEvent):
+            func = self.handler._handlers.get(f"{event.__class__.__name__}_{event.message.__class__.__name__}")
+        if func is None:
+            func = self.handler._handlers.get(event.__class__.__name__)
+        return func or self.handler._default
+
+    def dispatch(self, event, destination=None):
+        func = self.get_handler_func(event)
+        if func is None:
+            logger.info("No handler of %s and no default handler", event.__class__.__name__)
+            return
+        with line_user_scope():
+            if self.line_bot_api is None:
+                func(event)
+                return
+            with Outbox.for_event(self.line_bot_api, event).collect():
+                func(event)
+
+    def submit(self, events, destination=None):
+        self._ensure_started()
+        for event in events:
+            self._queues[self._route(event)].put((event, destination))
+
+    def shutdown(self, timeout=None):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            for worker_queue in self._queues:
+                worker_queue.put(_STOP)
+            for thread in self._threads:
+                thread.join(timeout)
+            self._queues, self._threads, self._pid = [], [], None
+
+    def _route(self, event):
+        source = getattr(event, "source", None)
+        key = getattr(source, "user_id", None) or getattr(source, "sender_id", None) or ""
+        return zlib.crc32(key.encode("utf-8")) % len(self._queues)
+
+    def _ensure_started(self):
+        # Worker threads do not survive a fork, so every (uWSGI) worker process starts its own pool.
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)]
+            self._threads = [
+                threading.Thread(target=self._work, args=(worker_queue,), name=f"line-webhook-{i}", daemon=True)
+                for i, worker_queue in enumerate(self._queues)
+            ]
+            for thread in self._threads:
+                thread.start()
+            self._pid = os.getpid()
+        atexit.register(self.shutdown, timeout=5)
+
+    def _work(self, worker_queue):
+        while True:
+            item = worker_queue.get()
+            try:
+                if item is _STOP:
+                    return
+                event, destination = item
+                close_old_connections()
+                close_unusable_connections()
+                try:
+                    self.dispatch(event, destination)
+                except Exception:
+                    logger.exception("Failed to handle %s", event.__class__.__name__)
+                finally:
+                    close_old_connections()
+            finally:
+                worker_queue.task_done()
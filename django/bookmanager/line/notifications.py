@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import getLogger
+
+from linebot.exceptions import LineBotApiError
+from linebot.models import TextSendMessage
+from requests import RequestException
+
+from django.db import transaction
+
+from .client import create_line_bot_api
+from .outbox import MAX_MESSAGES_PER_REQUEST, count, get_current_outbox
+
+logger = getLogger(__name__)
+
+# LINE accepts at most 500 recipients per multicast request.
+MAX_MULTICAST_RECIPIENTS = 500
+
+_line_bot_api = None
+_line_bot_api_lock = threading.Lock()
+
+
+def get_line_bot_api():
+    global _line_bot_api
+    with _line_bot_api_lock:
+        if _line_bot_api is None:
+            _line_bot_api = create_line_bot_api(os.getenv("LINE_CHANNEL_ACCESS_TOKEN", ""))
+        return _line_bot_api
+
+
+def send_notifications(notifications, line_bot_api=None):
+    """
+    Push `(line_uid, text)` notifications. Inside a webhook event they join the event's outbox;
+    otherwise the texts of each recipient are sent together, and recipients of the same texts are
+    batched into multicast requests. Notifications are best-effort: a failed request is logged and
+    does not affect the others.
+    """
+    outbox = get_current_outbox()
+    if outbox is not None:
+        for line_uid, text in notifications:
+            outbox.push(line_uid, TextSendMessage(text=text))
+        return
+
+    texts = defaultdict(list)
+    for line_uid, text in notifications:
+        texts[line_uid].append(text)
+    recipients = defaultdict(list)
+    for line_uid, user_texts in texts.items():
+        recipients[tuple(user_texts)].append(line_uid)
+    line_bot_api = line_bot_api or get_line_bot_api()
+    for user_texts, line_uids in recipients.items():
+        messages = [TextSendMessage(text=text) for text in user_texts]
+        while messages:
+            batch, messages = messages[:MAX_MESSAGES_PER_REQUEST], messages[MAX_MESSAGES_PER_REQUEST:]
+            rest = line_uids
+            while rest:
+                chunk, rest = rest[:MAX_MULTICAST_RECIPIENTS], rest[MAX_MULTICAST_RECIPIENTS:]
+                try:
+                    if len(chunk) == 1:
+                        line_bot_api.push_message(chunk[0], batch)
+                    else:
+                        line_bot_api.multicast(chunk, batch)
+                except (LineBotApiError, RequestException):
+                    logger.warning("Could not notify %d users", len(chunk), exc_info=True)
+                    continue
+                count("pushes")
+                count("messages", len(batch))
+
+
+class NotificationBatch(list):
+    """
+    Notifications sent together once a transaction commits.
+    """
+
+    def __call__(self):
+        send_notifications(self)
+
+
+_batch = ContextVar("notification_batch", default=None)
+
+
+@contextmanager
+def notification_batch(using=None):
+    """
+    Collect the notifications of `notify_on_commit` calls in the block into one batch, sent once
+    the transaction commits. Enter it inside the block's atomic(): a block left by an exception
+    sends nothing, as its transaction is rolled back.
+    """
+    batch = NotificationBatch()
+    token = _batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _batch.reset(token)
+    notify_on_commit(batch, using)
+
+
+def notify_on_commit(notifications, using=None):
+    """
+    Send the notifications once the current transaction commits, so that nobody is told about a
+    hold that was rolled back. Inside a `notification_batch` they join its batch.
+    """
+    if not notifications:
+        return
+    batch = _batch.get()
+    if batch is not None:
+        batch.extend(notifications)
+        return
+    transaction.on_commit(NotificationBatch(notifications), using)
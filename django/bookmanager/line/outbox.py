@@ -0,0 +1,136 @@
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from logging import getLogger
+
+from linebot.exceptions import LineBotApiError
+from requests import RequestException
+
+logger = getLogger(__name__)
+
+# LINE accepts at most five message objects per reply or push request.
+MAX_MESSAGES_PER_REQUEST = 5
+
+_current_outbox = ContextVar("current_outbox", default=None)
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def count(name, value=1):
+    with _counters_lock:
+        _counters[name] += value
+
+
+def get_counters():
+    """
+    Snapshot of the outbound request counters of this process: "replies", "pushes",
+    "reply_fallbacks" (expired reply tokens answered by push) and "messages".
+    """
+    with _counters_lock:
+        return dict(_counters)
+
+
+def get_current_outbox():
+    return _current_outbox.get()
+
+
+class Outbox:
+    """
+    Collects the messages produced while handling one webhook event and sends them together.
+
+    Messages for the event's own user go out in a single `reply_message` call. Only when the
+    reply token is missing or has expired, or there are more messages than one request can carry,
+    are they pushed instead. Messages for other users are pushed, one request per recipient.
+    Sending is best-effort: a failed request is logged and does not keep the others from going out.
+    """
+
+    def __init__(self, line_bot_api, reply_token=None, user_id=None):
+        self.line_bot_api = line_bot_api
+        self.reply_token = reply_token
+        self.user_id = user_id
+        self.replies = []
+        self.pushes = {}
+
+    @classmethod
+    def for_event(cls, line_bot_api, event):
+        source = getattr(event, "source", None)
+        return cls(
+            line_bot_api,
+            reply_token=getattr(event, "reply_token", None),
+            user_id=getattr(source, "user_id", None),
+        )
+
+    @contextmanager
+    def collect(self):
+        token = _current_outbox.set(self)
+        try:
+            yield self
+        finally:
+            _current_outbox.reset(token)
+        self.flush()
+
+    def reply(self, messages):
+        self.replies.extend(self._as_list(messages))
+
+    def push(self, to, messages):
+        if to == self.user_id:
+            self.reply(messages)
+        else:
+            self.pushes.setdefault(to, []).extend(self._as_list(messages))
+
+    def flush(self):
+        replies, self.replies = self.replies, []
+        pushes, self.pushes = self.pushes, {}
+        if replies:
+            head, rest = replies[:MAX_MESSAGES_PER_REQUEST], replies[MAX_MESSAGES_PER_REQUEST:]
+            if not self._send_reply(head):
+                rest = head + rest
+            if rest and self.user_id is None:
+                logger.warning("Dropped %d messages without a reply token or recipient", len(rest))
+            elif rest:
+                self._send_push(self.user_id, rest)
+        for to, messages in pushes.items():
+            self._send_push(to, messages)
+
+    def _send_reply(self, messages):
+        """
+        Reply `messages`, and return False when they are left to be pushed instead.
+        """
+        if self.reply_token is None:
+            return False
+        try:
+            self.line_bot_api.reply_message(self.reply_token, messages)
+        except (LineBotApiError, RequestException) as e:
+            if (
+                isinstance(e, LineBotApiError)
+                and e.status_code == 400
+                and self.user_id is not None
+                and "reply token" in e.error.message.lower()
+            ):
+                logger.warning("Reply token expired, falling back to push: %s", e.error.message)
+                count("reply_fallbacks")
+                return False
+            # The reply may have gone out all the same, so it is not pushed again.
+            logger.warning("Could not reply %d messages", len(messages), exc_info=True)
+            return True
+        finally:
+            self.reply_token = None
+        count("replies")
+        count("messages", len(messages))
+        return True
+
+    def _send_push(self, to, messages):
+        while messages:
+            chunk, messages = messages[:MAX_MESSAGES_PER_REQUEST], messages[MAX_MESSAGES_PER_REQUEST:]
+            try:
+                self.line_bot_api.push_message(to, chunk)
+            except (LineBotApiError, RequestException):
+                logger.warning("Could not push %d messages", len(chunk), exc_info=True)
+                continue
+            count("pushes")
+            count("messages", len(chunk))
+
+    @staticmethod
+    def _as_list(messages):
+        return list(messages) if isinstance(messages, (list, tuple)) else [messages]
@@ -0,0 +1,41 @@
+import time
+
+from bookmanager.models import RentalLog, RentalLogArchive
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Move rentals returned more than --days days ago from the live rental log into the archive "
+        "table, in short batches so that lending is never blocked for long. Open rentals are never moved."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.RENTAL_LOG_ARCHIVE_AFTER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rentals moved per transaction.")
+        parser.add_argument(
+            "--pause", type=float, default=0.05, help="Seconds to wait between batches, to let writers through."
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only count the rentals that would be moved.")
+
+    def handle(self, *args, **options):
+        returned_before = timezone.now() - timezone.timedelta(days=options["days"])
+        if options["dry_run"]:
+            count = RentalLog.objects.filter(returned_at__lt=returned_before).count()
+            self.stdout.write(f"{count} rentals returned before {returned_before:%Y-%m-%d %H:%M} would be archived")
+            return
+
+        started = time.perf_counter()
+        moved = 0
+        while True:
+            count = RentalLogArchive.objects.archive(returned_before, batch_size=options["batch_size"])
+            moved += count
+            if count < options["batch_size"]:
+                break
+            if options["verbosity"] > 1:
+                self.stdout.write(f"{moved} rentals archived")
+            time.sleep(options["pause"])
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} rentals in {time.perf_counter() - started:.1f}s"))
@@ -0,0 +1,121 @@
+import statistics
+import time
+import uuid
+
+from bookmanager.admin import RentalLogAdmin
+from bookmanager.models import Book, RentalLog
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+class Rollback(Exception):
+    pass
+
+
+class BaselineRentalLogAdmin(admin.ModelAdmin):
+    """
+    RentalLogAdmin as it was before it was tuned for large tables, to compare against.
+    """
+
+    list_display = ("borrower", "book", "borrowed_at", "returned_at")
+    list_filter = ("borrower", "book", "returned_at")
+    search_fields = ("borrower__name", "book__title")
+    ordering = ("-borrowed_at",)
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a large rental log and time the RentalLog admin changelist (unfiltered, deep page, "
+        "filtered by borrower, searched) against the untuned admin configuration. The rows and the superuser "
+        "are created inside a transaction that is rolled back at the end, unless --keep is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--books", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--skip-baseline", action="store_true")
+        parser.add_argument("--keep", action="store_true", help="Commit the seeded rows and the superuser.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.bench(options)
+                if not options["keep"]:
+                    raise Rollback
+        except Rollback:
+            pass
+
+    def bench(self, options):
+        prefix = f"bench-{uuid.uuid4().hex[:8]}"
+        users, books = self.seed(prefix, options)
+        superuser = get_user_model().objects.create_superuser(f"{prefix}-admin", uuid.uuid4().hex)
+        user, book = users[len(users) // 2], books[len(books) // 2]
+        scenarios = [
+            ("unfiltered", {}),
+            ("page 200", {"p": "200"}),
+            ("by borrower", {"borrower__uuid__exact": str(user.pk)}),
+            ("by book, open", {"book__uuid__exact": str(book.pk), "returned_at__isnull": "True"}),
+            ("search", {"q": user.name}),
+        ]
+        admins = [("tuned", RentalLogAdmin(RentalLog, admin.site))]
+        if not options["skip_baseline"]:
+            admins.append(("baseline", BaselineRentalLogAdmin(RentalLog, admin.site)))
+        for label, params in scenarios:
+            for name, model_admin in admins:
+                self.measure(f"{label} [{name}]", model_admin, superuser, params, options["repeat"])
+
+    def seed(self, prefix, options):
+        User = get_user_model()
+        started = time.perf_counter()
+        User.objects.bulk_create(
+            [User(name=f"{prefix}-user-{i:05d}", password="!") for i in range(options["users"])], batch_size=1000
+        )
+        Book.objects.bulk_create([Book(title=f"{prefix}-book-{i:05d}") for i in range(options["books"])])
+        users = list(User.objects.filter(name__startswith=prefix).order_by("name"))
+        books = list(Book.objects.filter(title__startswith=prefix).order_by("title"))
+
+        # Returned rentals only, so that book availability is unaffected; bulk_create sends no signals.
+        now = timezone.now()
+        batch_size = 10000
+        for start in range(0, options["rows"], batch_size):
+            RentalLog.objects.bulk_create(
+                [
+                    RentalLog(
+                        book=books[i % len(books)],
+                        borrower=users[i * 7 % len(users)],
+                        borrowed_at=now - timezone.timedelta(minutes=i + 60),
+                        returned_at=now - timezone.timedelta(minutes=i),
+                    )
+                    for i in range(start, min(start + batch_size, options["rows"]))
+                ],
+                batch_size=batch_size,
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.stdout.write(f"Seeded {options['rows']:,} rental logs in {time.perf_counter() - started:.1f}s")
+        return users, books
+
+    def measure(self, label, model_admin, superuser, params, repeat):
+        factory = RequestFactory()
+        timings = []
+        for _ in range(repeat):
+            request = factory.get("/admin/bookmanager/rentallog/", params)
+            request.user = superuser
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = model_admin.changelist_view(request)
+                response.render()
+                timings.append((time.perf_counter() - started) * 1000)
+        count = response.context_data["cl"].result_count
+        self.stdout.write(
+            f"{label}: median {statistics.median(timings):.1f} ms, max {max(timings):.1f} ms, "
+            f"{len(queries)} queries, {len(response.content) // 1024} KiB, {count:,} rows reported"
+        )
@@ -0,0 +1,65 @@
+import random
+import statistics
+import time
+
+from bookmanager.models import Book
+from bookmanager.services import search_books
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time book search over a synthetic catalog against BOOK_SEARCH_TIMEOUT_MS. The books are created "
+        "inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=100_000)
+        parser.add_argument("--queries", type=int, default=200)
+        parser.add_argument("--description-length", type=int, default=400)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                titles = self.populate(options["books"], options["description_length"])
+                self.bench(titles, options["queries"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, count, description_length):
+        started = time.perf_counter()
+        syllables = "あいうえおかきくけこさしすせそたちつてとなにぬねのアイウエオカキクケコ本書読"
+        titles = ["".join(random.choices(syllables, k=10)) for _ in range(count)]
+        Book.objects.bulk_create(
+            (
+                Book(title=title, author="著者", description="".join(random.choices(syllables, k=description_length)))
+                for title in titles
+            ),
+            batch_size=5000,
+        )
+        self.stdout.write(f"created {count} books in {time.perf_counter() - started:.1f}s")
+        return titles
+
+    def bench(self, titles, queries):
+        for length in (1, 2, 3, 4):
+            timings = []
+            for _ in range(queries):
+                title = random.choice(titles)
+                start = random.randrange(len(title) - length + 1)
+                started = time.perf_counter()
+                search_books(title[start:][:length])
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{length}-character queries: p50 {statistics.median(timings):.1f} ms, "
+                f"p95 {timings[int(len(timings) * 0.95) - 1]:.1f} ms, max {timings[-1]:.1f} ms "
+                f"(budget {settings.BOOK_SEARCH_TIMEOUT_MS} ms)"
+            )
@@ -0,0 +1,63 @@
+import time
+from unittest import mock
+
+from bookmanager.models import Book
+from bookmanager.services.thumbnails import _media_urls, invalidate_media_urls
+from bookmanager.views.carousel import CAROUSEL_BOOK_FIELDS, MAX_CAROUSEL_COLUMN_COUNT, carousel_message
+from linebot.models import PostbackAction
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Time building a full carousel message from already fetched rows, with and without the "
+        "memoized media URLs, and count the storage backend calls each build makes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rows = [
+            {"book": book}
+            for book in Book.objects.exclude(image="").values(*CAROUSEL_BOOK_FIELDS)[:MAX_CAROUSEL_COLUMN_COUNT]
+        ]
+        if len(rows) < MAX_CAROUSEL_COLUMN_COUNT:
+            rows += [
+                {
+                    "book": {
+                        "uuid": i,
+                        "title": f"book {i}",
+                        "description": "",
+                        "image": f"book_images/cover{i}.jpg",
+                        "thumbnail": "",
+                    }
+                }
+                for i in range(MAX_CAROUSEL_COLUMN_COUNT - len(rows))
+            ]
+        names = [row["book"]["thumbnail"] or row["book"]["image"] for row in rows]
+        storage = Book._meta.get_field("image").storage
+
+        def build():
+            return carousel_message(
+                "bench",
+                rows,
+                lambda x: [PostbackAction(label="借りる", data=f"action=borrow&book-id={x['book']['uuid']}")],
+                "",
+            )
+
+        for name, before_each in (("uncached", lambda: invalidate_media_urls(*names)), ("cached", lambda: None)):
+            build()
+            with mock.patch.object(storage, "url", wraps=storage.url) as url:
+                elapsed = 0.0
+                for _ in range(options["iterations"]):
+                    before_each()
+                    started = time.perf_counter()
+                    build()
+                    elapsed += time.perf_counter() - started
+            self.stdout.write(
+                f"{name}: {elapsed / options['iterations'] * 1e6:.0f} us per {len(rows)}-column carousel, "
+                f"{url.call_count / options['iterations']:.0f} storage url() calls per build"
+            )
+        self.stdout.write(f"{len(_media_urls)} cached media URLs")
@@ -0,0 +1,70 @@
+import random
+import statistics
+import time
+
+from bookmanager.models import Book
+from bookmanager.views.carousel import encode_cursor, fetch_book_page
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Time keyset-paginated carousel pages over a synthetic catalog. The books are created inside "
+        "a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--books", type=int, default=100_000)
+        parser.add_argument("--pages", type=int, default=200, help="Number of consecutive pages to walk.")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.populate(options["books"])
+                self.bench(options["pages"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def populate(self, count):
+        started = time.perf_counter()
+        syllables = "あいうえおかきくけこさしすせそたちつてとなにぬねの"
+        Book.objects.bulk_create(
+            (Book(title="".join(random.choices(syllables, k=8)), description="benchmark") for _ in range(count)),
+            batch_size=5000,
+        )
+        self.stdout.write(f"created {count} books in {time.perf_counter() - started:.1f}s")
+
+    def bench(self, pages):
+        queryset = Book.objects.with_availability().filter(is_borrowed=False)
+        timings, queries, cursor = [], 0, None
+        for _ in range(pages):
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as context:
+                _, cursor = fetch_book_page(queryset, cursor=cursor)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(context))
+            if cursor is None:
+                break
+        self.report(f"first {len(timings)} pages", timings, queries)
+
+        deep = []
+        for offset in (Book.objects.count() // 2, Book.objects.count() - 20):
+            book_uuid = Book.objects.order_by("title", "uuid").values_list("uuid", flat=True)[offset]
+            started = time.perf_counter()
+            fetch_book_page(queryset, cursor=encode_cursor(book_uuid))
+            deep.append((time.perf_counter() - started) * 1000)
+        self.report("pages at the middle and end of the catalog", deep, queries)
+
+    def report(self, name, timings, queries):
+        self.stdout.write(
+            f"{name}: mean {statistics.mean(timings):.2f} ms, max {max(timings):.2f} ms, "
+            f"at most {queries} query per page"
+        )
@@ -0,0 +1,91 @@
+import os
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from bookmanager.models import Book
+from requests.adapters import HTTPAdapter
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test carousel thumbnail GETs against a running deployment while timing a Django endpoint. "
+        "When nginx serves /media/, the endpoint's latency stays flat under image load; when "
+        "images go through uWSGI, the workers are taken by image GETs and it climbs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default=os.getenv("NGROK_DOMAIN", "http://localhost"))
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument(
+            "--probe-path", default="/tags/", help="Cheap Django-served path timed before and during the load."
+        )
+
+    def handle(self, *args, **options):
+        storage = Book._meta.get_field("image").storage
+        base_url = options["base_url"].rstrip("/")
+        image_urls = [
+            base_url + storage.url(thumbnail or image)
+            for image, thumbnail in Book.objects.exclude(image="").values_list("image", "thumbnail")[:100]
+        ]
+        if not image_urls:
+            raise CommandError("No book has an image to fetch.")
+        probe_url = base_url + options["probe_path"]
+
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=options["concurrency"] + 1)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+
+        baseline = [self.timed_get(session, probe_url)[0] for _ in range(20)]
+        self.report("probe, idle", baseline)
+
+        probes, done = [], threading.Event()
+
+        def probe():
+            while not done.is_set():
+                probes.append(self.timed_get(session, probe_url)[0])
+
+        def fetch(i):
+            return self.timed_get(session, image_urls[i % len(image_urls)])
+
+        prober = threading.Thread(target=probe)
+        prober.start()
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(options["concurrency"]) as executor:
+                results = list(executor.map(fetch, range(options["requests"])))
+        finally:
+            done.set()
+            prober.join()
+        elapsed = time.perf_counter() - started
+
+        timings = [elapsed_ms for elapsed_ms, _ in results]
+        served_by_nginx = sum("immutable" in response.headers.get("Cache-Control", "") for _, response in results)
+        errors = sum(response.status_code != 200 for _, response in results)
+        self.report("image GETs", timings)
+        self.stdout.write(
+            f"  {len(results) / elapsed:,.0f} requests/s, {errors} errors, "
+            f"{served_by_nginx}/{len(results)} with nginx's immutable Cache-Control"
+        )
+        self.report("probe, under image load", probes)
+
+    def timed_get(self, session, url):
+        started = time.perf_counter()
+        response = session.get(url)
+        response.content
+        return (time.perf_counter() - started) * 1000, response
+
+    def report(self, name, timings):
+        if not timings:
+            return
+        timings = sorted(timings)
+        self.stdout.write(
+            f"{name}: {len(timings)} requests, p50 {statistics.median(timings):.1f} ms, "
+            f"p95 {timings[int(len(timings) * 0.95) - 1]:.1f} ms, max {timings[-1]:.1f} ms"
+        )
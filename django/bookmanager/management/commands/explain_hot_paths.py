@@ -0,0 +1,116 @@
+import uuid
+
+from bookmanager.models import Book, BookAvailability, RentalLog, Reservation
+from bookmanager.services import lending_stats
+from core.db import used_indexes
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the statements of the availability, open-rental and reservation lookups and fail unless they "
+        "use the indexes the migrations declare for them."
+    )
+
+    def hot_paths(self):
+        """
+        `(name, run, indexes)` triples: the statements issued by `run` must together use each of
+        `indexes`, where a tuple stands for any one of its indexes.
+        """
+        book_id, user_id = uuid.uuid4(), uuid.uuid4()
+        return [
+            (
+                "page of books with their availability",
+                lambda: list(Book.objects.with_availability(user_id).order_by("title", "uuid")[:10]),
+                ["book_title_uuid_idx", "unique_open_rental", "rental_log_open_borrower_idx", "unique_reservation"],
+            ),
+            (
+                "availability of a book",
+                lambda: BookAvailability.objects.compute(book_id),
+                ["unique_open_rental", "unique_reservation_position"],
+            ),
+            (
+                "open rentals of a borrower",
+                lambda: list(RentalLog.objects.filter(borrower_id=user_id, returned_at__isnull=True)),
+                ["rental_log_open_borrower_idx"],
+            ),
+            (
+                "open rental of a book by a borrower",
+                lambda: RentalLog.objects.filter(
+                    book_id=book_id, borrower_id=user_id, returned_at__isnull=True
+                ).first(),
+                [("unique_open_rental", "rental_log_open_borrower_idx")],
+            ),
+            (
+                "oldest closed rentals",
+                lambda: list(RentalLog.objects.filter(returned_at__lt=timezone.now()).order_by("returned_at")[:1000]),
+                ["rental_log_returned_at_idx"],
+            ),
+            (
+                "loans and returns of a statistics window",
+                lambda: lending_stats.roll_up_window(timezone.now() - timezone.timedelta(days=1), timezone.now()),
+                [
+                    "rental_log_created_at_idx",
+                    "rental_archive_created_at_idx",
+                    "rental_log_returned_at_idx",
+                    "rental_archive_returned_at_idx",
+                ],
+            ),
+            (
+                "expired reservation holds",
+                lambda: list(Reservation.objects.filter(held_until__lt=timezone.now()).order_by("held_until")[:100]),
+                ["reservation_hold_idx"],
+            ),
+        ]
+
+    def declared_indexes(self):
+        """
+        Names of the indexes and constraints declared by the applied migrations.
+        """
+        state = MigrationLoader(connection).project_state()
+        return {
+            index.name
+            for model_state in state.models.values()
+            for index in model_state.options.get("indexes", []) + model_state.options.get("constraints", [])
+        }
+
+    def handle(self, *args, **options):
+        declared = self.declared_indexes()
+        failures = []
+        with transaction.atomic():
+            if connection.vendor == "postgresql":
+                # Judge whether an index is usable at all, not what the planner prefers for tiny tables.
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+            for name, run, indexes in self.hot_paths():
+                # The query log keeps the last 9000 queries only, past which nothing more is captured.
+                reset_queries()
+                with CaptureQueriesContext(connection) as queries:
+                    run()
+                used = set()
+                for query in queries:
+                    used |= used_indexes(query["sql"])
+                missing = []
+                for index in indexes:
+                    alternatives = index if isinstance(index, tuple) else (index,)
+                    unknown = [alternative for alternative in alternatives if alternative not in declared]
+                    if unknown:
+                        raise CommandError(f"{name}: no migration declares {', '.join(unknown)}")
+                    if not used.intersection(alternatives):
+                        missing.append(" or ".join(alternatives))
+                if missing:
+                    failures.append(name)
+                self.stdout.write(f"{'NG' if missing else 'OK'} {name}")
+                if options["verbosity"] > 1 or missing:
+                    self.stdout.write(f"  uses {', '.join(sorted(used)) or 'no index'}")
+                    for index in missing:
+                        self.stdout.write(f"  missing {index}")
+            # Leave no trace of the paths that write, such as the rollup of a statistics window.
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(f"Not using the expected index: {', '.join(failures)}")
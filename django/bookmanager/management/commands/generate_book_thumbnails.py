@@ -0,0 +1,58 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bookmanager.line import bump_generation
+from bookmanager.models import Book
+from bookmanager.services.thumbnails import store_thumbnails
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Generate the carousel thumbnails of book images in parallel worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument(
+            "--force", action="store_true", help="Regenerate thumbnails of books that already have one."
+        )
+
+    def handle(self, *args, **options):
+        books = Book.objects.exclude(image="")
+        if not options["force"]:
+            books = books.filter(thumbnail="")
+        pending = list(books.values_list("uuid", "image"))
+        self.stdout.write(f"{len(pending)} book images to process with {options['workers']} workers")
+
+        # Workers are forked and only touch the storage; they must not share the parent's
+        # database connections.
+        connections.close_all()
+        started, generated, failed = time.perf_counter(), 0, 0
+        with ProcessPoolExecutor(options["workers"], mp_context=multiprocessing.get_context("fork")) as executor:
+            for offset in range(0, len(pending), options["batch_size"]):
+                batch = pending[offset:][: options["batch_size"]]
+                thumbnails = executor.map(store_thumbnails, [image for _, image in batch], chunksize=8)
+                # bulk_update skips auto_now, so updated_at is set here for the exports to see the change.
+                now = timezone.now()
+                updated = [
+                    Book(uuid=book_uuid, thumbnail=thumbnail, updated_at=now)
+                    for (book_uuid, _), thumbnail in zip(batch, thumbnails)
+                    if thumbnail
+                ]
+                Book.objects.bulk_update(updated, ["thumbnail", "updated_at"])
+                generated += len(updated)
+                failed += len(batch) - len(updated)
+                self.stdout.write(f"  {offset + len(batch)}/{len(pending)}")
+
+        if generated:
+            # Cached carousels still point at the full-size images.
+            bump_generation()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            self.style.SUCCESS(f"Generated {generated} thumbnails in {elapsed:.1f}s, {failed} images failed")
+        )
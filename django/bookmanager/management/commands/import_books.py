@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from bookmanager.line import bump_generation
+from bookmanager.models import Book
+from bookmanager.services.catalog_import import (
+    InvalidRecord,
+    attach_cover,
+    clean_record,
+    drop_existing,
+    import_book_batch,
+    read_book_records,
+)
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Import books with their tags from a CSV (title,author,description,tags,image; tags separated by "
+        "'|') or JSON lines file. Rows are inserted in batches; cover images given as local file paths are "
+        "then stored and thumbnailed in parallel worker processes. Every row creates a new book, unless "
+        "--skip-existing is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--batch-size", type=int, default=10000, help="Books inserted per transaction.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument(
+            "--base-dir", help="Directory that relative image paths are resolved against; defaults to the file's."
+        )
+        parser.add_argument(
+            "--skip-existing",
+            action="store_true",
+            help="Skip rows with the title and author of a book in the catalog or earlier in the file, so that "
+            "an interrupted import can be run again.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Validate the rows without importing them.")
+
+    def handle(self, *args, **options):
+        if not os.path.exists(options["path"]):
+            raise CommandError(f"No such file: {options['path']}")
+        base_dir = options["base_dir"] or os.path.dirname(os.path.abspath(options["path"]))
+
+        started = time.perf_counter()
+        batch, covers, seen = [], [], set()
+        self.imported = self.existing = invalid = 0
+        for line_number, record in read_book_records(options["path"]):
+            try:
+                fields, tag_names, image = clean_record(record)
+            except InvalidRecord as e:
+                invalid += 1
+                self.stderr.write(f"Line {line_number}: {e}")
+                continue
+            if options["skip_existing"]:
+                key = (fields["title"], fields["author"])
+                if key in seen:
+                    self.existing += 1
+                    continue
+                seen.add(key)
+            batch.append((fields, tag_names, os.path.join(base_dir, image) if image else ""))
+            if len(batch) >= options["batch_size"]:
+                covers += self.import_batch(batch, options)
+                batch = []
+                if options["verbosity"] > 1:
+                    self.stdout.write(f"  {self.imported} books")
+        if batch:
+            covers += self.import_batch(batch, options)
+        self.stdout.write(
+            f"{'Would import' if options['dry_run'] else 'Imported'} {self.imported} books in "
+            f"{time.perf_counter() - started:.1f}s, skipped {invalid} invalid rows and {self.existing} existing books"
+        )
+        if covers:
+            self.attach_covers(covers, options)
+
+    def import_batch(self, batch, options):
+        if options["skip_existing"]:
+            records = drop_existing(batch)
+            self.existing += len(batch) - len(records)
+            batch = records
+        self.imported += len(batch)
+        if options["dry_run"]:
+            return []
+        return import_book_batch(batch)
+
+    def attach_covers(self, covers, options):
+        # Workers are forked and only touch the storage; they must not share the parent's
+        # database connections.
+        connections.close_all()
+        started, attached, count = time.perf_counter(), [], 0
+        now = timezone.now()
+        with ProcessPoolExecutor(options["workers"], mp_context=multiprocessing.get_context("fork")) as executor:
+            results = executor.map(attach_cover, [path for _, path in covers], chunksize=8)
+            for (book_uuid, path), result in zip(covers, results):
+                if result is None:
+                    self.stderr.write(f"Could not read cover image {path}")
+                    continue
+                image, thumbnail = result
+                # bulk_update skips auto_now, so updated_at is set here for the exports to see the cover.
+                attached.append(Book(uuid=book_uuid, image=image, thumbnail=thumbnail, updated_at=now))
+                count += 1
+                if len(attached) >= options["batch_size"]:
+                    Book.objects.bulk_update(attached, ["image", "thumbnail", "updated_at"])
+                    attached = []
+        Book.objects.bulk_update(attached, ["image", "thumbnail", "updated_at"])
+        bump_generation()
+        self.stdout.write(f"Attached {count} cover images in {time.perf_counter() - started:.1f}s")
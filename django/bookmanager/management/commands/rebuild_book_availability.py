@@ -0,0 +1,72 @@
+from bookmanager.models import Book, BookAvailability, RentalLog, Reservation
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-book availability records from the full rental and reservation history."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted records and exit with an error instead of repairing them.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expected = self.expected_fields()
+        current = {
+            availability.book_id: availability
+            for availability in BookAvailability.objects.only(
+                "uuid", "book_id", "state", "rental_id", "borrower_id", "reserver_id"
+            ).iterator(chunk_size=options["batch_size"])
+        }
+
+        missing, drifted = [], []
+        for book_id in Book.objects.values_list("uuid", flat=True).iterator(chunk_size=options["batch_size"]):
+            fields = expected.get(book_id, BookAvailability.build_fields(None, None, None))
+            availability = current.get(book_id)
+            if availability is None:
+                missing.append(BookAvailability(book_id=book_id, **fields))
+            elif any(getattr(availability, name) != value for name, value in fields.items()):
+                for name, value in fields.items():
+                    setattr(availability, name, value)
+                drifted.append(availability)
+
+        self.stdout.write(f"{len(missing)} missing, {len(drifted)} drifted availability records")
+        if options["check"]:
+            if missing or drifted:
+                raise CommandError("Book availability records are out of sync with the rental history.")
+            return
+
+        with transaction.atomic():
+            BookAvailability.objects.bulk_create(missing, batch_size=options["batch_size"])
+            BookAvailability.objects.bulk_update(
+                drifted, ["state", "rental", "borrower", "reserver"], batch_size=options["batch_size"]
+            )
+        self.stdout.write(self.style.SUCCESS("Book availability records rebuilt"))
+
+    def expected_fields(self):
+        rentals = {}
+        for rental in (
+            RentalLog.objects.filter(returned_at__isnull=True)
+            .order_by("borrowed_at")
+            .values("uuid", "book_id", "borrower_id")
+            .iterator()
+        ):
+            rentals[rental["book_id"]] = rental
+        reservers = {}
+        for reservation in Reservation.objects.order_by("-position").values("book_id", "user_id").iterator():
+            reservers[reservation["book_id"]] = reservation["user_id"]
+
+        expected = {}
+        for book_id in rentals.keys() | reservers.keys():
+            rental = rentals.get(book_id)
+            expected[book_id] = BookAvailability.build_fields(
+                rental_id=rental["uuid"] if rental else None,
+                borrower_id=rental["borrower_id"] if rental else None,
+                reserver_id=reservers.get(book_id),
+            )
+        return expected
@@ -0,0 +1,48 @@
+from bookmanager.models import Tag, TagFacet
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount the per-tag facet records from Tagging and BookAvailability. Run it after "
+        "rebuild_book_availability, which repairs availability without touching the facets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted records and exit with an error instead of repairing them.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        expected = TagFacet.objects.compute()
+        current = {facet.tag_id: facet for facet in TagFacet.objects.iterator(chunk_size=options["batch_size"])}
+
+        missing, drifted = [], []
+        for tag_id in Tag.objects.values_list("uuid", flat=True).iterator(chunk_size=options["batch_size"]):
+            book_count, available_book_count = expected.get(tag_id, (0, 0))
+            facet = current.get(tag_id)
+            if facet is None:
+                missing.append(
+                    TagFacet(tag_id=tag_id, book_count=book_count, available_book_count=available_book_count)
+                )
+            elif (facet.book_count, facet.available_book_count) != (book_count, available_book_count):
+                facet.book_count, facet.available_book_count = book_count, available_book_count
+                drifted.append(facet)
+
+        self.stdout.write(f"{len(missing)} missing, {len(drifted)} drifted tag facets")
+        if options["check"]:
+            if missing or drifted:
+                raise CommandError("Tag facets are out of sync with the taggings.")
+            return
+
+        with transaction.atomic():
+            TagFacet.objects.bulk_create(missing, batch_size=options["batch_size"])
+            TagFacet.objects.bulk_update(
+                drifted, ["book_count", "available_book_count"], batch_size=options["batch_size"]
+            )
+        self.stdout.write(self.style.SUCCESS("Tag facets rebuilt"))
@@ -0,0 +1,45 @@
+import datetime
+import time
+
+from bookmanager.services import lending_stats
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Add the rentals borrowed or returned since the last run to the daily lending statistics. "
+        "Run it periodically, e.g. every few minutes from cron, or keep it running with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--window-hours",
+            type=int,
+            default=24,
+            help="Hours of loans and returns, by rental creation and return time, rolled up per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Roll up again after this many seconds, until interrupted. Rolls up once when 0.",
+        )
+        parser.add_argument(
+            "--rebuild", action="store_true", help="Delete the statistics first and roll up all rentals again."
+        )
+
+    def handle(self, *args, **options):
+        if options["rebuild"]:
+            lending_stats.reset_rollups()
+        window = datetime.timedelta(hours=options["window_hours"])
+        while True:
+            started = time.perf_counter()
+            mark, count = lending_stats.roll_up(window=window)
+            if options["verbosity"] > 0 and (count or not options["interval"]):
+                mark = f"{timezone.localtime(mark):%Y-%m-%d %H:%M:%S}" if mark else "-"
+                self.stdout.write(f"Rolled up {count} rentals up to {mark} in {time.perf_counter() - started:.1f}s")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
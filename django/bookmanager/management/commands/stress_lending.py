@@ -0,0 +1,110 @@
+import threading
+import time
+import uuid
+from collections import Counter
+
+from account.models import User
+from bookmanager.models import Book, RentalLog
+from bookmanager.services import lending
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Race concurrent borrows of the same book from many threads and check that exactly one wins, "
+        "then measure the throughput of contended borrow/return cycles. Creates scratch users and "
+        "books and deletes them afterwards; run it against a development database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=16)
+        parser.add_argument("--rounds", type=int, default=20)
+        parser.add_argument("--books", type=int, default=2, help="Books shared by the throughput phase.")
+        parser.add_argument("--seconds", type=float, default=5)
+
+    def handle(self, *args, **options):
+        prefix = f"stress-{uuid.uuid4().hex[:8]}"
+        users = [User.objects.create(name=f"{prefix}-{i}") for i in range(options["threads"])]
+        try:
+            self.race(users, prefix, options["rounds"])
+            self.throughput(users, prefix, options["books"], options["seconds"])
+        finally:
+            Book.objects.filter(title__startswith=prefix).delete()
+            User.objects.filter(name__startswith=prefix).delete()
+
+    def run_threads(self, users, target):
+        barrier = threading.Barrier(len(users))
+
+        def run(user):
+            try:
+                barrier.wait()
+                target(user)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=run, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    def race(self, users, prefix, rounds):
+        for round_number in range(rounds):
+            book = Book.objects.create(title=f"{prefix}-race-{round_number}")
+            outcomes = Counter()
+            lock = threading.Lock()
+
+            def attempt(user):
+                try:
+                    lending.borrow(user.pk, book.pk)
+                    outcome = "won"
+                except lending.LendingError as e:
+                    outcome = type(e).__name__
+                except Exception as e:
+                    outcome = f"error: {type(e).__name__}: {e}"
+                with lock:
+                    outcomes[outcome] += 1
+
+            self.run_threads(users, attempt)
+            open_rentals = RentalLog.objects.filter(book=book, returned_at__isnull=True).count()
+            if outcomes["won"] != 1 or open_rentals != 1:
+                raise CommandError(f"round {round_number}: {dict(outcomes)}, {open_rentals} open rentals")
+        self.stdout.write(
+            self.style.SUCCESS(f"{rounds} rounds of {len(users)} concurrent borrows: exactly one winner each")
+        )
+
+    def throughput(self, users, prefix, book_count, seconds):
+        books = [Book.objects.create(title=f"{prefix}-shared-{i}") for i in range(book_count)]
+        counts, lock = Counter(), threading.Lock()
+        deadline = time.monotonic() + seconds
+
+        def cycle(user):
+            local = Counter()
+            i = 0
+            while time.monotonic() < deadline:
+                book = books[i % len(books)]
+                i += 1
+                try:
+                    rental, _ = lending.borrow(user.pk, book.pk)
+                    local["borrows"] += 1
+                    lending.return_book(user.pk, rental.pk)
+                    local["returns"] += 1
+                except lending.LendingError:
+                    local["refused"] += 1
+                except Exception:
+                    local["errors"] += 1
+            with lock:
+                counts.update(local)
+
+        started = time.perf_counter()
+        self.run_threads(users, cycle)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"{len(users)} threads on {book_count} books for {elapsed:.1f}s: "
+            f"{counts['borrows'] / elapsed:,.1f} borrows/s, {counts['refused'] / elapsed:,.1f} refusals/s, "
+            f"{counts['errors']} errors"
+        )
+        if RentalLog.objects.filter(book__in=books, returned_at__isnull=True).count():
+            raise CommandError("Rentals were left open")
@@ -0,0 +1,44 @@
+import time
+
+from bookmanager.services import lending
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = (
+        "Release expired reservation holds and hand each book to the next user in its queue, and notify the "
+        "holders of holds that were set without a notice. "
+        "Run it periodically, e.g. every few minutes from cron, or keep it running with --interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Holds released or notified per transaction.")
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Sweep again after this many seconds, until interrupted. Sweeps once when 0.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            notified = self.sweep(lending.notify_holds, options["batch_size"])
+            released = self.sweep(lending.expire_holds, options["batch_size"])
+            if options["verbosity"] > 0 and (notified or not options["interval"]):
+                self.stdout.write(f"Notified {notified} reservation holds")
+            if options["verbosity"] > 0 and (released or not options["interval"]):
+                self.stdout.write(f"Released {released} expired reservation holds")
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
+
+    def sweep(self, step, batch_size):
+        now = timezone.now()
+        total = 0
+        while True:
+            count = step(now=now, batch_size=batch_size)
+            total += count
+            if count < batch_size:
+                return total
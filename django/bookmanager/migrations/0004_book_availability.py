@@ -0,0 +1,123 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:31
+
+import uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_book_availability(apps, schema_editor):
+    Book = apps.get_model("bookmanager", "Book")
+    BookAvailability = apps.get_model("bookmanager", "BookAvailability")
+    RentalLog = apps.get_model("bookmanager", "RentalLog")
+    Reservation = apps.get_model("bookmanager", "Reservation")
+
+    rentals = {
+        rental["book_id"]: rental
+        for rental in RentalLog.objects.filter(returned_at__isnull=True)
+        .order_by("borrowed_at")
+        .values("uuid", "book_id", "borrower_id")
+    }
+    reservers = {
+        reservation["book_id"]: reservation["user_id"]
+        for reservation in Reservation.objects.order_by("-created_at").values("book_id", "user_id")
+    }
+
+    availabilities = []
+    for book_id in Book.objects.values_list("uuid", flat=True):
+        rental = rentals.get(book_id)
+        reserver_id = reservers.get(book_id)
+        if rental is not None:
+            state = "borrowed_and_reserved" if reserver_id is not None else "borrowed"
+        else:
+            state = "reserved" if reserver_id is not None else "available"
+        availabilities.append(
+            BookAvailability(
+                book_id=book_id,
+                state=state,
+                rental_id=rental["uuid"] if rental else None,
+                borrower_id=rental["borrower_id"] if rental else None,
+                reserver_id=reserver_id,
+            )
+        )
+    BookAvailability.objects.bulk_create(availabilities, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("bookmanager", "0003_auto_20211101_1145"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BookAvailability",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="created_at")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="updated_at")),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=uuid.uuid4, editable=False, primary_key=True, serialize=False, unique=True
+                    ),
+                ),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("available", "Available"),
+                            ("borrowed", "Borrowed"),
+                            ("reserved", "Reserved"),
+                            ("borrowed_and_reserved", "Borrowed and reserved"),
+                        ],
+                        db_index=True,
+                        default="available",
+                        max_length=30,
+                    ),
+                ),
+                (
+                    "book",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="availability", to="bookmanager.book"
+                    ),
+                ),
+                (
+                    "borrower",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="borrowing_availabilities",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "rental",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to="bookmanager.rentallog",
+                    ),
+                ),
+                (
+                    "reserver",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="reserving_availabilities",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Book Availability",
+                "verbose_name_plural": "Book Availabilities",
+            },
+        ),
+        migrations.RunPython(populate_book_availability, migrations.RunPython.noop),
+    ]
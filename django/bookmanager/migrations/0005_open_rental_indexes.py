@@ -0,0 +1,52 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:36
+
+from django.db import migrations, models
+
+
+def close_duplicate_open_rentals(apps, schema_editor):
+    """
+    Close all but the latest open rental of each book so that unique_open_rental can be created.
+    Each older rental is closed at the time the next one started.
+    """
+    RentalLog = apps.get_model("bookmanager", "RentalLog")
+    duplicated_book_ids = (
+        RentalLog.objects.filter(returned_at__isnull=True)
+        .values("book_id")
+        .annotate(open_count=models.Count("uuid"))
+        .filter(open_count__gt=1)
+        .values_list("book_id", flat=True)
+    )
+    for book_id in list(duplicated_book_ids):
+        rentals = list(RentalLog.objects.filter(book_id=book_id, returned_at__isnull=True).order_by("borrowed_at"))
+        for rental, next_rental in zip(rentals, rentals[1:]):
+            rental.returned_at = next_rental.borrowed_at
+            rental.save(update_fields=["returned_at"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0004_book_availability"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rentallog",
+            index=models.Index(
+                condition=models.Q(("returned_at__isnull", True)),
+                fields=["borrower", "book"],
+                name="rental_log_open_borrower_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(fields=["book", "created_at"], name="reservation_book_created_idx"),
+        ),
+        migrations.RunPython(close_duplicate_open_rentals, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="rentallog",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("returned_at__isnull", True)), fields=("book",), name="unique_open_rental"
+            ),
+        ),
+    ]
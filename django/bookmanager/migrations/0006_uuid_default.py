@@ -0,0 +1,57 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:37
+
+import core.models.uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0005_open_rental_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="book",
+            name="uuid",
+            field=models.UUIDField(
+                default=core.models.uuid.generate_uuid, editable=False, primary_key=True, serialize=False, unique=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="bookavailability",
+            name="uuid",
+            field=models.UUIDField(
+                default=core.models.uuid.generate_uuid, editable=False, primary_key=True, serialize=False, unique=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="rentallog",
+            name="uuid",
+            field=models.UUIDField(
+                default=core.models.uuid.generate_uuid, editable=False, primary_key=True, serialize=False, unique=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="reservation",
+            name="uuid",
+            field=models.UUIDField(
+                default=core.models.uuid.generate_uuid, editable=False, primary_key=True, serialize=False, unique=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tag",
+            name="uuid",
+            field=models.UUIDField(
+                default=core.models.uuid.generate_uuid, editable=False, primary_key=True, serialize=False, unique=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="tagging",
+            name="uuid",
+            field=models.UUIDField(
+                default=core.models.uuid.generate_uuid, editable=False, primary_key=True, serialize=False, unique=True
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0006_uuid_default"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="book",
+            index=models.Index(fields=["title", "uuid"], name="book_title_uuid_idx"),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:02
+
+from django.db import migrations
+
+SEARCH_FIELDS = ("title", "author", "description")
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """
+    Back the `icontains` lookups of book search with pg_trgm GIN indexes. Django compiles
+    `icontains` to UPPER("column"::text) LIKE UPPER(...) on PostgreSQL, so the expression is indexed.
+    SQLite uses the FTS5 trigram index of 0016 instead.
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "book_{field}_trgm_idx" ON "bookmanager_book" '
+            f'USING gin (UPPER("{field}"::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for field in SEARCH_FIELDS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "book_{field}_trgm_idx"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0007_book_title_uuid_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:48
+
+import core.models.uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_tag_facets(apps, schema_editor):
+    Tag = apps.get_model("bookmanager", "Tag")
+    TagFacet = apps.get_model("bookmanager", "TagFacet")
+    Tagging = apps.get_model("bookmanager", "Tagging")
+
+    counts = {
+        row["tag_id"]: row
+        for row in Tagging.objects.values("tag_id").annotate(
+            book_count=models.Count("book_id"),
+            available_book_count=models.Count(
+                "book_id", filter=~models.Q(book__availability__state__in=["borrowed", "borrowed_and_reserved"])
+            ),
+        )
+    }
+    TagFacet.objects.bulk_create(
+        [
+            TagFacet(
+                tag_id=tag_id,
+                book_count=counts[tag_id]["book_count"] if tag_id in counts else 0,
+                available_book_count=counts[tag_id]["available_book_count"] if tag_id in counts else 0,
+            )
+            for tag_id in Tag.objects.values_list("uuid", flat=True)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0008_book_search_trgm_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TagFacet",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="created_at")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="updated_at")),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=core.models.uuid.generate_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("book_count", models.PositiveIntegerField(default=0)),
+                ("available_book_count", models.PositiveIntegerField(default=0)),
+                (
+                    "tag",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="facet", to="bookmanager.tag"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Tag Facet",
+                "verbose_name_plural": "Tag Facets",
+            },
+        ),
+        migrations.RunPython(populate_tag_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2.7 on 2026-10-18 16:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0009_tag_facet"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="book",
+            name="thumbnail",
+            field=models.ImageField(blank=True, editable=False, upload_to="book_thumbnails"),
+        ),
+    ]
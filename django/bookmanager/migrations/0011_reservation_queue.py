@@ -0,0 +1,51 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:02
+
+from django.db import migrations, models
+
+
+def assign_positions(apps, schema_editor):
+    Reservation = apps.get_model("bookmanager", "Reservation")
+
+    reservations = []
+    positions = {}
+    for reservation in Reservation.objects.order_by("book_id", "created_at").only("uuid", "book_id"):
+        positions[reservation.book_id] = positions.get(reservation.book_id, 0) + 1
+        reservation.position = positions[reservation.book_id]
+        reservations.append(reservation)
+    Reservation.objects.bulk_update(reservations, ["position"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0010_book_thumbnail"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="position",
+            field=models.PositiveIntegerField(blank=True, default=0),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="reservation",
+            name="held_until",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(assign_positions, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name="reservation",
+            name="reservation_book_created_idx",
+        ),
+        migrations.AddIndex(
+            model_name="reservation",
+            index=models.Index(
+                condition=models.Q(held_until__isnull=False), fields=["held_until"], name="reservation_hold_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="reservation",
+            constraint=models.UniqueConstraint(fields=("book", "position"), name="unique_reservation_position"),
+        ),
+    ]
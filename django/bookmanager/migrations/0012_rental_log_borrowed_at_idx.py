@@ -0,0 +1,17 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0011_reservation_queue"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rentallog",
+            index=models.Index(fields=["-borrowed_at", "-uuid"], name="rental_log_borrowed_at_idx"),
+        ),
+    ]
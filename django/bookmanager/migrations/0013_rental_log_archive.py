@@ -0,0 +1,84 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+HISTORY_COLUMNS = "uuid, book_id, borrower_id, borrowed_at, returned_at, created_at, updated_at"
+
+CREATE_HISTORY_VIEW = f"""
+CREATE VIEW bookmanager_rentalhistory AS
+SELECT {HISTORY_COLUMNS}, FALSE AS archived FROM bookmanager_rentallog
+UNION ALL
+SELECT {HISTORY_COLUMNS}, TRUE AS archived FROM bookmanager_rentallogarchive
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("bookmanager", "0012_rental_log_borrowed_at_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RentalHistory",
+            fields=[
+                ("uuid", models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ("borrowed_at", models.DateTimeField()),
+                ("returned_at", models.DateTimeField(blank=True, null=True)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("archived", models.BooleanField()),
+            ],
+            options={
+                "verbose_name": "Rental History",
+                "verbose_name_plural": "Rental History",
+                "db_table": "bookmanager_rentalhistory",
+                "managed": False,
+            },
+        ),
+        migrations.CreateModel(
+            name="RentalLogArchive",
+            fields=[
+                ("uuid", models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ("borrowed_at", models.DateTimeField()),
+                ("returned_at", models.DateTimeField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name": "Rental Log Archive",
+                "verbose_name_plural": "Rental Log Archives",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="rentallog",
+            index=models.Index(
+                condition=models.Q(("returned_at__isnull", False)),
+                fields=["returned_at"],
+                name="rental_log_returned_at_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="rentallogarchive",
+            name="book",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name="+", to="bookmanager.book"
+            ),
+        ),
+        migrations.AddField(
+            model_name="rentallogarchive",
+            name="borrower",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="rentallogarchive",
+            index=models.Index(fields=["-borrowed_at", "-uuid"], name="rental_archive_borrowed_at_idx"),
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEW, "DROP VIEW bookmanager_rentalhistory"),
+    ]
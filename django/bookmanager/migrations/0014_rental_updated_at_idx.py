@@ -0,0 +1,21 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0013_rental_log_archive"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rentallog",
+            index=models.Index(fields=["updated_at", "uuid"], name="rental_log_updated_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="rentallogarchive",
+            index=models.Index(fields=["updated_at", "uuid"], name="rental_archive_updated_at_idx"),
+        ),
+    ]
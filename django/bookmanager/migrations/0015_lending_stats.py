@@ -0,0 +1,172 @@
+# Generated by Django 3.2.7 on 2026-10-18 17:39
+
+import core.models.uuid
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+OLD_HISTORY_COLUMNS = "uuid, book_id, borrower_id, borrowed_at, returned_at, created_at, updated_at"
+HISTORY_COLUMNS = "uuid, book_id, borrower_id, borrowed_at, returned_at, reserved_at, created_at, updated_at"
+
+CREATE_HISTORY_VIEW = """
+CREATE VIEW bookmanager_rentalhistory AS
+SELECT {columns}, FALSE AS archived FROM bookmanager_rentallog
+UNION ALL
+SELECT {columns}, TRUE AS archived FROM bookmanager_rentallogarchive
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("bookmanager", "0014_rental_updated_at_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RollupCheckpoint",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="created_at")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="updated_at")),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=core.models.uuid.generate_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("name", models.CharField(max_length=50, unique=True)),
+                ("high_water_mark", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name": "Rollup Checkpoint",
+                "verbose_name_plural": "Rollup Checkpoints",
+            },
+        ),
+        # SQLite rebuilds a table to add a column, which fails while a view refers to it.
+        migrations.RunSQL(
+            "DROP VIEW bookmanager_rentalhistory", CREATE_HISTORY_VIEW.format(columns=OLD_HISTORY_COLUMNS)
+        ),
+        migrations.AddField(
+            model_name="rentallog",
+            name="reserved_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="rentallogarchive",
+            name="reserved_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEW.format(columns=HISTORY_COLUMNS), "DROP VIEW bookmanager_rentalhistory"),
+        migrations.CreateModel(
+            name="DailyUserStat",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="created_at")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="updated_at")),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=core.models.uuid.generate_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("loans", models.PositiveIntegerField(default=0)),
+                ("returns", models.PositiveIntegerField(default=0)),
+                ("overdue_returns", models.PositiveIntegerField(default=0)),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily User Stat",
+                "verbose_name_plural": "Daily User Stats",
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyTagStat",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="created_at")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="updated_at")),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=core.models.uuid.generate_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("loans", models.PositiveIntegerField(default=0)),
+                (
+                    "tag",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to="bookmanager.tag"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Tag Stat",
+                "verbose_name_plural": "Daily Tag Stats",
+            },
+        ),
+        migrations.CreateModel(
+            name="DailyBookStat",
+            fields=[
+                ("created_at", models.DateTimeField(auto_now_add=True, verbose_name="created_at")),
+                ("updated_at", models.DateTimeField(auto_now=True, verbose_name="updated_at")),
+                (
+                    "uuid",
+                    models.UUIDField(
+                        default=core.models.uuid.generate_uuid,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                        unique=True,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("loans", models.PositiveIntegerField(default=0)),
+                ("returns", models.PositiveIntegerField(default=0)),
+                ("loan_seconds", models.PositiveBigIntegerField(default=0)),
+                ("overdue_returns", models.PositiveIntegerField(default=0)),
+                ("reserved_loans", models.PositiveIntegerField(default=0)),
+                ("queue_wait_seconds", models.PositiveBigIntegerField(default=0)),
+                (
+                    "book",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, related_name="+", to="bookmanager.book"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Daily Book Stat",
+                "verbose_name_plural": "Daily Book Stats",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="dailyuserstat",
+            constraint=models.UniqueConstraint(fields=("date", "user"), name="unique_daily_user_stat"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailytagstat",
+            constraint=models.UniqueConstraint(fields=("date", "tag"), name="unique_daily_tag_stat"),
+        ),
+        migrations.AddConstraint(
+            model_name="dailybookstat",
+            constraint=models.UniqueConstraint(fields=("date", "book"), name="unique_daily_book_stat"),
+        ),
+    ]
@@ -0,0 +1,67 @@
+from django.db import migrations
+
+SEARCH_TABLE_SQL = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS "bookmanager_book_search" '
+    "USING fts5(uuid, title, author, description, tokenize = 'trigram')"
+)
+SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS "bookmanager_book_search_insert" AFTER INSERT ON "bookmanager_book" BEGIN
+        INSERT INTO "bookmanager_book_search" ("uuid", "title", "author", "description")
+        VALUES (new."uuid", new."title", new."author", new."description");
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "bookmanager_book_search_update" AFTER UPDATE OF "title", "author", "description"
+    ON "bookmanager_book"
+    WHEN old."title" IS NOT new."title" OR old."author" IS NOT new."author"
+        OR old."description" IS NOT new."description"
+    BEGIN
+        DELETE FROM "bookmanager_book_search" WHERE "bookmanager_book_search" MATCH 'uuid:"' || old."uuid" || '"';
+        INSERT INTO "bookmanager_book_search" ("uuid", "title", "author", "description")
+        VALUES (new."uuid", new."title", new."author", new."description");
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "bookmanager_book_search_delete" AFTER DELETE ON "bookmanager_book" BEGIN
+        DELETE FROM "bookmanager_book_search" WHERE "bookmanager_book_search" MATCH 'uuid:"' || old."uuid" || '"';
+    END
+    """,
+)
+
+
+def create_search_table(apps, schema_editor):
+    """
+    Back book search on SQLite with an FTS5 trigram index over title, author and description, kept
+    in sync with the book table by triggers. The uuid column is indexed too, so that a book's row
+    is found by a MATCH rather than a scan. PostgreSQL has the pg_trgm indexes of 0008 instead.
+    """
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(SEARCH_TABLE_SQL)
+    schema_editor.execute('DELETE FROM "bookmanager_book_search"')
+    schema_editor.execute(
+        'INSERT INTO "bookmanager_book_search" ("uuid", "title", "author", "description") '
+        'SELECT "uuid", "title", "author", "description" FROM "bookmanager_book"'
+    )
+    for sql in SEARCH_TRIGGERS:
+        schema_editor.execute(sql)
+
+
+def drop_search_table(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    for action in ("insert", "update", "delete"):
+        schema_editor.execute(f'DROP TRIGGER IF EXISTS "bookmanager_book_search_{action}"')
+    schema_editor.execute('DROP TABLE IF EXISTS "bookmanager_book_search"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0015_lending_stats"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_table, drop_search_table),
+    ]
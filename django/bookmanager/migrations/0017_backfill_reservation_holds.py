@@ -0,0 +1,49 @@
+import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def hold_available_books(apps, schema_editor):
+    """
+    Hold the books that were already back on the shelf with a reservation queue when holds were
+    introduced (0011) for the head of their queue, as `hand_off` does on every return since. The
+    holds set here are left unnotified, for sweep_reservation_holds to tell their holders about
+    them; those set by `hand_off` were notified when they were set.
+    """
+    RentalLog = apps.get_model("bookmanager", "RentalLog")
+    Reservation = apps.get_model("bookmanager", "Reservation")
+
+    now = timezone.now()
+    Reservation.objects.filter(held_until__isnull=False).update(hold_notified_at=models.F("updated_at"))
+    held_until = now + datetime.timedelta(hours=settings.RESERVATION_HOLD_HOURS)
+    lent_out = RentalLog.objects.filter(returned_at__isnull=True).values("book_id")
+    heads = {}
+    for reservation in (
+        Reservation.objects.exclude(book_id__in=lent_out)
+        .order_by("book_id", "position")
+        .only("uuid", "book_id", "held_until")
+    ):
+        heads.setdefault(reservation.book_id, reservation)
+    reservations = [reservation for reservation in heads.values() if reservation.held_until is None]
+    for reservation in reservations:
+        reservation.held_until = held_until
+        reservation.updated_at = now
+    Reservation.objects.bulk_update(reservations, ["held_until", "updated_at"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0016_book_search_fts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="reservation",
+            name="hold_notified_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(hold_available_books, migrations.RunPython.noop),
+    ]
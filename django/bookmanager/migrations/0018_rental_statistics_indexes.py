@@ -0,0 +1,25 @@
+# Generated by Django 3.2.7 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("bookmanager", "0017_backfill_reservation_holds"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="rentallog",
+            index=models.Index(fields=["created_at"], name="rental_log_created_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="rentallogarchive",
+            index=models.Index(fields=["created_at"], name="rental_archive_created_at_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="rentallogarchive",
+            index=models.Index(fields=["returned_at"], name="rental_archive_returned_at_idx"),
+        ),
+    ]
@@ -1,5 +1,13 @@
 from .book import Book
+from .book_availability import BookAvailability
+from .daily_book_stat import DailyBookStat
+from .daily_tag_stat import DailyTagStat
+from .daily_user_stat import DailyUserStat
+from .rental_history import RentalHistory
 from .rental_log import RentalLog
+from .rental_log_archive import RentalLogArchive
 from .reservation import Reservation
+from .rollup_checkpoint import RollupCheckpoint
 from .tag import Tag
+from .tag_facet import TagFacet
 from .tagging import Tagging
@@ -1,16 +1,45 @@
 from core.models import BaseModelMixin
 
 from django.db import models
+from django.db.models import Exists, OuterRef, Value
 
+from .book_availability import BookAvailability
 from .rental_log import RentalLog
 from .reservation import Reservation
 
 
+class BookQuerySet(models.QuerySet):
+    def with_availability(self, user=None):
+        """
+        Annotate each book with `is_borrowed` and `is_reserved`, and with `borrowed_by_user` and
+        `reserved_by_user` for `user` (a User, its pk or a queryset of users), using EXISTS
+        subqueries so that a whole page of books costs a single statement.
+        """
+        open_rentals = RentalLog.objects.filter(book=OuterRef("pk"), returned_at__isnull=True)
+        reservations = Reservation.objects.filter(book=OuterRef("pk"))
+        if user is None:
+            borrowed_by_user = reserved_by_user = Value(False, output_field=models.BooleanField())
+        else:
+            lookup = "__in" if isinstance(user, models.QuerySet) else ""
+            borrowed_by_user = Exists(open_rentals.filter(**{f"borrower{lookup}": user}))
+            reserved_by_user = Exists(reservations.filter(**{f"user{lookup}": user}))
+        return self.annotate(
+            is_borrowed=Exists(open_rentals),
+            is_reserved=Exists(reservations),
+            borrowed_by_user=borrowed_by_user,
+            reserved_by_user=reserved_by_user,
+        )
+
+
 class Book(BaseModelMixin, models.Model):
     title = models.CharField(max_length=100)
     author = models.CharField(max_length=30, blank=True)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to="book_images", blank=True)
+    # JPEG variant sized for LINE carousels, generated from `image` by bookmanager.services.thumbnails.
+    thumbnail = models.ImageField(upload_to="book_thumbnails", blank=True, editable=False)
+
+    objects = BookQuerySet.as_manager()
 
     def __str__(self):
         return self.title
@@ -18,20 +47,33 @@ class Book(BaseModelMixin, models.Model):
     class Meta:
         verbose_name = "Book"
         verbose_name_plural = "Books"
+        # Keyset pagination order of the LINE carousels.
+        indexes = [models.Index(fields=["title", "uuid"], name="book_title_uuid_idx")]
+
+    @property
+    def current_availability(self):
+        try:
+            return self.availability
+        except BookAvailability.DoesNotExist:
+            self.availability = BookAvailability.objects.rebuild(self)
+            return self.availability
 
     @property
     def can_borrow(self):
-        return RentalLog.objects.filter(book=self, returned_at__isnull=True).count() == 0
+        return not self.current_availability.is_borrowed
 
     @property
     def can_reserve(self):
-        return Reservation.objects.filter(book=self).count() == 0
+        # Anyone may queue for a borrowed or held book; an available one is simply borrowed.
+        availability = self.current_availability
+        return availability.is_borrowed or availability.is_reserved
 
     def is_reserved_by_others(self, user):
-        return Reservation.objects.filter(book=self).exclude(user=user).count() > 0
+        reserver_id = self.current_availability.reserver_id
+        return reserver_id is not None and reserver_id != user.pk
 
     def is_reserved_by_me(self, user):
-        return Reservation.objects.filter(book=self, user=user).count() > 0
+        return self.current_availability.reserver_id == user.pk
 
     def is_borrowed_by_me(self, user):
-        return RentalLog.objects.filter(book=self, borrower=user, returned_at__isnull=True).count() > 0
+        return self.current_availability.borrower_id == user.pk
@@ -0,0 +1,115 @@
+from core.models import BaseModelMixin
+
+from django.db import models, transaction
+
+from .rental_log import RentalLog
+from .reservation import Reservation
+
+
+class BookAvailabilityManager(models.Manager):
+    def compute(self, book_id):
+        """
+        Derive the availability fields of a book from its rental and reservation history.
+        """
+        rental = (
+            RentalLog.objects.filter(book_id=book_id, returned_at__isnull=True)
+            .order_by("-borrowed_at")
+            .values("uuid", "borrower_id")
+            .first()
+        )
+        reservation = Reservation.objects.filter(book_id=book_id).order_by("position").values("user_id").first()
+        return self.model.build_fields(
+            rental_id=rental["uuid"] if rental else None,
+            borrower_id=rental["borrower_id"] if rental else None,
+            reserver_id=reservation["user_id"] if reservation else None,
+        )
+
+    def refresh(self, book_id):
+        """
+        Recompute the availability record of a book inside the current transaction.
+
+        Records are only updated here, never created, so that cascading deletes of a book do not
+        resurrect its availability row. Missing records are created by `Book.current_availability`
+        and the `rebuild_book_availability` command. When the book becomes borrowed or returned,
+        the available counts of its tags' facets are adjusted in the same transaction.
+        """
+        from .tag_facet import TagFacet
+
+        with transaction.atomic():
+            availability = self.select_for_update().filter(book_id=book_id).first()
+            if availability is None:
+                return None
+            # Compare states rather than rental_id, which SET_NULL may already have cleared.
+            was_borrowed = availability.state in self.model.BORROWED_STATES
+            fields = self.compute(book_id)
+            changed = [name for name, value in fields.items() if getattr(availability, name) != value]
+            if changed:
+                for name in changed:
+                    setattr(availability, name, fields[name])
+                availability.save(update_fields=changed + ["updated_at"])
+            is_borrowed = availability.state in self.model.BORROWED_STATES
+            if was_borrowed != is_borrowed:
+                TagFacet.objects.adjust_book(book_id, available_books=-1 if is_borrowed else 1)
+            return availability
+
+    def rebuild(self, book):
+        """
+        Create or overwrite the availability record of a book from its history.
+        """
+        with transaction.atomic():
+            availability, _ = self.update_or_create(book=book, defaults=self.compute(book.pk))
+            return availability
+
+
+class BookAvailability(BaseModelMixin, models.Model):
+    """
+    Denormalized, per-book lending state maintained from RentalLog and Reservation changes.
+    """
+
+    class State(models.TextChoices):
+        AVAILABLE = "available", "Available"
+        BORROWED = "borrowed", "Borrowed"
+        RESERVED = "reserved", "Reserved"
+        BORROWED_AND_RESERVED = "borrowed_and_reserved", "Borrowed and reserved"
+
+    BORROWED_STATES = (State.BORROWED, State.BORROWED_AND_RESERVED)
+
+    book = models.OneToOneField("Book", on_delete=models.CASCADE, related_name="availability")
+    state = models.CharField(max_length=30, choices=State.choices, default=State.AVAILABLE, db_index=True)
+    rental = models.ForeignKey("RentalLog", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    borrower = models.ForeignKey(
+        "account.User", on_delete=models.SET_NULL, null=True, blank=True, related_name="borrowing_availabilities"
+    )
+    reserver = models.ForeignKey(
+        "account.User", on_delete=models.SET_NULL, null=True, blank=True, related_name="reserving_availabilities"
+    )
+
+    objects = BookAvailabilityManager()
+
+    def __str__(self):
+        return f"{self.book_id} {self.state}"
+
+    class Meta:
+        verbose_name = "Book Availability"
+        verbose_name_plural = "Book Availabilities"
+
+    @classmethod
+    def build_fields(cls, rental_id, borrower_id, reserver_id):
+        if rental_id is not None:
+            state = cls.State.BORROWED_AND_RESERVED if reserver_id is not None else cls.State.BORROWED
+        else:
+            state = cls.State.RESERVED if reserver_id is not None else cls.State.AVAILABLE
+        return {
+            "state": state,
+            "rental_id": rental_id,
+            "borrower_id": borrower_id,
+            "reserver_id": reserver_id,
+        }
+
+    @property
+    def is_borrowed(self):
+        return self.rental_id is not None
+
+    @property
+    def is_reserved(self):
+        return self.reserver_id is not None
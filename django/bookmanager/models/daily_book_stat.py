@@ -0,0 +1,30 @@
+from core.models import BaseModelMixin
+
+from django.db import models
+
+
+class DailyBookStat(BaseModelMixin, models.Model):
+    """
+    Lending rollup of one book on one day, maintained by the roll_up_lending_stats command. Loans
+    and queue waits are counted on the day the book was borrowed, returns and loan durations on
+    the day it was returned.
+    """
+
+    date = models.DateField()
+    book = models.ForeignKey("Book", on_delete=models.CASCADE, related_name="+")
+    loans = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    # Total duration of the returned loans, for the average loan duration.
+    loan_seconds = models.PositiveBigIntegerField(default=0)
+    overdue_returns = models.PositiveIntegerField(default=0)
+    # Loans that fulfilled a reservation, and their total time in the reservation queue.
+    reserved_loans = models.PositiveIntegerField(default=0)
+    queue_wait_seconds = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.book_id}"
+
+    class Meta:
+        verbose_name = "Daily Book Stat"
+        verbose_name_plural = "Daily Book Stats"
+        constraints = [models.UniqueConstraint(fields=["date", "book"], name="unique_daily_book_stat")]
@@ -0,0 +1,22 @@
+from core.models import BaseModelMixin
+
+from django.db import models
+
+
+class DailyTagStat(BaseModelMixin, models.Model):
+    """
+    Loans of books with one tag on one day, maintained by the roll_up_lending_stats command. Books
+    are counted under the tags they have when the loan is rolled up.
+    """
+
+    date = models.DateField()
+    tag = models.ForeignKey("Tag", on_delete=models.CASCADE, related_name="+")
+    loans = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.tag_id}"
+
+    class Meta:
+        verbose_name = "Daily Tag Stat"
+        verbose_name_plural = "Daily Tag Stats"
+        constraints = [models.UniqueConstraint(fields=["date", "tag"], name="unique_daily_tag_stat")]
@@ -0,0 +1,23 @@
+from core.models import BaseModelMixin
+
+from django.db import models
+
+
+class DailyUserStat(BaseModelMixin, models.Model):
+    """
+    Lending rollup of one user on one day, maintained by the roll_up_lending_stats command.
+    """
+
+    date = models.DateField()
+    user = models.ForeignKey("account.User", on_delete=models.CASCADE, related_name="+")
+    loans = models.PositiveIntegerField(default=0)
+    returns = models.PositiveIntegerField(default=0)
+    overdue_returns = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.user_id}"
+
+    class Meta:
+        verbose_name = "Daily User Stat"
+        verbose_name_plural = "Daily User Stats"
+        constraints = [models.UniqueConstraint(fields=["date", "user"], name="unique_daily_user_stat")]
@@ -0,0 +1,27 @@
+from django.db import models
+
+
+class RentalHistory(models.Model):
+    """
+    Read-only view over both tiers of the rental history, RentalLog and RentalLogArchive. Use it
+    for admin lists and reporting that should not care where a rental is stored.
+    """
+
+    uuid = models.UUIDField(primary_key=True, editable=False)
+    book = models.ForeignKey("Book", on_delete=models.DO_NOTHING, related_name="+")
+    borrower = models.ForeignKey("account.User", on_delete=models.DO_NOTHING, related_name="+")
+    borrowed_at = models.DateTimeField()
+    returned_at = models.DateTimeField(null=True, blank=True)
+    reserved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived = models.BooleanField()
+
+    def __str__(self):
+        return f"{self.book} {self.borrower} {self.borrowed_at}"
+
+    class Meta:
+        managed = False
+        db_table = "bookmanager_rentalhistory"
+        verbose_name = "Rental History"
+        verbose_name_plural = "Rental History"
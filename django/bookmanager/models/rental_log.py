@@ -12,6 +12,8 @@ class RentalLog(BaseModelMixin, models.Model):
     borrower = models.ForeignKey("account.User", on_delete=models.CASCADE)
     borrowed_at = models.DateTimeField()
     returned_at = models.DateTimeField(null=True, blank=True)
+    # When the rental fulfilled a reservation: when that reservation was made.
+    reserved_at = models.DateTimeField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.book} {self.borrower} {self.borrowed_at}"
@@ -19,3 +21,29 @@ class RentalLog(BaseModelMixin, models.Model):
     class Meta:
         verbose_name = "Rental Log"
         verbose_name_plural = "Rental Logs"
+        indexes = [
+            models.Index(
+                fields=["borrower", "book"],
+                condition=models.Q(returned_at__isnull=True),
+                name="rental_log_open_borrower_idx",
+            ),
+            # Newest-first listing of the whole log, e.g. the admin changelist, which adds the primary
+            # key to the ordering to make it deterministic.
+            models.Index(fields=["-borrowed_at", "-uuid"], name="rental_log_borrowed_at_idx"),
+            # Incremental exports of the rental history.
+            models.Index(fields=["updated_at", "uuid"], name="rental_log_updated_at_idx"),
+            # Loans of a lending statistics window.
+            models.Index(fields=["created_at"], name="rental_log_created_at_idx"),
+            # Oldest closed rentals first, for archive_rental_logs; returns of a statistics window.
+            models.Index(
+                fields=["returned_at"],
+                condition=models.Q(returned_at__isnull=False),
+                name="rental_log_returned_at_idx",
+            ),
+        ]
+        constraints = [
+            # Also serves as the partial index for "is this book lent out" lookups.
+            models.UniqueConstraint(
+                fields=["book"], condition=models.Q(returned_at__isnull=True), name="unique_open_rental"
+            ),
+        ]
@@ -0,0 +1,75 @@
+from django.db import connection, models, transaction
+
+from .rental_log import RentalLog
+
+ARCHIVED_FIELDS = (
+    "uuid",
+    "book_id",
+    "borrower_id",
+    "borrowed_at",
+    "returned_at",
+    "reserved_at",
+    "created_at",
+    "updated_at",
+)
+
+
+class RentalLogArchiveManager(models.Manager):
+    def archive(self, returned_before, batch_size=1000):
+        """
+        Move up to `batch_size` rentals returned before `returned_before` from RentalLog into the
+        archive, in one short transaction. Returns the number of moved rentals.
+
+        Rows are deleted with plain SQL: closed rentals affect neither book availability nor any
+        cache, so the RentalLog delete signals would only cost a query per row. Rows already in
+        the archive (from an interrupted run) are skipped on insert and deleted all the same.
+        """
+        with transaction.atomic():
+            rows = list(
+                RentalLog.objects.filter(returned_at__lt=returned_before)
+                .order_by("returned_at")
+                .values(*ARCHIVED_FIELDS)[:batch_size]
+            )
+            if not rows:
+                return 0
+            self.bulk_create([self.model(**row) for row in rows], batch_size=batch_size, ignore_conflicts=True)
+            moved = RentalLog.objects.filter(
+                uuid__in=[row["uuid"] for row in rows], returned_at__lt=returned_before
+            ).values("uuid")
+            sql, params = moved.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {RentalLog._meta.db_table} WHERE uuid IN ({sql})", params)
+            return len(rows)
+
+
+class RentalLogArchive(models.Model):
+    """
+    Append-only history tier of RentalLog: closed rentals moved out of the live table by the
+    archive_rental_logs command. Rows keep the primary key and timestamps they had in RentalLog.
+    """
+
+    uuid = models.UUIDField(primary_key=True, editable=False)
+    book = models.ForeignKey("Book", on_delete=models.CASCADE, related_name="+")
+    borrower = models.ForeignKey("account.User", on_delete=models.CASCADE, related_name="+")
+    borrowed_at = models.DateTimeField()
+    returned_at = models.DateTimeField()
+    reserved_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = RentalLogArchiveManager()
+
+    def __str__(self):
+        return f"{self.book} {self.borrower} {self.borrowed_at}"
+
+    class Meta:
+        verbose_name = "Rental Log Archive"
+        verbose_name_plural = "Rental Log Archives"
+        indexes = [
+            models.Index(fields=["-borrowed_at", "-uuid"], name="rental_archive_borrowed_at_idx"),
+            models.Index(fields=["updated_at", "uuid"], name="rental_archive_updated_at_idx"),
+            # Loans and returns of a lending statistics window.
+            models.Index(fields=["created_at"], name="rental_archive_created_at_idx"),
+            models.Index(fields=["returned_at"], name="rental_archive_returned_at_idx"),
+        ]
@@ -10,6 +10,22 @@ class Reservation(BaseModelMixin, models.Model):
 
     user = models.ForeignKey("account.User", on_delete=models.CASCADE)
     book = models.ForeignKey("bookmanager.Book", on_delete=models.CASCADE)
+    # Place in the book's FIFO queue; the lowest position is the head. Assigned on first save.
+    position = models.PositiveIntegerField(blank=True)
+    # Set when the book is returned and kept for the head of the queue until this time.
+    held_until = models.DateTimeField(null=True, blank=True)
+    # Set when the holder is told about the hold. Holds set without telling them, such as those of
+    # migration 0017, are notified by sweep_reservation_holds.
+    hold_notified_at = models.DateTimeField(null=True, blank=True)
+
+    def save(self, *args, **kwargs):
+        if self.position is None:
+            # Positions only grow, so the queue stays in arrival order however it is shortened.
+            last_position = Reservation.objects.filter(book_id=self.book_id).aggregate(
+                last_position=models.Max("position")
+            )["last_position"]
+            self.position = (last_position or 0) + 1
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return "{} - {}".format(self.user.name, self.book.title)
@@ -17,4 +33,13 @@ class Reservation(BaseModelMixin, models.Model):
     class Meta:
         verbose_name = "Reservation"
         verbose_name_plural = "Reservations"
-        constraints = [models.UniqueConstraint(fields=["user", "book"], name="unique_reservation")]
+        indexes = [
+            models.Index(
+                fields=["held_until"], condition=models.Q(held_until__isnull=False), name="reservation_hold_idx"
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=["user", "book"], name="unique_reservation"),
+            # Also the index behind the head-of-queue lookup.
+            models.UniqueConstraint(fields=["book", "position"], name="unique_reservation_position"),
+        ]
@@ -0,0 +1,20 @@
+from core.models import BaseModelMixin
+
+from django.db import models
+
+
+class RollupCheckpoint(BaseModelMixin, models.Model):
+    """
+    High-water mark of an incremental rollup: the rows created or returned up to
+    `high_water_mark` have been rolled up. Advanced in the same transaction as the rollup tables.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    high_water_mark = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.name} {self.high_water_mark}"
+
+    class Meta:
+        verbose_name = "Rollup Checkpoint"
+        verbose_name_plural = "Rollup Checkpoints"
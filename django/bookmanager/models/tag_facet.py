@@ -0,0 +1,64 @@
+from core.models import BaseModelMixin
+
+from django.db import models
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .book_availability import BookAvailability
+from .tagging import Tagging
+
+
+class TagFacetManager(models.Manager):
+    def adjust(self, tag_ids, books=0, available_books=0):
+        """
+        Add `books` and `available_books` to the counts of the given tags in a single UPDATE.
+        `tag_ids` may also be a values queryset of tag ids.
+        """
+        if books or available_books:
+            self.filter(tag_id__in=tag_ids).update(
+                book_count=F("book_count") + books,
+                available_book_count=F("available_book_count") + available_books,
+                updated_at=timezone.now(),
+            )
+
+    def adjust_book(self, book_id, available_books):
+        """
+        Apply a change in the availability of one book to the facets of all its tags.
+        """
+        self.adjust(Tagging.objects.filter(book_id=book_id).values("tag_id"), available_books=available_books)
+
+    def compute(self):
+        """
+        Count the total and available books of every tag from Tagging and BookAvailability.
+        Books without an availability record are counted as available.
+        """
+        rows = (
+            Tagging.objects.values("tag_id")
+            .annotate(
+                book_count=Count("book_id"),
+                available_book_count=Count(
+                    "book_id", filter=~Q(book__availability__state__in=BookAvailability.BORROWED_STATES)
+                ),
+            )
+            .values_list("tag_id", "book_count", "available_book_count")
+        )
+        return {tag_id: (book_count, available_book_count) for tag_id, book_count, available_book_count in rows}
+
+
+class TagFacet(BaseModelMixin, models.Model):
+    """
+    Denormalized per-tag book counts maintained from Tagging and BookAvailability changes.
+    """
+
+    tag = models.OneToOneField("Tag", on_delete=models.CASCADE, related_name="facet")
+    book_count = models.PositiveIntegerField(default=0)
+    available_book_count = models.PositiveIntegerField(default=0)
+
+    objects = TagFacetManager()
+
+    def __str__(self):
+        return f"{self.tag_id} {self.available_book_count}/{self.book_count}"
+
+    class Meta:
+        verbose_name = "Tag Facet"
+        verbose_name_plural = "Tag Facets"
@@ -0,0 +1 @@
+from .tag_facet import TagFacetSerializer
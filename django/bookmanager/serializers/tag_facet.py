@@ -0,0 +1,11 @@
+from rest_framework import serializers
+
+from ..models import TagFacet
+
+
+class TagFacetSerializer(serializers.ModelSerializer):
+    name = serializers.CharField(source="tag.name")
+
+    class Meta:
+        model = TagFacet
+        fields = ("name", "book_count", "available_book_count")
@@ -0,0 +1,3 @@
+from .export import EXPORT_FORMATS, EXPORTS, settled_until, stream_export
+from .search import books_tagged, search_books
+from .thumbnails import invalidate_media_urls, media_url, update_book_thumbnail
@@ -0,0 +1,154 @@
+import csv
+import json
+import os
+from collections import Counter, defaultdict
+
+from bookmanager.line import bump_generation
+from bookmanager.models import Book, BookAvailability, Tag, TagFacet, Tagging
+from core.db import insert_rows
+from core.models.uuid import generate_uuid
+
+from django.core.files import File
+from django.db import transaction
+
+from .thumbnails import store_thumbnails
+
+# Tags of a CSV record are one column, separated by this character.
+CSV_TAG_SEPARATOR = "|"
+
+# Existing books are looked up this many titles at a time, to stay within the query parameter
+# limit of SQLite.
+LOOKUP_BATCH_SIZE = 500
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def read_book_records(path):
+    """
+    Yield `(line number, record dict)` from a CSV file with a header line, or a JSON lines file
+    (".jsonl"/".ndjson"). Records have "title" and optionally "author", "description", "tags" (a
+    list, or a "|"-separated string) and "image" (path of a local cover image file). A line that
+    is not valid JSON is yielded as the InvalidRecord describing it, for `clean_record` to raise,
+    so that the rest of the file is still read.
+    """
+    with open(path, encoding="utf-8-sig", newline="") as source:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line_number, line in enumerate(source, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    yield line_number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield line_number, InvalidRecord(f"invalid JSON: {e}")
+        else:
+            # Line 1 is the header.
+            for line_number, record in enumerate(csv.DictReader(source), start=2):
+                yield line_number, record
+
+
+def clean_record(record):
+    """
+    Validate a record against the Book and Tag columns without touching the database. Returns
+    the Book fields, the tag names and the cover image path.
+    """
+    if isinstance(record, InvalidRecord):
+        raise record
+    if not isinstance(record, dict):
+        raise InvalidRecord(f"expected an object, not {type(record).__name__}")
+    fields = {name: record_text(record, name) for name in ("title", "author", "description")}
+    if not fields["title"]:
+        raise InvalidRecord("title is required")
+    for name, value in fields.items():
+        max_length = Book._meta.get_field(name).max_length
+        if max_length and len(value) > max_length:
+            raise InvalidRecord(f"{name} is longer than {max_length} characters")
+
+    tags = record.get("tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(CSV_TAG_SEPARATOR)
+    if not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise InvalidRecord("tags must be a list of strings or a string")
+    tag_max_length = Tag._meta.get_field("name").max_length
+    tag_names = list(dict.fromkeys(tag.strip() for tag in tags if tag and tag.strip()))
+    for tag_name in tag_names:
+        if len(tag_name) > tag_max_length:
+            raise InvalidRecord(f"tag {tag_name!r} is longer than {tag_max_length} characters")
+    return fields, tag_names, record_text(record, "image")
+
+
+def record_text(record, name):
+    value = record.get(name)
+    if value is None:
+        return ""
+    if not isinstance(value, str):
+        raise InvalidRecord(f"{name} must be a string, not {type(value).__name__}")
+    return value.strip()
+
+
+def drop_existing(records):
+    """
+    The cleaned records of a batch whose title and author are not in the catalog yet, so that an
+    import can be run again. Books are looked up by title, through book_title_uuid_idx.
+    """
+    titles = list({fields["title"] for fields, _, _ in records})
+    existing = set()
+    while titles:
+        batch, titles = titles[:LOOKUP_BATCH_SIZE], titles[LOOKUP_BATCH_SIZE:]
+        existing.update(Book.objects.filter(title__in=batch).values_list("title", "author"))
+    return [record for record in records if (record[0]["title"], record[0]["author"]) not in existing]
+
+
+def import_book_batch(records):
+    """
+    Insert a batch of cleaned `(fields, tag names, image path)` records in one transaction, with
+    a constant number of statements per batch. Bulk inserts send no signals, so the availability
+    records and tag facets they would maintain are written here too, and the carousels are
+    invalidated once the batch commits. Returns the created books' `(uuid, image path)` pairs that
+    have a cover to attach.
+    """
+    books = [dict(fields, uuid=generate_uuid()) for fields, _, _ in records]
+    tag_names = {tag_name for _, names, _ in records for tag_name in names}
+    with transaction.atomic():
+        insert_rows(Book, books)
+        insert_rows(BookAvailability, [{"book_id": book["uuid"]} for book in books])
+
+        tag_ids = {}
+        if tag_names:
+            # One upsert for the whole batch; existing tags are left alone and read back by name.
+            Tag.objects.bulk_create([Tag(name=name) for name in tag_names], ignore_conflicts=True)
+            tag_ids = dict(Tag.objects.filter(name__in=tag_names).values_list("name", "uuid"))
+            TagFacet.objects.bulk_create(
+                [TagFacet(tag_id=tag_id) for tag_id in tag_ids.values()], ignore_conflicts=True
+            )
+
+        # The books are new, so every tagging is new and every book is available.
+        taggings = [
+            {"book_id": book["uuid"], "tag_id": tag_ids[tag_name]}
+            for book, (_, names, _) in zip(books, records)
+            for tag_name in names
+        ]
+        insert_rows(Tagging, taggings)
+        tags_by_count = defaultdict(list)
+        for tag_id, count in Counter(tagging["tag_id"] for tagging in taggings).items():
+            tags_by_count[count].append(tag_id)
+        for count, ids in tags_by_count.items():
+            TagFacet.objects.adjust(ids, books=count, available_books=count)
+
+        transaction.on_commit(bump_generation)
+    return [(book["uuid"], image) for book, (_, _, image) in zip(books, records) if image]
+
+
+def attach_cover(path):
+    """
+    Copy a local cover image into the book image storage and render its thumbnails. Runs in a
+    worker process. Returns the stored image and thumbnail names, or None if the file is missing.
+    """
+    field = Book._meta.get_field("image")
+    try:
+        with open(path, "rb") as source:
+            image = field.storage.save(field.generate_filename(None, os.path.basename(path)), File(source))
+    except OSError:
+        return None
+    return image, store_thumbnails(image)
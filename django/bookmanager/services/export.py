@@ -0,0 +1,106 @@
+import csv
+import datetime
+import io
+import json
+
+from bookmanager.models import Book, RentalHistory, Reservation
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+EXPORT_FORMATS = {"csv": "text/csv", "jsonl": "application/x-ndjson"}
+
+# Export name -> (model, exported fields). Rentals are read through RentalHistory so that archived
+# rentals are included.
+EXPORTS = {
+    "rentals": (
+        RentalHistory,
+        (
+            "uuid",
+            "book_id",
+            "book__title",
+            "borrower_id",
+            "borrower__name",
+            "borrowed_at",
+            "returned_at",
+            "archived",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+    "reservations": (
+        Reservation,
+        (
+            "uuid",
+            "book_id",
+            "book__title",
+            "user_id",
+            "user__name",
+            "position",
+            "held_until",
+            "created_at",
+            "updated_at",
+        ),
+    ),
+    "books": (Book, ("uuid", "title", "author", "description", "image", "thumbnail", "created_at", "updated_at")),
+}
+
+
+def settled_until():
+    """
+    Latest time up to which rows can be exported without missing any: a transaction that has not
+    committed yet may still add rows updated before now. See EXPORT_SETTLE_SECONDS.
+    """
+    return timezone.now() - datetime.timedelta(seconds=settings.EXPORT_SETTLE_SECONDS)
+
+
+def export_rows(name, since=None, until=None, chunk_size=2000):
+    """
+    Yield the field names of the export called `name`, then its rows as tuples, ordered by
+    (updated_at, uuid). With `since`, only rows updated after it are exported (incremental mode);
+    rows are never exported past `until`, nor past `settled_until()`. Deleted rows are not reported.
+
+    Rows are read with a server-side cursor on PostgreSQL, `chunk_size` at a time, so memory use
+    does not grow with the export.
+    """
+    model, fields = EXPORTS[name]
+    settled = settled_until()
+    queryset = model.objects.filter(updated_at__lte=min(until, settled) if until else settled)
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since)
+    yield fields
+    yield from queryset.order_by("updated_at", "uuid").values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def render_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def render_jsonl(rows):
+    rows = iter(rows)
+    fields = next(rows)
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + "\n"
+
+
+def stream_export(name, export_format, since=None, until=None, chunk_size=2000):
+    """
+    Render an export as CSV (with a header line) or JSON lines. Yields strings of about
+    `chunk_size` rows each, so that a streaming response is not written one row at a time.
+    """
+    render = render_csv if export_format == "csv" else render_jsonl
+    lines = []
+    for line in render(export_rows(name, since=since, until=until, chunk_size=chunk_size)):
+        lines.append(line)
+        if len(lines) >= chunk_size:
+            yield "".join(lines)
+            lines = []
+    if lines:
+        yield "".join(lines)
@@ -0,0 +1,308 @@
+import datetime
+import functools
+import random
+import time
+from logging import getLogger
+
+from bookmanager.line import notification_batch, notify_on_commit
+from bookmanager.models import Book, BookAvailability, RentalLog, Reservation
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.utils import timezone
+
+logger = getLogger(__name__)
+
+MAX_BORROWABLE_BOOK_COUNT = 3
+MAX_ATTEMPTS = 3
+
+
+class LendingError(Exception):
+    """
+    A lending request that was refused. The message is meant to be shown to the user.
+    """
+
+
+class BorrowLimitReached(LendingError):
+    def __init__(self):
+        super().__init__(f"最大貸出可能冊数は{MAX_BORROWABLE_BOOK_COUNT}です")
+
+
+class BookBorrowedByUser(LendingError):
+    def __init__(self, book):
+        super().__init__(f"{book.title}はあなたが貸出中です")
+
+
+class BookReservedByUser(LendingError):
+    def __init__(self, book):
+        super().__init__(f"{book.title}はあなたが予約中です")
+
+
+class BookBorrowedByOthers(LendingError):
+    def __init__(self, book):
+        self.book = book
+        super().__init__(f"{book.title}は他の人が貸出中です")
+
+
+class BookReservedByOthers(LendingError):
+    def __init__(self, book):
+        super().__init__(f"{book.title}は他の人が予約中です")
+
+
+class BookAvailableNow(LendingError):
+    def __init__(self, book):
+        super().__init__(f"{book.title}は貸出可能です。予約せずに借りられます")
+
+
+class RentalAlreadyReturned(LendingError):
+    def __init__(self):
+        super().__init__("すでに返却済みです")
+
+
+class RentalNotFound(LendingError):
+    def __init__(self):
+        super().__init__("貸出記録が見つかりません")
+
+
+class ReservationNotFound(LendingError):
+    def __init__(self):
+        super().__init__("予約が見つかりません")
+
+
+def retry_on_conflict(function):
+    """
+    Rerun a lending operation whose transaction lost a race: a violated unique_open_rental, a
+    deadlock, or a locked SQLite database. The rerun reads the winner's rows and usually ends in a
+    LendingError instead. Only retried when not nested in an outer transaction, which the failed
+    statement has already broken.
+    """
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                return function(*args, **kwargs)
+            except (IntegrityError, OperationalError):
+                if connection.in_atomic_block or attempt == MAX_ATTEMPTS:
+                    raise
+                logger.info("Retrying %s after a conflicting transaction", function.__name__)
+                time.sleep(random.uniform(0, 0.02 * attempt))
+
+    return wrapper
+
+
+def begin_write():
+    """
+    SQLite ignores select_for_update, and a transaction that reads before it writes fails with
+    "database is locked" instead of waiting when another writer got in first. Taking the write
+    lock with the first statement makes concurrent lending transactions queue on the busy timeout.
+    """
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"UPDATE {BookAvailability._meta.db_table} SET state = state WHERE 0")
+
+
+def lock_availability(book_id):
+    """
+    Lock and return the availability record of a book, creating it first if it is missing. Every
+    lending operation on a book goes through this lock, so they run one at a time per book.
+    """
+    availability = (
+        BookAvailability.objects.select_for_update(of=("self",)).select_related("book").filter(book_id=book_id).first()
+    )
+    if availability is None:
+        BookAvailability.objects.rebuild(Book.objects.get(uuid=book_id))
+        availability = (
+            BookAvailability.objects.select_for_update(of=("self",)).select_related("book").get(book_id=book_id)
+        )
+    return availability
+
+
+@retry_on_conflict
+def borrow(user_id, book_id):
+    """
+    Lend a book to a user. Returns the new RentalLog and whether it fulfilled the user's own
+    reservation, or raises a LendingError. A book with a reservation queue can only be borrowed by
+    the head of the queue.
+    """
+    with transaction.atomic():
+        begin_write()
+        # The user is locked first so that concurrent borrows of different books cannot both pass
+        # the borrow limit.
+        get_user_model().objects.select_for_update().filter(pk=user_id).values_list("pk").get()
+        availability = lock_availability(book_id)
+        book = availability.book
+        if (
+            RentalLog.objects.filter(borrower_id=user_id, returned_at__isnull=True).count()
+            >= MAX_BORROWABLE_BOOK_COUNT
+        ):
+            raise BorrowLimitReached()
+        if availability.is_borrowed:
+            if availability.borrower_id == user_id:
+                raise BookBorrowedByUser(book)
+            if Reservation.objects.filter(book_id=book_id, user_id=user_id).exists():
+                raise BookReservedByUser(book)
+            raise BookBorrowedByOthers(book)
+        reserved = availability.reserver_id == user_id
+        if availability.is_reserved and not reserved:
+            raise BookReservedByOthers(book)
+        reserved_at = None
+        if reserved:
+            reservation = Reservation.objects.get(book_id=book_id, user_id=user_id)
+            reserved_at = reservation.created_at
+            reservation.delete()
+        rental = RentalLog.objects.create(
+            book=book, borrower_id=user_id, borrowed_at=timezone.now(), reserved_at=reserved_at
+        )
+        return rental, reserved
+
+
+@retry_on_conflict
+def return_book(user_id, rental_id):
+    """
+    Return a rental of the user. Returns the RentalLog, or raises a LendingError.
+    """
+    book_id = RentalLog.objects.filter(uuid=rental_id, borrower_id=user_id).values_list("book_id", flat=True).first()
+    if book_id is None:
+        raise RentalNotFound()
+    with transaction.atomic():
+        begin_write()
+        lock_availability(book_id)
+        rental = RentalLog.objects.select_for_update(of=("self",)).select_related("book").get(uuid=rental_id)
+        if rental.returned_at is not None:
+            raise RentalAlreadyReturned()
+        rental.returned_at = timezone.now()
+        rental.save(update_fields=["returned_at", "updated_at"])
+        hand_off(rental.book)
+        return rental
+
+
+@retry_on_conflict
+def reserve(user_id, book_id):
+    """
+    Add a user to the end of a book's reservation queue. Returns the Reservation and the user's
+    place in the queue (1 for the head), or raises a LendingError.
+    """
+    with transaction.atomic():
+        begin_write()
+        availability = lock_availability(book_id)
+        book = availability.book
+        if availability.borrower_id == user_id:
+            raise BookBorrowedByUser(book)
+        if not availability.is_borrowed and not availability.is_reserved:
+            raise BookAvailableNow(book)
+        queue = Reservation.objects.filter(book_id=book_id)
+        if queue.filter(user_id=user_id).exists():
+            raise BookReservedByUser(book)
+        reservation = Reservation.objects.create(book=book, user_id=user_id)
+        return reservation, queue.count()
+
+
+@retry_on_conflict
+def cancel_reservation(user_id, reservation_id):
+    """
+    Cancel a reservation of the user. Returns the deleted Reservation, or raises a LendingError.
+    """
+    book_id = (
+        Reservation.objects.filter(uuid=reservation_id, user_id=user_id).values_list("book_id", flat=True).first()
+    )
+    if book_id is None:
+        raise ReservationNotFound()
+    with transaction.atomic():
+        begin_write()
+        lock_availability(book_id)
+        reservation = Reservation.objects.select_related("book").filter(uuid=reservation_id).first()
+        if reservation is None:
+            raise ReservationNotFound()
+        reservation.delete()
+        if reservation.held_until is not None:
+            hand_off(reservation.book)
+        return reservation
+
+
+def hand_off(book, now=None):
+    """
+    Hold a book that is not lent out for the head of its reservation queue, for
+    RESERVATION_HOLD_HOURS, and notify them once the transaction commits. Does nothing when the
+    book is lent out, the queue is empty, or the head already holds it. Must be called with the
+    book's availability locked.
+    """
+    if RentalLog.objects.filter(book=book, returned_at__isnull=True).exists():
+        return None
+    head = Reservation.objects.filter(book=book).select_related("user").order_by("position").first()
+    if head is None or head.held_until is not None:
+        return None
+    now = now or timezone.now()
+    head.held_until = now + datetime.timedelta(hours=settings.RESERVATION_HOLD_HOURS)
+    head.hold_notified_at = now
+    head.save(update_fields=["held_until", "hold_notified_at", "updated_at"])
+    notify_on_commit([hold_notice(head, book)])
+    return head
+
+
+def hold_notice(reservation, book):
+    held_until = timezone.localtime(reservation.held_until)
+    return reservation.user.line_uid, f"予約していた{book.title}を{held_until:%m/%d %H:%M}まで取り置きしています"
+
+
+@retry_on_conflict
+def notify_holds(now=None, batch_size=100):
+    """
+    Tell up to `batch_size` holders about the holds that were set without telling them, such as
+    those backfilled by migration 0017, once the transaction commits. Returns the number of
+    notified holds.
+    """
+    now = now or timezone.now()
+    with transaction.atomic():
+        begin_write()
+        reservations = list(
+            Reservation.objects.select_for_update(of=("self",))
+            .filter(held_until__gte=now, hold_notified_at__isnull=True)
+            .select_related("user", "book")
+            .order_by("held_until")[:batch_size]
+        )
+        for reservation in reservations:
+            reservation.hold_notified_at = now
+            reservation.updated_at = now
+        Reservation.objects.bulk_update(reservations, ["hold_notified_at", "updated_at"])
+        notify_on_commit([hold_notice(reservation, reservation.book) for reservation in reservations])
+    return len(reservations)
+
+
+@retry_on_conflict
+def expire_holds(now=None, batch_size=100):
+    """
+    Release up to `batch_size` holds that expired before `now`, hand each book to the next user in
+    its queue and notify both. The expired holds are found through the partial held_until index,
+    not by scanning the queues. Returns the number of released holds.
+    """
+    now = now or timezone.now()
+    expired = list(
+        Reservation.objects.filter(held_until__lt=now)
+        .order_by("held_until")
+        .values_list("uuid", "book_id")[:batch_size]
+    )
+    if not expired:
+        return 0
+    released = 0
+    notifications = []
+    # The hand-off notices join the release notices in one batch.
+    with transaction.atomic(), notification_batch():
+        begin_write()
+        for reservation_id, book_id in expired:
+            availability = lock_availability(book_id)
+            # Re-read under the lock: the user may have borrowed or cancelled in the meantime.
+            reservation = (
+                Reservation.objects.filter(uuid=reservation_id, held_until__lt=now).select_related("user").first()
+            )
+            if reservation is None:
+                continue
+            reservation.delete()
+            released += 1
+            notifications.append(
+                (reservation.user.line_uid, f"取り置き期限が過ぎたため{availability.book.title}の予約を取り消しました")
+            )
+            hand_off(availability.book, now=now)
+        notify_on_commit(notifications)
+    return released
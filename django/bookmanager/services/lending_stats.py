@@ -0,0 +1,218 @@
+import datetime
+from collections import Counter, defaultdict
+
+from bookmanager.models import DailyBookStat, DailyTagStat, DailyUserStat, RentalHistory, RollupCheckpoint, Tagging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
+
+CHECKPOINT_NAME = "lending_stats"
+
+# Rollup rows are read and written this many keys at a time, to stay within the query parameter
+# limit of SQLite.
+ROLLUP_BATCH_SIZE = 500
+
+
+def add_to_rollup(model, key_field, increments):
+    """
+    Add `increments`, a dict of `(date, key)` -> Counter of field increments, to the daily rollup
+    `model`, whose rows are identified by date and `key_field`. Existing rows are updated and
+    missing ones created, with a few statements per batch of keys.
+    """
+    keys_by_date = defaultdict(list)
+    for date, key in increments:
+        keys_by_date[date].append(key)
+    fields = sorted({name for counter in increments.values() for name in counter})
+    now = timezone.now()
+    changed, created = [], []
+    for date, keys in keys_by_date.items():
+        while keys:
+            batch, keys = keys[:ROLLUP_BATCH_SIZE], keys[ROLLUP_BATCH_SIZE:]
+            rows = {
+                getattr(row, key_field): row for row in model.objects.filter(date=date, **{f"{key_field}__in": batch})
+            }
+            for key in batch:
+                row = rows.get(key)
+                if row is None:
+                    created.append(
+                        {"date": date, key_field: key, **{name: increments[date, key][name] for name in fields}}
+                    )
+                    continue
+                for name, value in increments[date, key].items():
+                    setattr(row, name, getattr(row, name) + value)
+                row.updated_at = now
+                changed.append(row)
+    model.objects.bulk_create([model(**row) for row in created], batch_size=ROLLUP_BATCH_SIZE)
+    if changed:
+        model.objects.bulk_update(changed, fields + ["updated_at"], batch_size=ROLLUP_BATCH_SIZE)
+
+
+def roll_up_window(start, end):
+    """
+    Roll up the loans and returns recorded in (`start`, `end`]. A loan is recorded when its rental
+    is created, and a return when the rental is closed, or when it is created already closed
+    (imported or backdated). Both are dated by when they happened, borrowed_at and returned_at,
+    and counted once however often the rental is edited later. Both tiers of the rental history
+    are read, through their created_at and returned_at indexes. Returns the number of rentals
+    rolled up.
+    """
+    fields = ("book_id", "borrower_id", "borrowed_at", "returned_at", "reserved_at", "created_at")
+    created = RentalHistory.objects.filter(created_at__gt=start, created_at__lte=end).values_list(*fields)
+    returned = RentalHistory.objects.filter(
+        returned_at__gt=start, returned_at__lte=end, created_at__lte=start
+    ).values_list(*fields)
+    loan_period = datetime.timedelta(days=settings.LOAN_PERIOD_DAYS)
+    books, users = defaultdict(Counter), defaultdict(Counter)
+    loans = Counter()
+    count = 0
+    for rentals in (created, returned):
+        for book_id, borrower_id, borrowed_at, returned_at, reserved_at, created_at in rentals.iterator(
+            chunk_size=2000
+        ):
+            count += 1
+            if created_at > start:
+                date = timezone.localdate(borrowed_at)
+                books[date, book_id]["loans"] += 1
+                users[date, borrower_id]["loans"] += 1
+                loans[date, book_id] += 1
+                if reserved_at is not None:
+                    books[date, book_id]["reserved_loans"] += 1
+                    books[date, book_id]["queue_wait_seconds"] += int((borrowed_at - reserved_at).total_seconds())
+            # A rental returned after `end` is left for the window its return falls in.
+            if returned_at is not None and returned_at <= end:
+                date = timezone.localdate(returned_at)
+                books[date, book_id]["returns"] += 1
+                books[date, book_id]["loan_seconds"] += int((returned_at - borrowed_at).total_seconds())
+                users[date, borrower_id]["returns"] += 1
+                if returned_at - borrowed_at > loan_period:
+                    books[date, book_id]["overdue_returns"] += 1
+                    users[date, borrower_id]["overdue_returns"] += 1
+
+    tags = defaultdict(Counter)
+    book_ids = list({book_id for _, book_id in loans})
+    tag_ids = defaultdict(list)
+    while book_ids:
+        batch, book_ids = book_ids[:ROLLUP_BATCH_SIZE], book_ids[ROLLUP_BATCH_SIZE:]
+        for book_id, tag_id in Tagging.objects.filter(book_id__in=batch).values_list("book_id", "tag_id"):
+            tag_ids[book_id].append(tag_id)
+    for (date, book_id), loan_count in loans.items():
+        for tag_id in tag_ids[book_id]:
+            tags[date, tag_id]["loans"] += loan_count
+
+    add_to_rollup(DailyBookStat, "book_id", books)
+    add_to_rollup(DailyUserStat, "user_id", users)
+    add_to_rollup(DailyTagStat, "tag_id", tags)
+    return count
+
+
+def roll_up(until=None, window=datetime.timedelta(days=1)):
+    """
+    Roll up the loans and returns recorded since the high-water mark, one transaction per `window`
+    of time, advancing the mark with each. Those recorded in the last LENDING_STATS_SETTLE_SECONDS,
+    or after `until`, are left for a later run. Returns the new mark, None while there are no
+    rentals, and the number of rentals rolled up.
+    """
+    settled = timezone.now() - datetime.timedelta(seconds=settings.LENDING_STATS_SETTLE_SECONDS)
+    until = min(until, settled) if until else settled
+    count = 0
+    while True:
+        with transaction.atomic():
+            checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=CHECKPOINT_NAME)
+            start = checkpoint.high_water_mark
+            if start is None:
+                # First run: start before the oldest rental, which was created before any was returned.
+                first = RentalHistory.objects.aggregate(first=Min("created_at"))["first"]
+                if first is None:
+                    return None, count
+                start = first - datetime.timedelta(microseconds=1)
+            end = min(until, start + window)
+            if end <= start:
+                return start, count
+            count += roll_up_window(start, end)
+            checkpoint.high_water_mark = end
+            checkpoint.save(update_fields=["high_water_mark", "updated_at"])
+
+
+def high_water_mark():
+    """
+    Time up to which rentals have been rolled up, or None before the first roll_up.
+    """
+    return RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).values_list("high_water_mark", flat=True).first()
+
+
+def reset_rollups():
+    """
+    Delete the rollups and their high-water mark, so that the next roll_up starts over from the
+    oldest rental.
+    """
+    with transaction.atomic():
+        for model in (DailyBookStat, DailyUserStat, DailyTagStat):
+            model.objects.all().delete()
+        RollupCheckpoint.objects.filter(name=CHECKPOINT_NAME).delete()
+
+
+def lending_summary(since, until):
+    """
+    Lending totals of the days from `since` to `until`, inclusive, read from the rollups only.
+    Average durations are in seconds, or None without any loans to average.
+    """
+    totals = DailyBookStat.objects.filter(date__range=(since, until)).aggregate(
+        loans=Sum("loans"),
+        returns=Sum("returns"),
+        loan_seconds=Sum("loan_seconds"),
+        overdue_returns=Sum("overdue_returns"),
+        reserved_loans=Sum("reserved_loans"),
+        queue_wait_seconds=Sum("queue_wait_seconds"),
+    )
+    totals = {name: value or 0 for name, value in totals.items()}
+    totals["average_loan_seconds"] = totals["loan_seconds"] / totals["returns"] if totals["returns"] else None
+    totals["average_queue_wait_seconds"] = (
+        totals["queue_wait_seconds"] / totals["reserved_loans"] if totals["reserved_loans"] else None
+    )
+    return totals
+
+
+def daily_loans(since, until):
+    """
+    `(date, loans, returns)` of each day from `since` to `until` that had any, oldest first.
+    """
+    return list(
+        DailyBookStat.objects.filter(date__range=(since, until))
+        .values("date")
+        .annotate(loans=Sum("loans"), returns=Sum("returns"))
+        .order_by("date")
+        .values_list("date", "loans", "returns")
+    )
+
+
+def ranking(model, relation, label, since, until, field="loans", limit=10):
+    """
+    The `limit` objects of a daily rollup's `relation` with the highest sum of `field` from
+    `since` to `until`, as `(label, sum)` pairs, where `label` is a field of the related object.
+    """
+    return list(
+        model.objects.filter(date__range=(since, until))
+        .values(f"{relation}_id", f"{relation}__{label}")
+        .annotate(total=Sum(field))
+        .filter(total__gt=0)
+        .order_by("-total", f"{relation}__{label}")
+        .values_list(f"{relation}__{label}", "total")[:limit]
+    )
+
+
+def popular_books(since, until, limit=10):
+    return ranking(DailyBookStat, "book", "title", since, until, limit=limit)
+
+
+def popular_tags(since, until, limit=10):
+    return ranking(DailyTagStat, "tag", "name", since, until, limit=limit)
+
+
+def active_borrowers(since, until, limit=10):
+    return ranking(DailyUserStat, "user", "name", since, until, limit=limit)
+
+
+def overdue_borrowers(since, until, limit=10):
+    return ranking(DailyUserStat, "user", "name", since, until, field="overdue_returns", limit=limit)
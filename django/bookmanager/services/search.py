@@ -0,0 +1,130 @@
+import time
+from contextlib import contextmanager, nullcontext
+from logging import getLogger
+
+from bookmanager.models import Book
+
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+logger = getLogger(__name__)
+
+
+# SQLite serves book search from an FTS5 trigram index over title, author and description, created
+# by migration 0016 and kept in sync with the book table by these triggers, which post_migrate
+# recreates. Migration 0016 keeps its own copy of them.
+SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS "bookmanager_book_search_insert" AFTER INSERT ON "bookmanager_book" BEGIN
+        INSERT INTO "bookmanager_book_search" ("uuid", "title", "author", "description")
+        VALUES (new."uuid", new."title", new."author", new."description");
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "bookmanager_book_search_update" AFTER UPDATE OF "title", "author", "description"
+    ON "bookmanager_book"
+    WHEN old."title" IS NOT new."title" OR old."author" IS NOT new."author"
+        OR old."description" IS NOT new."description"
+    BEGIN
+        DELETE FROM "bookmanager_book_search" WHERE "bookmanager_book_search" MATCH 'uuid:"' || old."uuid" || '"';
+        INSERT INTO "bookmanager_book_search" ("uuid", "title", "author", "description")
+        VALUES (new."uuid", new."title", new."author", new."description");
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS "bookmanager_book_search_delete" AFTER DELETE ON "bookmanager_book" BEGIN
+        DELETE FROM "bookmanager_book_search" WHERE "bookmanager_book_search" MATCH 'uuid:"' || old."uuid" || '"';
+    END
+    """,
+)
+
+# A trigram index can only look up queries of at least this many characters.
+MIN_INDEXED_QUERY_LENGTH = 3
+
+
+def create_search_triggers(using="default", **kwargs):
+    """
+    Recreate the triggers of the SQLite search index, which SQLite drops along with the book table
+    whenever a migration remakes it. Connected to post_migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'bookmanager_book_search'")
+        if cursor.fetchone() is None:
+            return
+        for sql in SEARCH_TRIGGERS:
+            cursor.execute(sql)
+
+
+@contextmanager
+def sqlite_timeout(connection, timeout_ms):
+    """
+    Interrupt the statements run on the SQLite `connection` after `timeout_ms`, like PostgreSQL's
+    statement_timeout: the interrupted statement raises OperationalError.
+    """
+    deadline = time.monotonic() + timeout_ms / 1000
+    connection.ensure_connection()
+    connection.connection.set_progress_handler(lambda: time.monotonic() > deadline, 10_000)
+    try:
+        yield
+    finally:
+        connection.connection.set_progress_handler(None, 0)
+
+
+def search_books(query, limit=10):
+    """
+    Return the uuids of up to `limit` books whose title, author or description contains `query`,
+    title matches first.
+
+    On PostgreSQL this is served by the pg_trgm GIN indexes on the three columns and bounded by a
+    statement timeout. On SQLite queries of three characters or more are looked up in the FTS5
+    trigram index, and shorter ones scan the books. Either way the search gives up after
+    BOOK_SEARCH_TIMEOUT_MS and returns what it has found.
+    """
+    # The query is matched as typed, like the indexed text: normalizing only one side (e.g. NFKC of
+    # full-width letters) would make a full-width title unfindable by its own spelling.
+    query = query.strip()
+    if not query:
+        return []
+    timeout_ms = settings.BOOK_SEARCH_TIMEOUT_MS
+    if connection.vendor == "sqlite" and len(query) >= MIN_INDEXED_QUERY_LENGTH:
+        phrase = '"{}"'.format(query.replace('"', '""'))
+        books = Book.objects.filter(
+            uuid__in=RawSQL(
+                'SELECT "uuid" FROM "bookmanager_book_search" WHERE "bookmanager_book_search" MATCH %s', [phrase]
+            )
+        )
+    else:
+        books = Book.objects.all()
+    # Title matches come first, so the other columns are only searched when there are too few. Titles
+    # are short and read in order from book_title_uuid_idx, which keeps short queries off the scan
+    # of every description whenever enough titles match.
+    matches = [
+        books.filter(title__icontains=query),
+        books.exclude(title__icontains=query).filter(Q(author__icontains=query) | Q(description__icontains=query)),
+    ]
+    found = []
+    try:
+        with transaction.atomic():
+            timeout = nullcontext()
+            if connection.vendor == "postgresql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL statement_timeout = %s", [timeout_ms])
+            elif connection.vendor == "sqlite":
+                timeout = sqlite_timeout(connection, timeout_ms)
+            with timeout:
+                for queryset in matches:
+                    remaining = limit - len(found)
+                    if remaining > 0:
+                        found += queryset.order_by("title", "uuid").values_list("uuid", flat=True)[:remaining]
+    except OperationalError:
+        logger.warning("Book search for %r exceeded its latency budget", query)
+    return found
+
+
+def books_tagged(name):
+    return Book.objects.filter(tagging__tag__name=name)
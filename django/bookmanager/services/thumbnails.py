@@ -0,0 +1,120 @@
+import hashlib
+import io
+import threading
+from logging import getLogger
+
+from bookmanager.line import bump_generation
+from bookmanager.models import Book
+from cachetools import LRUCache
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+logger = getLogger(__name__)
+
+THUMBNAIL_DIRECTORY = "book_thumbnails"
+# LINE only accepts JPEG and PNG thumbnails; the WebP variant is for web clients.
+THUMBNAIL_FORMATS = (("JPEG", "jpg"), ("WEBP", "webp"))
+
+_media_urls = LRUCache(maxsize=settings.MEDIA_URL_CACHE_SIZE)
+_media_urls_lock = threading.Lock()
+
+
+def render_thumbnails(source, max_size=None, quality=None):
+    """
+    Render the JPEG and WebP variants of an image file object, fitted within `max_size` pixels.
+    Returns a dict mapping each file extension to the encoded bytes.
+    """
+    max_size = max_size or settings.BOOK_THUMBNAIL_MAX_SIZE
+    quality = quality or settings.BOOK_THUMBNAIL_QUALITY
+    with Image.open(source) as image:
+        image.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+        variants = {}
+        for image_format, extension in THUMBNAIL_FORMATS:
+            buffer = io.BytesIO()
+            options = {"progressive": True, "optimize": True} if image_format == "JPEG" else {"method": 4}
+            image.save(buffer, image_format, quality=quality, **options)
+            variants[extension] = buffer.getvalue()
+        return variants
+
+
+def thumbnail_name(variants):
+    """
+    Content-hashed base name shared by all variants, so identical covers are stored once and a
+    changed cover never reuses a cached URL.
+    """
+    digest = hashlib.sha256(variants["jpg"]).hexdigest()[:20]
+    return f"{THUMBNAIL_DIRECTORY}/{digest}"
+
+
+def store_thumbnails(image_name):
+    """
+    Render and store the variants of a stored book image. Returns the name of the JPEG variant,
+    or an empty string when the image is missing or not an image.
+    """
+    storage = Book._meta.get_field("thumbnail").storage
+    try:
+        with Book._meta.get_field("image").storage.open(image_name) as source:
+            variants = render_thumbnails(source)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+        logger.warning("Could not render thumbnails of %s", image_name, exc_info=True)
+        return ""
+    base_name = thumbnail_name(variants)
+    for extension, content in variants.items():
+        name = f"{base_name}.{extension}"
+        if not storage.exists(name):
+            storage.save(name, ContentFile(content))
+    return f"{base_name}.jpg"
+
+
+def webp_thumbnail_name(thumbnail):
+    return thumbnail.rsplit(".", 1)[0] + ".webp" if thumbnail else ""
+
+
+def update_book_thumbnail(book):
+    """
+    Regenerate the thumbnail of a book from its current image. Saved with an UPDATE so that
+    post_save handlers are not re-triggered, which is why the cached carousels, whose columns show
+    the thumbnail, are invalidated here.
+    """
+    thumbnail = store_thumbnails(book.image.name) if book.image else ""
+    if thumbnail != book.thumbnail:
+        invalidate_media_urls(book.thumbnail.name)
+        book.thumbnail = thumbnail
+        Book.objects.filter(pk=book.pk).update(thumbnail=thumbnail, updated_at=timezone.now())
+        transaction.on_commit(bump_generation)
+    return thumbnail
+
+
+def media_url(name):
+    """
+    Absolute public URL of a stored file, memoized by file name so that carousels do not call
+    the storage backend per column. Entries are dropped by `invalidate_media_urls` when a book's
+    image changes.
+    """
+    with _media_urls_lock:
+        url = _media_urls.get(name)
+    if url is None:
+        url = settings.PUBLIC_BASE_URL + Book._meta.get_field("image").storage.url(name)
+        with _media_urls_lock:
+            _media_urls[name] = url
+    return url
+
+
+def invalidate_media_urls(*names):
+    with _media_urls_lock:
+        for name in names:
+            _media_urls.pop(name, None)
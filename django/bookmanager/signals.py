@@ -0,0 +1,114 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .line import bump_generation
+from .models import Book, BookAvailability, RentalLog, Reservation, Tag, TagFacet, Tagging
+from .services import invalidate_media_urls, update_book_thumbnail
+from .services.search import create_search_triggers
+
+
+@receiver(post_save, sender=Book)
+def create_book_availability(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        BookAvailability.objects.get_or_create(book=instance)
+
+
+@receiver(pre_save, sender=Book)
+def remember_previous_image(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._previous_images = Book.objects.filter(pk=instance.pk).values_list("image", "thumbnail").first()
+
+
+@receiver(post_save, sender=Book)
+def generate_book_thumbnail(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous_images = None if created else getattr(instance, "_previous_images", None)
+    image_changed = previous_images is not None and previous_images[0] != instance.image.name
+    if image_changed:
+        invalidate_media_urls(*previous_images)
+    if image_changed or bool(instance.image) != bool(instance.thumbnail):
+        transaction.on_commit(lambda: update_book_thumbnail(instance))
+
+
+@receiver(post_delete, sender=Book)
+def forget_book_media_urls(sender, instance, **kwargs):
+    invalidate_media_urls(instance.image.name, instance.thumbnail.name)
+
+
+@receiver(pre_save, sender=RentalLog)
+@receiver(pre_save, sender=Reservation)
+def remember_previous_book(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or instance._state.adding or (update_fields is not None and "book" not in update_fields):
+        return
+    instance._previous_book_id = sender.objects.filter(pk=instance.pk).values_list("book_id", flat=True).first()
+
+
+@receiver(post_save, sender=RentalLog)
+@receiver(post_delete, sender=RentalLog)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def refresh_book_availability(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # A rental or reservation moved to another book (e.g. in the admin) also changes the old book.
+    previous_book_id = instance.__dict__.pop("_previous_book_id", None)
+    if previous_book_id is not None and previous_book_id != instance.book_id:
+        BookAvailability.objects.refresh(previous_book_id)
+    BookAvailability.objects.refresh(instance.book_id)
+
+
+@receiver(post_save, sender=Tag)
+def create_tag_facet(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        TagFacet.objects.get_or_create(tag=instance)
+
+
+def is_book_available(book_id):
+    return not BookAvailability.objects.filter(book_id=book_id, state__in=BookAvailability.BORROWED_STATES).exists()
+
+
+def count_tagging(tag_id, book_id, sign):
+    TagFacet.objects.adjust([tag_id], books=sign, available_books=sign if is_book_available(book_id) else 0)
+
+
+@receiver(pre_save, sender=Tagging)
+def remember_previous_tagging(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    instance._previous_tagging = Tagging.objects.filter(pk=instance.pk).values_list("tag_id", "book_id").first()
+
+
+@receiver(post_save, sender=Tagging)
+def update_tag_facet_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else getattr(instance, "_previous_tagging", None)
+    if previous == (instance.tag_id, instance.book_id):
+        return
+    if previous is not None:
+        count_tagging(*previous, sign=-1)
+    count_tagging(instance.tag_id, instance.book_id, sign=1)
+
+
+# pre_delete rather than post_delete: when a book is deleted, its availability record is removed
+# in the same cascade, and all pre_delete signals are sent before anything is deleted.
+@receiver(pre_delete, sender=Tagging)
+def update_tag_facet_on_delete(sender, instance, **kwargs):
+    count_tagging(instance.tag_id, instance.book_id, sign=-1)
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=RentalLog)
+@receiver(post_delete, sender=RentalLog)
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def invalidate_carousels(sender, raw=False, **kwargs):
+    if not raw:
+        transaction.on_commit(bump_generation)
+
+
+post_migrate.connect(create_search_triggers, dispatch_uid="bookmanager_create_search_triggers")
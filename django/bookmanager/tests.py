@@ -0,0 +1,690 @@
+import io
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from io import StringIO
+from unittest import mock
+
+from account.cache import resolve_line_user
+from account.models import User
+from bookmanager.line import Outbox, notifications
+from bookmanager.line.carousel_cache import get_generation
+from bookmanager.line.client import create_line_bot_api, get_latency_histograms, observe_latency
+from bookmanager.models import Book, BookAvailability, DailyBookStat, RentalLog, Reservation, Tag, Tagging
+from bookmanager.services import lending, lending_stats, search_books
+from bookmanager.services.catalog_import import InvalidRecord, clean_record, read_book_records
+from bookmanager.services.export import export_rows
+from bookmanager.services.thumbnails import update_book_thumbnail
+from bookmanager.views import line_callback
+from linebot.exceptions import LineBotApiError
+from linebot.models import TextSendMessage
+from linebot.models.error import Error
+from PIL import Image
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, modify_settings, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+LINE_UID = "U-carousel-test"
+
+# The test runner turns DEBUG off, which unmounts the toolbar's URLs but not its middleware.
+without_debug_toolbar = modify_settings(MIDDLEWARE={"remove": "debug_toolbar.middleware.DebugToolbarMiddleware"})
+
+
+class CarouselQueryCountTest(TestCase):
+    """
+    The LINE reply templates must run the same number of queries whatever the catalog size. The
+    carousel templates are called unwrapped, past their payload cache.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(name="reader", line_uid=LINE_UID)
+        cls.other = User.objects.create(name="other", line_uid="U-carousel-other")
+        cls.tag = Tag.objects.create(name="novel")
+        cls.books = 0
+
+    def grow_catalog(self, count):
+        """
+        Add `count` books in every state the templates list: available, borrowed by the user,
+        borrowed by someone else, and borrowed by someone else with the user in the queue.
+        """
+        now = timezone.now()
+        for i in range(self.books, self.books + count):
+            book = Book.objects.create(title=f"book {i}", description=f"description {i}")
+            Tagging.objects.create(book=book, tag=self.tag)
+            DailyBookStat.objects.create(date=timezone.localdate(), book=book, loans=i + 1)
+            if i % 4 == 1:
+                RentalLog.objects.create(book=book, borrower=self.user, borrowed_at=now)
+            elif i % 4 >= 2:
+                RentalLog.objects.create(book=book, borrower=self.other, borrowed_at=now)
+            if i % 4 == 3:
+                Reservation.objects.create(book=book, user=self.user)
+        self.books += count
+
+    def templates(self):
+        return {
+            "reserved": lambda: line_callback.reserved_book_template.__wrapped__(LINE_UID),
+            "return": lambda: line_callback.return_book_template.__wrapped__(LINE_UID),
+            "borrow": lambda: line_callback.borrow_book_template.__wrapped__(),
+            "reserve": lambda: line_callback.reserve_book_template.__wrapped__(LINE_UID),
+            "search": lambda: line_callback.search_book_template("book"),
+            "tagged": lambda: line_callback.tagged_book_template("novel"),
+            "tag list": line_callback.tag_list_template,
+            "ranking": line_callback.ranking_template,
+        }
+
+    def count_queries(self):
+        counts = {}
+        for name, build in self.templates().items():
+            # The first call warms the per-process caches (LINE user).
+            build().as_json_dict()
+            with CaptureQueriesContext(connection) as queries:
+                build().as_json_dict()
+            counts[name] = len(queries)
+        return counts
+
+    def test_query_count_does_not_grow_with_the_catalog(self):
+        self.grow_catalog(4)
+        small = self.count_queries()
+        self.grow_catalog(60)
+        # Search may need fewer queries once enough titles match.
+        for name, count in self.count_queries().items():
+            with self.subTest(template=name):
+                self.assertLessEqual(count, small[name])
+
+    def test_book_carousels_project_the_column_fields_in_one_query(self):
+        self.grow_catalog(8)
+        unused = [f'"bookmanager_book"."{column}"' for column in ("author", "created_at", "updated_at")]
+        for name in ("reserved", "return", "borrow", "reserve"):
+            build = self.templates()[name]
+            build()
+            with self.subTest(template=name), CaptureQueriesContext(connection) as queries:
+                build().as_json_dict()
+                books = [query["sql"] for query in queries if '"bookmanager_book"."title"' in query["sql"]]
+                self.assertEqual(len(books), 1)
+                self.assertNotIn("COUNT(", books[0])
+                for column in unused:
+                    self.assertNotIn(column, books[0])
+
+
+class LineUserCacheTest(TestCase):
+    def test_users_are_resolved_once_and_dropped_when_saved(self):
+        user = User.objects.create(name="cached", line_uid="U-cached")
+        with self.assertNumQueries(1):
+            self.assertEqual(resolve_line_user("U-cached"), (user.pk, "U-cached"))
+            self.assertEqual(resolve_line_user("U-cached"), (user.pk, "U-cached"))
+        user.line_uid = "U-renamed"
+        user.save()
+        with self.assertRaises(User.DoesNotExist):
+            resolve_line_user("U-cached")
+        self.assertEqual(resolve_line_user("U-renamed").pk, user.pk)
+
+
+class FakeLineHandler(BaseHTTPRequestHandler):
+    """
+    Answers each request with the next `(status, headers)` of the server's `responses`, recording
+    the path and headers of every request.
+    """
+
+    def do_GET(self):
+        self.answer()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.answer()
+
+    def answer(self):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))
+        status, headers = self.server.responses.pop(0) if self.server.responses else (200, {})
+        body = json.dumps({"message": "fake"} if status >= 400 else {"userId": "U1", "displayName": "u"}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class LineClientRetryTest(SimpleTestCase):
+    """
+    The LINE client retries only the calls that cannot deliver a message twice.
+    """
+
+    def setUp(self):
+        self.server = HTTPServer(("127.0.0.1", 0), FakeLineHandler)
+        self.server.requests, self.server.responses = [], []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        endpoint = f"http://127.0.0.1:{self.server.server_port}"
+        with override_settings(LINE_API_ENDPOINT=endpoint, LINE_API_MAX_RETRIES=2, LINE_API_RETRY_BACKOFF=0):
+            self.api = create_line_bot_api("token")
+
+    def test_reply_is_not_retried_after_a_server_error(self):
+        self.server.responses = [(500, {})]
+        with self.assertRaises(LineBotApiError):
+            self.api.reply_message("reply-token", TextSendMessage(text="hi"))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_rate_limited_reply_is_retried(self):
+        self.server.responses = [(429, {"Retry-After": "0"})]
+        self.api.reply_message("reply-token", TextSendMessage(text="hi"))
+        self.assertEqual(len(self.server.requests), 2)
+
+    def test_push_is_retried_with_the_same_retry_key(self):
+        self.server.responses = [(503, {}), (409, {"X-Line-Accepted-Request-Id": "accepted"})]
+        self.api.push_message("U1", TextSendMessage(text="hi"))
+        keys = [headers.get("X-Line-Retry-Key") for _, _, headers in self.server.requests]
+        self.assertEqual(len(keys), 2)
+        self.assertIsNotNone(keys[0])
+        self.assertEqual(keys[0], keys[1])
+
+    def test_each_push_has_its_own_retry_key(self):
+        self.api.push_message("U1", TextSendMessage(text="hi"))
+        self.api.push_message("U1", TextSendMessage(text="hi"))
+        self.api.reply_message("reply-token", TextSendMessage(text="hi"))
+        keys = [headers.get("X-Line-Retry-Key") for _, _, headers in self.server.requests]
+        self.assertNotEqual(keys[0], keys[1])
+        self.assertIsNone(keys[2])
+
+    def test_get_is_retried_after_a_server_error(self):
+        self.server.responses = [(502, {}), (500, {})]
+        self.assertEqual(self.api.get_profile("U1").display_name, "u")
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_each_attempt_is_timed_per_endpoint(self):
+        label = "GET /v2/bot/profile/{id}"
+        before = get_latency_histograms().get(label, {"count": 0})["count"]
+        self.server.responses = [(502, {})]
+        self.api.get_profile("U" + "0" * 32)
+        histogram = get_latency_histograms()[label]
+        self.assertEqual(histogram["count"] - before, 2)
+        self.assertEqual(sum(histogram["buckets"].values()), histogram["count"])
+
+
+class BookAvailabilityTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice = User.objects.create(name="alice")
+        cls.bob = User.objects.create(name="bob")
+        cls.book = Book.objects.create(title="tracked")
+
+    def assertInSync(self, book):
+        availability = BookAvailability.objects.get(book=book)
+        fields = BookAvailability.objects.compute(book.pk)
+        self.assertEqual({name: getattr(availability, name) for name in fields}, fields)
+        return availability
+
+    def test_record_follows_rentals_and_reservations(self):
+        self.assertEqual(self.assertInSync(self.book).state, BookAvailability.State.AVAILABLE)
+        rental = RentalLog.objects.create(book=self.book, borrower=self.alice, borrowed_at=timezone.now())
+        self.assertEqual(self.assertInSync(self.book).state, BookAvailability.State.BORROWED)
+        reservation = Reservation.objects.create(book=self.book, user=self.bob)
+        self.assertEqual(self.assertInSync(self.book).state, BookAvailability.State.BORROWED_AND_RESERVED)
+        rental.returned_at = timezone.now()
+        rental.save()
+        self.assertEqual(self.assertInSync(self.book).state, BookAvailability.State.RESERVED)
+        reservation.delete()
+        self.assertEqual(self.assertInSync(self.book).state, BookAvailability.State.AVAILABLE)
+
+    def test_moving_a_rental_to_another_book_refreshes_both(self):
+        other = Book.objects.create(title="other")
+        rental = RentalLog.objects.create(book=self.book, borrower=self.alice, borrowed_at=timezone.now())
+        rental.book = other
+        rental.save()
+        self.assertEqual(self.assertInSync(self.book).state, BookAvailability.State.AVAILABLE)
+        self.assertEqual(self.assertInSync(other).rental_id, rental.pk)
+
+    def test_deleting_a_book_deletes_its_record(self):
+        RentalLog.objects.create(book=self.book, borrower=self.alice, borrowed_at=timezone.now())
+        Reservation.objects.create(book=self.book, user=self.bob)
+        self.book.delete()
+        self.assertFalse(BookAvailability.objects.filter(book_id=self.book.pk).exists())
+
+    def test_check_reports_drift_and_rebuild_repairs_it(self):
+        RentalLog.objects.create(book=self.book, borrower=self.alice, borrowed_at=timezone.now())
+        call_command("rebuild_book_availability", "--check", stdout=StringIO())
+        BookAvailability.objects.filter(book=self.book).update(
+            state=BookAvailability.State.AVAILABLE, rental=None, borrower=None
+        )
+        with self.assertRaises(CommandError):
+            call_command("rebuild_book_availability", "--check", stdout=StringIO())
+        call_command("rebuild_book_availability", stdout=StringIO())
+        self.assertEqual(self.assertInSync(self.book).state, BookAvailability.State.BORROWED)
+        call_command("rebuild_book_availability", "--check", stdout=StringIO())
+
+
+class LendingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.alice, cls.bob, cls.carol = (
+            User.objects.create(name=name, line_uid=f"U-{name}") for name in ("alice", "bob", "carol")
+        )
+        cls.book = Book.objects.create(title="only copy")
+
+    def availability(self):
+        return BookAvailability.objects.get(book=self.book)
+
+    def test_borrow_and_return_the_last_copy(self):
+        rental, reserved = lending.borrow(self.alice.pk, self.book.pk)
+        self.assertFalse(reserved)
+        self.assertEqual(self.availability().borrower_id, self.alice.pk)
+        with self.assertRaises(lending.BookBorrowedByOthers):
+            lending.borrow(self.bob.pk, self.book.pk)
+        lending.return_book(self.alice.pk, rental.pk)
+        self.assertEqual(self.availability().state, BookAvailability.State.AVAILABLE)
+        with self.assertRaises(lending.RentalAlreadyReturned):
+            lending.return_book(self.alice.pk, rental.pk)
+        lending.borrow(self.bob.pk, self.book.pk)
+        self.assertEqual(self.availability().borrower_id, self.bob.pk)
+
+    def test_double_borrow_by_the_same_user(self):
+        lending.borrow(self.alice.pk, self.book.pk)
+        with self.assertRaises(lending.BookBorrowedByUser):
+            lending.borrow(self.alice.pk, self.book.pk)
+        self.assertEqual(RentalLog.objects.filter(book=self.book, returned_at__isnull=True).count(), 1)
+
+    def test_return_hands_the_book_to_the_head_of_the_queue(self):
+        rental, _ = lending.borrow(self.alice.pk, self.book.pk)
+        self.assertEqual(lending.reserve(self.bob.pk, self.book.pk)[1], 1)
+        self.assertEqual(lending.reserve(self.carol.pk, self.book.pk)[1], 2)
+        api = RecordingLineBotApi()
+        with mock.patch.object(notifications, "_line_bot_api", api):
+            with self.captureOnCommitCallbacks(execute=True):
+                lending.return_book(self.alice.pk, rental.pk)
+        self.assertEqual([to for to, _ in api.calls], ["U-bob"])
+        self.assertIsNotNone(Reservation.objects.get(user=self.bob).held_until)
+        with self.assertRaises(lending.BookReservedByOthers):
+            lending.borrow(self.carol.pk, self.book.pk)
+        rental, reserved = lending.borrow(self.bob.pk, self.book.pk)
+        self.assertTrue(reserved)
+        self.assertIsNotNone(rental.reserved_at)
+        self.assertFalse(Reservation.objects.filter(user=self.bob).exists())
+        self.assertEqual(self.availability().reserver_id, self.carol.pk)
+
+    def test_cancellation_moves_the_rest_of_the_queue_up(self):
+        # Positions are not renumbered: the queue closes up because it is read in position order.
+        lending.borrow(self.alice.pk, self.book.pk)
+        bob, _ = lending.reserve(self.bob.pk, self.book.pk)
+        lending.reserve(self.carol.pk, self.book.pk)
+        lending.cancel_reservation(self.bob.pk, bob.pk)
+        self.assertEqual(self.availability().reserver_id, self.carol.pk)
+        dave = User.objects.create(name="dave")
+        reservation, place = lending.reserve(dave.pk, self.book.pk)
+        self.assertEqual(place, 2)
+        self.assertGreater(reservation.position, Reservation.objects.get(user=self.carol).position)
+        with self.assertRaises(lending.ReservationNotFound):
+            lending.cancel_reservation(self.bob.pk, bob.pk)
+
+    def test_cancelling_a_hold_hands_the_book_to_the_next_in_the_queue(self):
+        rental, _ = lending.borrow(self.alice.pk, self.book.pk)
+        bob, _ = lending.reserve(self.bob.pk, self.book.pk)
+        lending.reserve(self.carol.pk, self.book.pk)
+        lending.return_book(self.alice.pk, rental.pk)
+        lending.cancel_reservation(self.bob.pk, bob.pk)
+        self.assertIsNotNone(Reservation.objects.get(user=self.carol).held_until)
+
+    def test_expired_holds_are_released_to_the_next_in_the_queue(self):
+        rental, _ = lending.borrow(self.alice.pk, self.book.pk)
+        lending.reserve(self.bob.pk, self.book.pk)
+        lending.reserve(self.carol.pk, self.book.pk)
+        lending.return_book(self.alice.pk, rental.pk)
+        later = timezone.now() + timezone.timedelta(hours=settings.RESERVATION_HOLD_HOURS, minutes=1)
+        self.assertEqual(lending.expire_holds(now=later), 1)
+        self.assertFalse(Reservation.objects.filter(user=self.bob).exists())
+        self.assertIsNotNone(Reservation.objects.get(user=self.carol).held_until)
+        self.assertEqual(self.availability().reserver_id, self.carol.pk)
+
+
+class LendingRaceTest(TransactionTestCase):
+    def test_exactly_one_of_concurrent_borrows_wins(self):
+        users = [User.objects.create(name=f"racer {i}") for i in range(8)]
+        book = Book.objects.create(title="contended")
+        barrier = threading.Barrier(len(users))
+        outcomes = []
+
+        def attempt(user):
+            try:
+                barrier.wait()
+                lending.borrow(user.pk, book.pk)
+                outcomes.append("won")
+            except lending.LendingError as e:
+                outcomes.append(type(e).__name__)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=attempt, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(outcomes), ["BookBorrowedByOthers"] * (len(users) - 1) + ["won"])
+        self.assertEqual(RentalLog.objects.filter(book=book, returned_at__isnull=True).count(), 1)
+
+
+@without_debug_toolbar
+class ChangelistSearchTest(TestCase):
+    def test_search_across_foreign_keys_filters_through_a_subquery(self):
+        admin = User.objects.create_superuser("admin", "password")
+        readers = [User.objects.create(name=f"reader {i}") for i in range(3)]
+        for i, reader in enumerate(readers):
+            RentalLog.objects.create(
+                book=Book.objects.create(title=f"title {i}"), borrower=reader, borrowed_at=timezone.now()
+            )
+        self.client.force_login(admin)
+        for url in ("/admin/bookmanager/rentallog/", "/admin/bookmanager/rentalhistory/"):
+            with self.subTest(url=url), CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, {"q": "reader 1"})
+                self.assertEqual([rental.borrower for rental in response.context["cl"].result_list], [readers[1]])
+                # The matching users are not read into Python and sent back as a list of keys.
+                self.assertFalse(any(readers[1].pk.hex in query["sql"] for query in queries))
+            response = self.client.get(url, {"q": "title 2"})
+            self.assertEqual([rental.borrower for rental in response.context["cl"].result_list], [readers[2]])
+
+
+class BookThumbnailTest(TestCase):
+    def test_new_thumbnail_invalidates_the_cached_carousels(self):
+        image = io.BytesIO()
+        Image.new("RGB", (40, 60), "red").save(image, "PNG")
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            book = Book.objects.create(title="covered", image=SimpleUploadedFile("cover.png", image.getvalue()))
+            generation = get_generation()
+            with self.captureOnCommitCallbacks(execute=True):
+                thumbnail = update_book_thumbnail(book)
+            self.assertTrue(thumbnail)
+            self.assertEqual(Book.objects.get(pk=book.pk).thumbnail.name, thumbnail)
+            self.assertNotEqual(get_generation(), generation)
+
+            # An unchanged thumbnail leaves the carousels cached.
+            generation = get_generation()
+            with self.captureOnCommitCallbacks(execute=True):
+                update_book_thumbnail(book)
+            self.assertEqual(get_generation(), generation)
+
+
+@without_debug_toolbar
+class TagAdminTest(TestCase):
+    def test_tags_without_a_facet_are_listed_with_no_books(self):
+        tagged = Tag.objects.create(name="tagged")
+        Tagging.objects.create(book=Book.objects.create(title="book"), tag=tagged)
+        Tag.objects.bulk_create([Tag(name="bulk")])
+        self.client.force_login(User.objects.create_superuser("admin", "password"))
+        response = self.client.get("/admin/bookmanager/tag/")
+        self.assertEqual(response.status_code, 200)
+        admin = response.context["cl"].model_admin
+        counts = {
+            tag.name: (admin.book_count(tag), admin.available_book_count(tag))
+            for tag in response.context["cl"].result_list
+        }
+        self.assertEqual(counts, {"tagged": (1, 1), "bulk": (0, 0)})
+
+
+class HotPathIndexTest(TestCase):
+    def test_a_book_has_at_most_one_open_rental(self):
+        book = Book.objects.create(title="one copy")
+        alice, bob = User.objects.create(name="alice"), User.objects.create(name="bob")
+        RentalLog.objects.create(book=book, borrower=alice, borrowed_at=timezone.now(), returned_at=timezone.now())
+        RentalLog.objects.create(book=book, borrower=alice, borrowed_at=timezone.now())
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            RentalLog.objects.create(book=book, borrower=bob, borrowed_at=timezone.now())
+
+    def test_hot_paths_use_the_indexes_declared_for_them(self):
+        out = StringIO()
+        call_command("explain_hot_paths", stdout=out)
+        self.assertNotIn("NG", out.getvalue())
+
+
+class BookSearchTest(TestCase):
+    def test_search_follows_inserts_updates_and_deletes(self):
+        django = Book.objects.create(title="Django入門", author="山田", description="Webアプリケーションの作り方")
+        flask = Book.objects.create(title="Flask", description="djangoと比べる")
+        self.assertEqual(search_books("DJANGO"), [django.uuid, flask.uuid])
+        self.assertEqual(search_books("入門"), [django.uuid])
+        self.assertEqual(search_books("アプリケーション"), [django.uuid])
+
+        django.title = "Python入門"
+        django.save()
+        self.assertEqual(search_books("django"), [flask.uuid])
+        self.assertEqual(search_books("python"), [django.uuid])
+
+        flask.delete()
+        pyramid = Book.objects.create(title="Pyramid", description="Django以外")
+        self.assertEqual(search_books("django"), [pyramid.uuid])
+        self.assertEqual(search_books("flask"), [])
+
+    def test_query_and_text_are_compared_as_written(self):
+        full_width = Book.objects.create(title="ＤＪＡＮＧＯ実践")
+        half_width = Book.objects.create(title="DJANGO実践")
+        for query in ("ＤＪＡＮＧＯ", "ＤＪ"):
+            with self.subTest(query=query):
+                self.assertEqual(search_books(query), [full_width.uuid])
+        for query in ("DJANGO", "DJ"):
+            with self.subTest(query=query):
+                self.assertEqual(search_books(query), [half_width.uuid])
+
+
+class RecordingLineBotApi:
+    def __init__(self, fail=False):
+        self.calls = []
+        self.fail = fail
+
+    def push_message(self, to, messages):
+        self.calls.append((to, [message.text for message in messages]))
+        if self.fail:
+            raise LineBotApiError(500, {}, error=Error(message="Internal server error"))
+
+    def multicast(self, to, messages):
+        self.push_message(tuple(to), messages)
+
+    def reply_message(self, reply_token, messages):
+        self.push_message(reply_token, messages)
+
+
+class NotificationBatchTest(TestCase):
+    def test_notifications_of_a_transaction_go_out_together(self):
+        api = RecordingLineBotApi()
+        with mock.patch.object(notifications, "_line_bot_api", api):
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic(), notifications.notification_batch():
+                    notifications.notify_on_commit([("U1", "held a"), ("U2", "cancelled")])
+                    notifications.notify_on_commit([("U1", "held b"), ("U3", "cancelled")])
+        self.assertEqual(api.calls, [("U1", ["held a", "held b"]), (("U2", "U3"), ["cancelled"])])
+
+    def test_notifications_of_a_rolled_back_block_are_not_sent(self):
+        api = RecordingLineBotApi()
+        with mock.patch.object(notifications, "_line_bot_api", api):
+            with self.captureOnCommitCallbacks(execute=True):
+                notifications.notify_on_commit([("U1", "kept")])
+                try:
+                    with transaction.atomic(), notifications.notification_batch():
+                        notifications.notify_on_commit([("U2", "rolled back")])
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                with transaction.atomic():
+                    notifications.notify_on_commit([("U3", "rolled back")])
+                    transaction.set_rollback(True)
+        self.assertEqual(api.calls, [("U1", ["kept"])])
+
+    def test_delivery_errors_are_logged(self):
+        api = RecordingLineBotApi(fail=True)
+        with self.assertLogs("bookmanager.line.notifications", "WARNING"):
+            notifications.send_notifications([("U1", "a"), ("U2", "b")], line_bot_api=api)
+        self.assertEqual(len(api.calls), 2)
+
+
+@without_debug_toolbar
+class LineMetricsTest(TestCase):
+    def metrics(self):
+        response = self.client.get("/metrics/line/")
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_batched_requests_are_counted(self):
+        self.client.force_login(User.objects.create_superuser("admin", "password"))
+        before = self.metrics()["requests"]
+        outbox = Outbox(RecordingLineBotApi(), reply_token="token", user_id="U1")
+        with outbox.collect():
+            outbox.reply([TextSendMessage(text="a"), TextSendMessage(text="b")])
+            outbox.push("U2", TextSendMessage(text="c"))
+        after = self.metrics()["requests"]
+        for name, added in {"replies": 1, "pushes": 1, "messages": 3}.items():
+            with self.subTest(name):
+                self.assertEqual(after.get(name, 0) - before.get(name, 0), added)
+
+    def test_latency_histograms_are_reported(self):
+        self.client.force_login(User.objects.create_superuser("admin", "password"))
+        observe_latency("POST /v2/bot/message/metrics-test", 30)
+        histogram = self.metrics()["latency"]["POST /v2/bot/message/metrics-test"]
+        self.assertGreaterEqual(histogram["count"], 1)
+        self.assertGreaterEqual(histogram["buckets"]["50"], 1)
+
+    def test_metrics_are_for_admins_only(self):
+        self.client.force_login(User.objects.create(name="reader"))
+        self.assertEqual(self.client.get("/metrics/line/").status_code, 403)
+
+
+class HoldNoticeTest(TestCase):
+    def test_sweep_notifies_holds_set_without_a_notice_once(self):
+        user = User.objects.create(name="reader", line_uid="U1")
+        book = Book.objects.create(title="held")
+        reservation = Reservation.objects.create(
+            book=book, user=user, held_until=timezone.now() + timezone.timedelta(hours=1)
+        )
+        api = RecordingLineBotApi()
+        with mock.patch.object(notifications, "_line_bot_api", api):
+            for _ in range(2):
+                with self.captureOnCommitCallbacks(execute=True):
+                    call_command("sweep_reservation_holds", verbosity=0)
+        self.assertEqual([to for to, _ in api.calls], ["U1"])
+        self.assertIn("held", api.calls[0][1][0])
+        reservation.refresh_from_db()
+        self.assertIsNotNone(reservation.hold_notified_at)
+
+
+class ExportTest(TestCase):
+    @override_settings(EXPORT_SETTLE_SECONDS=60)
+    def test_rows_updated_within_the_settle_window_are_left_for_the_next_export(self):
+        settled = Book.objects.create(title="settled")
+        Book.objects.filter(pk=settled.pk).update(updated_at=timezone.now() - timezone.timedelta(minutes=5))
+        Book.objects.create(title="in flight")
+        rows = list(export_rows("books"))[1:]
+        self.assertEqual([row[1] for row in rows], ["settled"])
+        self.assertEqual(list(export_rows("books", until=timezone.now() + timezone.timedelta(hours=1)))[1:], rows)
+
+
+class CatalogImportTest(SimpleTestCase):
+    def test_malformed_json_lines_are_invalid_records(self):
+        lines = [
+            '{"title": "ok", "tags": ["a"]}',
+            '{"title": ',
+            "[1, 2]",
+            '{"title": 42}',
+            '{"title": "t", "tags": [1]}',
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as source:
+            source.write("\n".join(lines))
+            source.flush()
+            records = list(read_book_records(source.name))
+        self.assertEqual(clean_record(records[0][1]), ({"title": "ok", "author": "", "description": ""}, ["a"], ""))
+        for line_number, record in records[1:]:
+            with self.subTest(line=line_number), self.assertRaises(InvalidRecord):
+                clean_record(record)
+
+
+class ImportBooksTest(TestCase):
+    def test_import_inserts_books_with_their_tags_and_availability(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as source:
+            source.write("title,author,description,tags,image\n")
+            source.write("First,A,,novel|short,\n")
+            source.write("Second,B,,novel,\n")
+            source.write(",no title,,,\n")
+            source.flush()
+            stderr = StringIO()
+            call_command("import_books", source.name, workers=1, stdout=StringIO(), stderr=stderr)
+            self.assertIn("Line 4", stderr.getvalue())
+            call_command("import_books", source.name, "--skip-existing", workers=1, stdout=StringIO(), stderr=stderr)
+        books = Book.objects.order_by("title")
+        self.assertEqual([book.title for book in books], ["First", "Second"])
+        self.assertEqual(BookAvailability.objects.filter(book__in=books).count(), 2)
+        self.assertEqual(
+            sorted(Tagging.objects.values_list("book__title", "tag__name")),
+            [("First", "novel"), ("First", "short"), ("Second", "novel")],
+        )
+        self.assertEqual(Tag.objects.get(name="novel").facet.book_count, 2)
+        self.assertIsNotNone(books[0].created_at)
+
+
+@override_settings(LENDING_STATS_SETTLE_SECONDS=0)
+class LendingStatsRollupTest(TestCase):
+    """
+    Every loan and return is counted once, in the window it was recorded in, however the rental is
+    edited afterwards.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(name="reader")
+        cls.book = Book.objects.create(title="book")
+
+    def rent(self, borrowed_days_ago, returned_days_ago=None, created_days_ago=0):
+        now = timezone.now()
+        days = timezone.timedelta(days=1)
+        rental = RentalLog.objects.create(
+            book=Book.objects.create(title="rented"),
+            borrower=self.user,
+            borrowed_at=now - borrowed_days_ago * days,
+            returned_at=None if returned_days_ago is None else now - returned_days_ago * days,
+        )
+        RentalLog.objects.filter(pk=rental.pk).update(created_at=now - created_days_ago * days)
+        return rental
+
+    def totals(self):
+        today = timezone.localdate()
+        summary = lending_stats.lending_summary(today - timezone.timedelta(days=60), today)
+        return summary["loans"], summary["returns"]
+
+    def test_rebuild_counts_rentals_returned_after_their_loan_window(self):
+        for _ in range(5):
+            rental = self.rent(borrowed_days_ago=35, created_days_ago=35)
+            RentalLog.objects.filter(pk=rental.pk).update(
+                returned_at=timezone.now() - timezone.timedelta(days=20),
+                updated_at=timezone.now() - timezone.timedelta(days=20),
+            )
+        lending_stats.roll_up()
+        self.assertEqual(self.totals(), (5, 5))
+        lending_stats.reset_rollups()
+        lending_stats.roll_up()
+        self.assertEqual(self.totals(), (5, 5))
+
+    def test_return_after_the_loan_was_rolled_up(self):
+        rental = self.rent(borrowed_days_ago=3, created_days_ago=3)
+        lending_stats.roll_up()
+        self.assertEqual(self.totals(), (1, 0))
+        RentalLog.objects.filter(pk=rental.pk).update(returned_at=timezone.now(), updated_at=timezone.now())
+        lending_stats.roll_up()
+        self.assertEqual(self.totals(), (1, 1))
+        # A later edit of the rental is not counted again.
+        RentalLog.objects.filter(pk=rental.pk).update(updated_at=timezone.now())
+        lending_stats.roll_up()
+        self.assertEqual(self.totals(), (1, 1))
+
+    def test_backfilled_rentals_are_counted_when_they_are_inserted(self):
+        self.rent(borrowed_days_ago=2, created_days_ago=2)
+        lending_stats.roll_up()
+        for _ in range(5):
+            self.rent(borrowed_days_ago=30, returned_days_ago=20)
+        lending_stats.roll_up()
+        self.assertEqual(self.totals(), (6, 5))
+        twenty_days_ago = timezone.localdate() - timezone.timedelta(days=20)
+        self.assertEqual(lending_stats.lending_summary(twenty_days_ago, twenty_days_ago)["returns"], 5)
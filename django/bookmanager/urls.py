@@ -1,7 +1,11 @@
-from bookmanager.views import LineCallbackAPIView
+from bookmanager.views import ExportAPIView, LineCallbackAPIView, TagFacetListAPIView
 
 from django.urls import path
 
 app_name = "bookmanager"
 
-urlpatterns = [path("callback/", LineCallbackAPIView.as_view(), name="callback")]
+urlpatterns = [
+    path("callback/", LineCallbackAPIView.as_view(), name="callback"),
+    path("tags/", TagFacetListAPIView.as_view(), name="tags"),
+    path("exports/<str:export>.<str:export_format>", ExportAPIView.as_view(), name="export"),
+]
@@ -1 +1,4 @@
+from .export import ExportAPIView
 from .line_callback import LineCallbackAPIView
+from .line_metrics import LineMetricsAPIView
+from .tag_facet import TagFacetListAPIView
@@ -0,0 +1,103 @@
+import base64
+import binascii
+import uuid
+
+from bookmanager.models import Book
+from bookmanager.services import media_url
+from linebot.models import CarouselColumn, CarouselTemplate, PostbackAction, TemplateSendMessage, TextSendMessage
+
+from django.conf import settings
+from django.db.models import Q, Subquery
+
+MAX_CAROUSEL_COLUMN_COUNT = 10
+# One column of a paginated carousel is kept for the "次へ" button.
+CAROUSEL_PAGE_SIZE = MAX_CAROUSEL_COLUMN_COUNT - 1
+CAROUSEL_BOOK_FIELDS = ("uuid", "title", "description", "image", "thumbnail")
+NO_IMAGE_PATH = "/media/book_images/unnamed.png"
+NO_IMAGE_URL = settings.PUBLIC_BASE_URL + NO_IMAGE_PATH
+
+
+def fetch_carousel_rows(queryset, book_prefix="", extra_fields=(), limit=MAX_CAROUSEL_COLUMN_COUNT):
+    """
+    Evaluate `queryset` once, projecting only the book columns a CarouselColumn needs.
+
+    `book_prefix` is the lookup path from the queryset's model to Book (e.g. "book__"), so related
+    books are joined in the same statement. Each row is a dict with a nested "book" dict plus the
+    requested `extra_fields` of the queryset's own model.
+    """
+    book_paths = {field: f"{book_prefix}{field}" for field in CAROUSEL_BOOK_FIELDS}
+    rows = queryset.values(*book_paths.values(), *extra_fields)[:limit]
+    return [
+        {
+            "book": {field: row[path] for field, path in book_paths.items()},
+            **{field: row[field] for field in extra_fields},
+        }
+        for row in rows
+    ]
+
+
+def encode_cursor(book_uuid):
+    return base64.urlsafe_b64encode(book_uuid.bytes).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        return None
+
+
+def fetch_book_page(queryset, cursor=None, page_size=CAROUSEL_PAGE_SIZE):
+    """
+    Keyset-paginate a Book queryset in (title, uuid) order, backed by book_title_uuid_idx.
+
+    The opaque cursor only carries the uuid of the last book on the previous page; its title is
+    looked up by a subquery of the same statement, so every page is one bounded index range scan.
+    Returns the carousel rows of the page and the cursor of the next page (None on the last page).
+    """
+    queryset = queryset.order_by("title", "uuid")
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None:
+        after_title = Subquery(Book.objects.filter(uuid=after).values("title")[:1])
+        queryset = queryset.filter(title__gte=after_title).filter(Q(title__gt=after_title) | Q(uuid__gt=after))
+    rows = fetch_carousel_rows(queryset, limit=page_size + 1)
+    if len(rows) > page_size:
+        return rows[:page_size], encode_cursor(rows[page_size - 1]["book"]["uuid"])
+    return rows, None
+
+
+def thumbnail_image_url(book):
+    # Images uploaded before thumbnails existed are linked as-is until backfilled.
+    image = book["thumbnail"] or book["image"]
+    return media_url(image) if image else NO_IMAGE_URL
+
+
+def carousel_column(book, actions):
+    return CarouselColumn(
+        title=book["title"],
+        text=book["description"] if book["description"] else "no description",
+        thumbnail_image_url=thumbnail_image_url(book),
+        actions=actions,
+    )
+
+
+def next_page_column(data):
+    return CarouselColumn(
+        title="次へ",
+        text="続きを表示",
+        thumbnail_image_url=NO_IMAGE_URL,
+        actions=[PostbackAction(label="次へ", display_text="次へ", data=data)],
+    )
+
+
+def carousel_message(alt_text, rows, build_actions, empty_text, next_page_data=None):
+    """
+    Build the carousel reply for already fetched rows, or a text reply when there are none.
+    With `next_page_data`, a trailing "次へ" column posts it back to request the next page.
+    """
+    if not rows:
+        return TextSendMessage(text=empty_text)
+    columns = [carousel_column(row["book"], build_actions(row)) for row in rows]
+    if next_page_data is not None:
+        columns.append(next_page_column(next_page_data))
+    return TemplateSendMessage(alt_text=alt_text, template=CarouselTemplate(columns=columns))
@@ -0,0 +1,41 @@
+from bookmanager.services import EXPORT_FORMATS, EXPORTS, settled_until, stream_export
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from django.http import Http404, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+class ExportAPIView(APIView):
+    """
+    Staff-only streaming export of rentals, reservations or books, e.g. `/exports/rentals.csv`.
+    `?since=<ISO 8601>` limits it to rows updated after that time; the `X-Export-Until` header of
+    the response is the `since` of the next incremental export.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, export, export_format):
+        if export not in EXPORTS or export_format not in EXPORT_FORMATS:
+            raise Http404
+        since = request.query_params.get("since")
+        if since:
+            since = parse_datetime(since.replace(" ", "+"))
+            if since is None:
+                return Response({"since": "Invalid ISO 8601 time."}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        until = settled_until()
+
+        response = StreamingHttpResponse(
+            stream_export(export, export_format, since=since or None, until=until),
+            content_type=f"{EXPORT_FORMATS[export_format]}; charset=utf-8",
+        )
+        response["Content-Disposition"] = f'attachment; filename="{export}-{until:%Y%m%dT%H%M%S}.{export_format}"'
+        response["X-Export-Until"] = until.isoformat()
+        # Keep nginx from buffering the whole export before sending it on.
+        response["X-Accel-Buffering"] = "no"
+        return response
@@ -1,17 +1,21 @@
+import datetime
 import os
 import urllib
 from logging import getLogger
 
-from bookmanager.models import Book, RentalLog, Reservation
-from linebot import LineBotApi, WebhookHandler
+from account.cache import resolve_line_user
+from bookmanager.line import EventDispatcher, cached_carousel, create_line_bot_api, get_current_outbox
+from bookmanager.models import Book, RentalLog, Reservation, TagFacet
+from bookmanager.services import books_tagged, lending, lending_stats, search_books
+from linebot import WebhookHandler
 from linebot.exceptions import InvalidSignatureError
 from linebot.models import AudioMessage as LineAudioMessage
-from linebot.models import CarouselColumn, CarouselTemplate, ConfirmTemplate
+from linebot.models import ConfirmTemplate
 from linebot.models import FileMessage as LineFileMessage
 from linebot.models import FollowEvent
 from linebot.models import ImageMessage as LineImageMessage
 from linebot.models import LocationMessage as LineLocationMessage
-from linebot.models import MessageEvent, PostbackAction, PostbackEvent
+from linebot.models import MessageAction, MessageEvent, PostbackAction, PostbackEvent, QuickReply, QuickReplyButton
 from linebot.models import StickerMessage as LineStickerMessage
 from linebot.models import TemplateSendMessage
 from linebot.models import TextMessage as LineTextMessage
@@ -21,16 +25,25 @@ from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db.models import Q
 from django.utils import timezone
 
+from .carousel import MAX_CAROUSEL_COLUMN_COUNT, carousel_message, fetch_book_page, fetch_carousel_rows
+
 User = get_user_model()
 
 logger = getLogger(__name__)
 
-line_bot_api = LineBotApi(os.getenv("LINE_CHANNEL_ACCESS_TOKEN", ""))
+line_bot_api = create_line_bot_api(os.getenv("LINE_CHANNEL_ACCESS_TOKEN", ""))
 handler = WebhookHandler(os.getenv("LINE_CHANNEL_SECRET", ""))
-MAX_CAROUSEL_COLUMN_COUNT = 10
+dispatcher = EventDispatcher(
+    handler,
+    line_bot_api=line_bot_api,
+    workers=settings.LINE_WEBHOOK_WORKERS,
+    queue_size=settings.LINE_WEBHOOK_QUEUE_SIZE,
+)
 
 
 def get_handler():
@@ -42,20 +55,34 @@ class LineCallbackAPIView(APIView):
         signature = request.META.get("HTTP_X_LINE_SIGNATURE", "")
 
         try:
-            handler.handle(request.body.decode("utf-8"), signature)
+            payload = handler.parser.parse(request.body.decode("utf-8"), signature, as_payload=True)
         except InvalidSignatureError:
             logger.error("Invalid signature. Check your access token/secret.")
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
+        if settings.LINE_WEBHOOK_ASYNC:
+            dispatcher.submit(payload.events, payload.destination)
+        else:
+            for event in payload.events:
+                dispatcher.dispatch(event, payload.destination)
+
         return Response(status=status.HTTP_200_OK)
 
 
 def line_reply(token, messages):
-    line_bot_api.reply_message(token, messages)
+    outbox = get_current_outbox()
+    if outbox is None:
+        line_bot_api.reply_message(token, messages)
+    else:
+        outbox.reply(messages)
 
 
 def line_push(to, messages):
-    line_bot_api.push_message(to, messages)
+    outbox = get_current_outbox()
+    if outbox is None:
+        line_bot_api.push_message(to, messages)
+    else:
+        outbox.push(to, messages)
 
 
 @handler.add(MessageEvent, message=LineTextMessage)
@@ -73,126 +100,175 @@ def handle_text_message(event):
     elif msg == "予約一覧":
         line_push(event.source.user_id, TextSendMessage(text="予約一覧"))
         line_reply(event.reply_token, reserved_book_template(event.source.user_id))
+    elif msg == "タグ":
+        line_reply(event.reply_token, tag_list_template())
+    elif msg == "ランキング":
+        line_reply(event.reply_token, ranking_template())
+    elif msg.startswith(("検索 ", "検索\u3000")):
+        line_reply(event.reply_token, search_book_template(msg[3:]))
+    elif msg.startswith("#") and len(msg) > 1:
+        line_reply(event.reply_token, tagged_book_template(msg[1:]))
     else:
-        line_reply(event.reply_token, TextSendMessage(text="[借りる or 返す or 予約]と入力するとサービスがご利用できます"))
+        line_reply(
+            event.reply_token,
+            TextSendMessage(
+                text="[借りる or 返す or 予約 or 検索 <キーワード> or タグ or #タグ or ランキング]と入力するとサービスがご利用できます"
+            ),
+        )
 
 
+@cached_carousel("reserved")
 def reserved_book_template(line_uid):
-    reserved_books = Reservation.objects.filter(user__line_uid=line_uid)
-    if reserved_books.count() == 0:
-        return TextSendMessage(text="予約されている本はありません")
-    return TemplateSendMessage(
-        alt_text="Reserved Books List",
-        template=CarouselTemplate(
-            columns=[
-                CarouselColumn(
-                    title=x.book.title,
-                    text=x.book.description if x.book.description else "no description",
-                    thumbnail_image_url=os.getenv("NGROK_DOMAIN", "http://localhost")
-                    + (x.book.image.url if x.book.image else "/media/book_images/unnamed.png"),
-                    actions=[
-                        PostbackAction(
-                            label="借りる",
-                            display_text=f"{x.book.title}を借りる",
-                            data=f"action=borrow&book-id={x.book.uuid}",
-                        ),
-                        PostbackAction(
-                            label="キャンセル",
-                            display_text=f"{x.book.title}の予約をキャンセル",
-                            data=f"action=cancelreservation&reservation-id={x.uuid}",
-                        ),
-                    ],
-                )
-                for x in reserved_books
-            ]
-        ),
+    reservations = fetch_carousel_rows(
+        Reservation.objects.filter(user__line_uid=line_uid).order_by("created_at"),
+        book_prefix="book__",
+        extra_fields=("uuid",),
+    )
+    return carousel_message(
+        "Reserved Books List",
+        reservations,
+        lambda x: [
+            PostbackAction(
+                label="借りる",
+                display_text=f"{x['book']['title']}を借りる",
+                data=f"action=borrow&book-id={x['book']['uuid']}",
+            ),
+            PostbackAction(
+                label="キャンセル",
+                display_text=f"{x['book']['title']}の予約をキャンセル",
+                data=f"action=cancelreservation&reservation-id={x['uuid']}",
+            ),
+        ],
+        "予約されている本はありません",
     )
 
 
+@cached_carousel("return")
 def return_book_template(line_uid):
-    borrowing_books = RentalLog.objects.filter(borrower__line_uid=line_uid, returned_at=None)[:MAX_CAROUSEL_COLUMN_COUNT]
-    if borrowing_books.count() == 0:
-        return TextSendMessage(text="貸出中の本はありません")
-    return TemplateSendMessage(
-        alt_text="Borrowing Books List",
-        template=CarouselTemplate(
-            columns=[
-                CarouselColumn(
-                    title=x.book.title,
-                    text=x.book.description if x.book.description else "no description",
-                    thumbnail_image_url=os.getenv("NGROK_DOMAIN", "http://localhost")
-                    + (x.book.image.url if x.book.image else "/media/book_images/unnamed.png"),
-                    actions=[
-                        PostbackAction(
-                            label="返却", display_text=f"{x.book.title}を返却", data=f"action=return&rentallog-id={x.uuid}"
-                        )
-                    ],
-                )
-                for x in borrowing_books
-            ]
-        ),
+    borrowing_books = fetch_carousel_rows(
+        RentalLog.objects.filter(borrower__line_uid=line_uid, returned_at=None).order_by("borrowed_at"),
+        book_prefix="book__",
+        extra_fields=("uuid",),
     )
+    return carousel_message(
+        "Borrowing Books List",
+        borrowing_books,
+        lambda x: [
+            PostbackAction(
+                label="返却",
+                display_text=f"{x['book']['title']}を返却",
+                data=f"action=return&rentallog-id={x['uuid']}",
+            )
+        ],
+        "貸出中の本はありません",
+    )
+
+
+def borrow_action(x):
+    return [
+        PostbackAction(
+            label="借りる",
+            display_text=f"{x['book']['title']}を借りる",
+            data=f"action=borrow&book-id={x['book']['uuid']}",
+        )
+    ]
 
 
-def borrow_book_template():
-    cannot_borrow_book_uuid = (
-        RentalLog.objects.filter(returned_at__isnull=True).values_list("book", flat=True).distinct()
+@cached_carousel("borrow")
+def borrow_book_template(cursor=None):
+    avairable_books, next_cursor = fetch_book_page(
+        Book.objects.with_availability().filter(is_borrowed=False), cursor=cursor
     )
-    avairable_books = Book.objects.exclude(uuid__in=cannot_borrow_book_uuid)[:MAX_CAROUSEL_COLUMN_COUNT]
-    if len(avairable_books) == 0:
-        return TextSendMessage(text="貸出可能な本はありません")
-    return TemplateSendMessage(
-        alt_text="Available Books List",
-        template=CarouselTemplate(
-            columns=[
-                CarouselColumn(
-                    title=x.title,
-                    text=x.description if x.description else "no description",
-                    thumbnail_image_url=os.getenv("NGROK_DOMAIN", "http://localhost")
-                    + (x.image.url if x.image else "/media/book_images/unnamed.png"),
-                    actions=[
-                        PostbackAction(
-                            label="借りる", display_text=f"{x.title}を借りる", data=f"action=borrow&book-id={x.uuid}"
-                        )
-                    ],
-                )
-                for x in avairable_books
-            ]
-        ),
+    return carousel_message(
+        "Available Books List",
+        avairable_books,
+        borrow_action,
+        "貸出可能な本はありません",
+        next_page_data=f"action=page&list=borrow&cursor={next_cursor}" if next_cursor else None,
     )
 
 
-def reserve_book_template(line_uid):
-    user = User.objects.get(line_uid=line_uid)
-    borrowed_by_others_book_uuid = (
-        RentalLog.objects.filter(returned_at__isnull=True)
-        .exclude(borrower=user)
-        .values_list("book", flat=True)
-        .distinct()
+def search_book_template(query):
+    book_uuids = search_books(query, limit=MAX_CAROUSEL_COLUMN_COUNT)
+    rank = {book_uuid: i for i, book_uuid in enumerate(book_uuids)}
+    found_books = sorted(
+        fetch_carousel_rows(Book.objects.filter(uuid__in=book_uuids)), key=lambda x: rank[x["book"]["uuid"]]
     )
-    borrowed_by_others_book = Book.objects.filter(uuid__in=borrowed_by_others_book_uuid)[:MAX_CAROUSEL_COLUMN_COUNT]
-    if len(borrowed_by_others_book) == 0:
-        return TextSendMessage(text="他の人が貸出中の本はありません")
-    return TemplateSendMessage(
-        alt_text="Reserve Book List",
-        template=CarouselTemplate(
-            columns=[
-                CarouselColumn(
-                    title=x.title,
-                    text=x.description if x.description else "no description",
-                    thumbnail_image_url=os.getenv("NGROK_DOMAIN", "http://localhost")
-                    + (x.image.url if x.image else "/media/book_images/unnamed.png"),
-                    actions=[
-                        PostbackAction(
-                            label="予約",
-                            display_text=f"{x.title}を予約",
-                            data=f"action=reserve&line-uid={line_uid}&book-id={x.uuid}",
-                        )
-                    ],
-                )
-                for x in borrowed_by_others_book
-            ]
-        ),
+    return carousel_message(
+        "Search Results", found_books, borrow_action, f"「{query.strip()}」に一致する本はありません"
+    )
+
+
+def tagged_book_template(tag_name, cursor=None):
+    tagged_books, next_cursor = fetch_book_page(books_tagged(tag_name), cursor=cursor)
+    next_page_data = None
+    if next_cursor:
+        next_page_data = urllib.parse.urlencode(
+            {"action": "page", "list": "tag", "tag": tag_name, "cursor": next_cursor}
+        )
+    return carousel_message(
+        f"Books tagged {tag_name}",
+        tagged_books,
+        borrow_action,
+        f"#{tag_name}の本はありません",
+        next_page_data=next_page_data,
+    )
+
+
+def tag_list_template():
+    MAX_LISTED_TAG_COUNT = 30
+    MAX_QUICK_REPLY_COUNT = 13
+    facets = list(
+        TagFacet.objects.filter(book_count__gt=0)
+        .order_by("-available_book_count", "-book_count", "tag__name")
+        .values_list("tag__name", "book_count", "available_book_count")[:MAX_LISTED_TAG_COUNT]
+    )
+    if not facets:
+        return TextSendMessage(text="タグはまだありません")
+    lines = [f"#{name} 貸出可能 {available}/{total}冊" for name, total, available in facets]
+    quick_reply = QuickReply(
+        items=[
+            QuickReplyButton(action=MessageAction(label=f"#{name}"[:20], text=f"#{name}"))
+            for name, _, _ in facets[:MAX_QUICK_REPLY_COUNT]
+        ]
+    )
+    return TextSendMessage(text="\n".join(lines), quick_reply=quick_reply)
+
+
+def ranking_template():
+    MAX_RANKED_BOOK_COUNT = 10
+    # Read from the daily rollups only, which may lag the rental log by a few minutes.
+    until = timezone.localdate()
+    since = until - datetime.timedelta(days=settings.LENDING_RANKING_DAYS - 1)
+    books = lending_stats.popular_books(since, until, limit=MAX_RANKED_BOOK_COUNT)
+    if not books:
+        return TextSendMessage(text="ランキングはまだありません")
+    lines = [f"過去{settings.LENDING_RANKING_DAYS}日間の貸出ランキング"]
+    lines += [f"{rank}. {title} ({loans}回)" for rank, (title, loans) in enumerate(books, start=1)]
+    return TextSendMessage(text="\n".join(lines))
+
+
+@cached_carousel("reserve")
+def reserve_book_template(line_uid, cursor=None):
+    reservable_books, next_cursor = fetch_book_page(
+        # Borrowed books and books held for the head of their queue can be queued for.
+        Book.objects.with_availability(resolve_line_user(line_uid).pk)
+        .filter(Q(is_borrowed=True) | Q(is_reserved=True))
+        .filter(borrowed_by_user=False, reserved_by_user=False),
+        cursor=cursor,
+    )
+    return carousel_message(
+        "Reserve Book List",
+        reservable_books,
+        lambda x: [
+            PostbackAction(
+                label="予約",
+                display_text=f"{x['book']['title']}を予約",
+                data=f"action=reserve&line-uid={line_uid}&book-id={x['book']['uuid']}",
+            )
+        ],
+        "予約できる本はありません",
+        next_page_data=f"action=page&list=reserve&cursor={next_cursor}" if next_cursor else None,
     )
 
 
@@ -219,54 +295,40 @@ def confirm_to_reserve_book_template(book, user):
 
 @handler.add(PostbackEvent)
 def on_postback(event):
-    MAX_BORROWABLE_BOOK_COUNT = 3
     reply_token = event.reply_token
     user_id = event.source.user_id
     postback_data = urllib.parse.parse_qs(event.postback.data)
-    user = User.objects.get(line_uid=user_id)
+    user = resolve_line_user(user_id)
 
-    if postback_data["action"][0] == "return":
-        rentallog = RentalLog.objects.get(uuid=postback_data["rentallog-id"][0])
-        if rentallog.returned_at is not None:
-            line_reply(reply_token, TextSendMessage(text="すでに返却済みです"))
-        else:
-            rentallog.returned_at = timezone.now()
-            rentallog.save()
+    try:
+        if postback_data["action"][0] == "return":
+            rentallog = lending.return_book(user.pk, postback_data["rentallog-id"][0])
             line_reply(reply_token, TextSendMessage(text=f"{rentallog.book.title}を返却しました"))
-    elif postback_data["action"][0] == "borrow":
-        book = Book.objects.get(uuid=postback_data["book-id"][0])
-        if user.borrowing_books_count >= MAX_BORROWABLE_BOOK_COUNT:
-            line_reply(reply_token, TextSendMessage(text=f"最大貸出可能冊数は{MAX_BORROWABLE_BOOK_COUNT}です"))
-            return
-        if book.can_borrow:
-            if book.is_reserved_by_others(user):
-                line_reply(reply_token, TextSendMessage(text=f"{book.title}は他の人が予約中です"))
-            elif book.is_reserved_by_me(user):
-                Reservation.objects.get(book=book, user=user).delete()
-                rentallog = RentalLog.objects.create(book=book, borrower=user, borrowed_at=timezone.now())
-                line_reply(reply_token, TextSendMessage(text=f"予約していた{book.title}を借りました"))
+        elif postback_data["action"][0] == "borrow":
+            rentallog, reserved = lending.borrow(user.pk, postback_data["book-id"][0])
+            if reserved:
+                line_reply(reply_token, TextSendMessage(text=f"予約していた{rentallog.book.title}を借りました"))
             else:
-                rentallog = RentalLog.objects.create(book=book, borrower=user, borrowed_at=timezone.now())
-                line_reply(reply_token, TextSendMessage(text=f"{book.title}を借りました"))
-        else:
-            if book.is_borrowed_by_me(user):
-                line_reply(reply_token, TextSendMessage(text=f"{book.title}はあなたが貸出中です"))
-            elif book.is_reserved_by_me(user):
-                line_reply(reply_token, TextSendMessage(text=f"{book.title}はあなたが予約中です"))
+                line_reply(reply_token, TextSendMessage(text=f"{rentallog.book.title}を借りました"))
+        elif postback_data["action"][0] == "reserve":
+            reservation, place = lending.reserve(user.pk, postback_data["book-id"][0])
+            line_reply(reply_token, TextSendMessage(text=f"{reservation.book.title}を予約しました({place}番目)"))
+        elif postback_data["action"][0] == "cancelreservation":
+            reservation = lending.cancel_reservation(user.pk, postback_data["reservation-id"][0])
+            line_reply(reply_token, TextSendMessage(text=f"{reservation.book.title}の予約をキャンセルしました"))
+        elif postback_data["action"][0] == "page":
+            cursor = postback_data["cursor"][0]
+            if postback_data["list"][0] == "reserve":
+                line_reply(reply_token, reserve_book_template(user_id, cursor=cursor))
+            elif postback_data["list"][0] == "tag":
+                line_reply(reply_token, tagged_book_template(postback_data["tag"][0], cursor=cursor))
             else:
-                line_push(event.source.user_id, TextSendMessage(text=f"{book.title}は他の人が貸出中です"))
-                line_reply(reply_token, confirm_to_reserve_book_template(book, user))
-    elif postback_data["action"][0] == "reserve":
-        book = Book.objects.get(uuid=postback_data["book-id"][0])
-        if book.can_reserve:
-            Reservation.objects.create(book=book, user=user)
-            line_reply(reply_token, TextSendMessage(text=f"{book.title}を予約しました"))
-        else:
-            line_reply(reply_token, TextSendMessage(text=f"{book.title}はすでに予約されています"))
-    elif postback_data["action"][0] == "cancelreservation":
-        reservation = Reservation.objects.get(uuid=postback_data["reservation-id"][0])
-        reservation.delete()
-        line_reply(reply_token, TextSendMessage(text=f"{reservation.book.title}の予約をキャンセルしました"))
+                line_reply(reply_token, borrow_book_template(cursor=cursor))
+    except lending.BookBorrowedByOthers as e:
+        line_push(event.source.user_id, TextSendMessage(text=str(e)))
+        line_reply(reply_token, confirm_to_reserve_book_template(e.book, user))
+    except lending.LendingError as e:
+        line_reply(reply_token, TextSendMessage(text=str(e)))
 
 
 @handler.add(MessageEvent, message=LineImageMessage)
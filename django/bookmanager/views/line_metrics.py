@@ -0,0 +1,16 @@
+from bookmanager.line import get_counters, get_latency_histograms
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+class LineMetricsAPIView(APIView):
+    """
+    Outbound LINE request counters and per-endpoint latency histograms of the process that serves
+    the request.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response({"requests": get_counters(), "latency": get_latency_histograms()})
@@ -0,0 +1,18 @@
+from bookmanager.models import TagFacet
+from bookmanager.serializers import TagFacetSerializer
+from rest_framework.generics import ListAPIView
+
+
+class TagFacetListAPIView(ListAPIView):
+    """
+    Tags with their total and currently available book counts, read from the maintained TagFacet
+    aggregate. `?available=true` leaves out tags without an available book.
+    """
+
+    serializer_class = TagFacetSerializer
+
+    def get_queryset(self):
+        queryset = TagFacet.objects.select_related("tag").order_by("tag__name")
+        if self.request.query_params.get("available") == "true":
+            queryset = queryset.filter(available_book_count__gt=0)
+        return queryset
@@ -115,16 +115,110 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 
+# Uploaded media is served by nginx (see nginx/nginx.conf); Django only builds the URLs unless
+# SERVE_MEDIA routes MEDIA_URL through django.views.static for setups without nginx.
+MEDIA_URL = "/media/"
+MEDIA_ROOT = os.path.join(BASE_DIR, "media/")
+SERVE_MEDIA = os.getenv("DJANGO_SERVE_MEDIA", "False") == "True"
+# Scheme and host that LINE clients fetch carousel images from.
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", os.getenv("NGROK_DOMAIN", "http://localhost")).rstrip("/")
+MEDIA_URL_CACHE_SIZE = int(os.getenv("MEDIA_URL_CACHE_SIZE", 4096))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Primary keys of UuidModelMixin models are time-ordered (UUIDv7) when enabled, random (UUIDv4) otherwise.
+UUID_TIME_ORDERED = os.getenv("UUID_TIME_ORDERED", "False") == "True"
+
+
 # auth user model
 AUTH_USER_MODEL = "account.User"
 
 
+# LINE webhook
+# When enabled, the callback view only verifies and parses the webhook and hands the events to a
+# per-process worker pool. Events of the same user are always handled by the same worker, in order.
+LINE_WEBHOOK_ASYNC = os.getenv("LINE_WEBHOOK_ASYNC", "False") == "True"
+LINE_WEBHOOK_WORKERS = int(os.getenv("LINE_WEBHOOK_WORKERS", 4))
+LINE_WEBHOOK_QUEUE_SIZE = int(os.getenv("LINE_WEBHOOK_QUEUE_SIZE", 100))
+
+# LINE Messaging API client
+# Point LINE_API_ENDPOINT at a local fake server to exercise the client without LINE.
+LINE_API_ENDPOINT = os.getenv("LINE_API_ENDPOINT", "https://api.line.me")
+LINE_API_DATA_ENDPOINT = os.getenv("LINE_API_DATA_ENDPOINT", "https://api-data.line.me")
+LINE_API_CONNECT_TIMEOUT = float(os.getenv("LINE_API_CONNECT_TIMEOUT", 3.05))
+LINE_API_READ_TIMEOUT = float(os.getenv("LINE_API_READ_TIMEOUT", 10))
+LINE_API_POOL_SIZE = int(os.getenv("LINE_API_POOL_SIZE", LINE_WEBHOOK_WORKERS + 1))
+LINE_API_MAX_RETRIES = int(os.getenv("LINE_API_MAX_RETRIES", 2))
+LINE_API_RETRY_BACKOFF = float(os.getenv("LINE_API_RETRY_BACKOFF", 0.5))
+
+
+# LINE user records resolved from webhook events are cached per process for this many seconds. A
+# user saved or deleted in another process may be resolved to its old record until then.
+LINE_USER_CACHE_TTL = int(os.getenv("LINE_USER_CACHE_TTL", 30))
+LINE_USER_CACHE_SIZE = int(os.getenv("LINE_USER_CACHE_SIZE", 1024))
+
+
+# Book search gives up after this many milliseconds.
+BOOK_SEARCH_TIMEOUT_MS = int(os.getenv("BOOK_SEARCH_TIMEOUT_MS", 300))
+
+
+# The default cache is file-based, so it is shared by all uWSGI processes on a host without an
+# external service. Point DJANGO_CACHE_LOCATION at a tmpfs such as /dev/shm to keep it in memory,
+# or DJANGO_CACHE_BACKEND at memcached/redis when running several hosts.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv("DJANGO_CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", "/var/tmp/bookbook_cache"),
+        "OPTIONS": {"MAX_ENTRIES": int(os.getenv("DJANGO_CACHE_MAX_ENTRIES", 10000))},
+    },
+}
+# Carousel payloads are cached until a rental, reservation or book changes; CAROUSEL_CACHE_BACKEND
+# and LOCATION give them a separate cache.
+if os.getenv("CAROUSEL_CACHE_BACKEND"):
+    CACHES["carousels"] = {
+        "BACKEND": os.getenv("CAROUSEL_CACHE_BACKEND"),
+        "LOCATION": os.getenv("CAROUSEL_CACHE_LOCATION", ""),
+    }
+CAROUSEL_CACHE_ALIAS = "carousels" if "carousels" in CACHES else "default"
+CAROUSEL_CACHE_TTL = int(os.getenv("CAROUSEL_CACHE_TTL", 300))
+# Cache used by core.cache.cached unless a decorated function names another alias.
+CACHE_ASIDE_ALIAS = os.getenv("CACHE_ASIDE_ALIAS", "default")
+
+
+# Book cover thumbnails are fitted within this many pixels, which is the largest carousel
+# thumbnail LINE displays.
+BOOK_THUMBNAIL_MAX_SIZE = int(os.getenv("BOOK_THUMBNAIL_MAX_SIZE", 1024))
+BOOK_THUMBNAIL_QUALITY = int(os.getenv("BOOK_THUMBNAIL_QUALITY", 80))
+
+
+# A returned book is held this long for the head of its reservation queue. Expired holds are
+# released by the sweep_reservation_holds command, run periodically (e.g. from cron).
+RESERVATION_HOLD_HOURS = int(os.getenv("RESERVATION_HOLD_HOURS", 48))
+
+
+# Rentals returned more than this many days ago are moved to the archive table by the
+# archive_rental_logs command. RentalHistory reads both tables.
+RENTAL_LOG_ARCHIVE_AFTER_DAYS = int(os.getenv("RENTAL_LOG_ARCHIVE_AFTER_DAYS", 180))
+
+
+# Exports stop at EXPORT_SETTLE_SECONDS ago, so that rows of transactions still in flight, whose
+# updated_at is already in the past, are not skipped by the next incremental export.
+EXPORT_SETTLE_SECONDS = int(os.getenv("EXPORT_SETTLE_SECONDS", 60))
+
+# Lending statistics are rolled up into daily tables by the roll_up_lending_stats command, run
+# periodically (e.g. from cron). Rentals changed in the last LENDING_STATS_SETTLE_SECONDS are left
+# for the next run, so that transactions still in flight are not skipped. Loans kept longer than
+# LOAN_PERIOD_DAYS are counted as overdue.
+LENDING_STATS_SETTLE_SECONDS = int(os.getenv("LENDING_STATS_SETTLE_SECONDS", 60))
+LOAN_PERIOD_DAYS = int(os.getenv("LOAN_PERIOD_DAYS", 14))
+# The LINE "ランキング" command ranks the books borrowed most in this many days.
+LENDING_RANKING_DAYS = int(os.getenv("LENDING_RANKING_DAYS", 30))
+
+
 # Debug toolbar
 DEBUG_TOOLBAR_PANELS = [
     "debug_toolbar.panels.versions.VersionsPanel",
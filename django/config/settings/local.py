@@ -14,14 +14,24 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "password"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        # Transaction-pooling proxies such as PgBouncer cannot keep server-side cursors open across transactions.
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv("DB_POOLER_MODE", "False") == "True",
     }
 }
 
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    # On SQLite's shared in-memory test database, concurrent transactions fail with "database table
+    # is locked" instead of waiting for each other as they do on a file; the lending tests race them.
+    DATABASES["default"]["TEST"] = {"NAME": os.path.join(BASE_DIR, "test_db.sqlite3")}
+
 STATIC_URL = "/static/"
 STATIC_ROOT = os.path.join(BASE_DIR, "static/")
 
-MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
+# MEDIA_URL and MEDIA_ROOT come from base; the development server serves media unless told not to.
+SERVE_MEDIA = os.getenv("DJANGO_SERVE_MEDIA", "True") == "True"
+
 
 def show_toolbar(request):
     return True
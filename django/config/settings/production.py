@@ -14,6 +14,10 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD", "password"),
         "HOST": os.getenv("DB_HOST", "localhost"),
         "PORT": os.getenv("DB_PORT", "5432"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 60)),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        # Transaction-pooling proxies such as PgBouncer cannot keep server-side cursors open across transactions.
+        "DISABLE_SERVER_SIDE_CURSORS": os.getenv("DB_POOLER_MODE", "False") == "True",
     }
 }
 
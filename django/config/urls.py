@@ -13,6 +13,8 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from bookmanager.views import LineMetricsAPIView
+from core.views import CacheMetricsAPIView
 from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
@@ -20,8 +22,11 @@ from django.conf.urls.static import static
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics/cache/", CacheMetricsAPIView.as_view(), name="cache_metrics"),
+    path("metrics/line/", LineMetricsAPIView.as_view(), name="line_metrics"),
 ]
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+if settings.SERVE_MEDIA:
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 
 if settings.DEBUG:
     import debug_toolbar
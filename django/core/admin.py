@@ -0,0 +1,114 @@
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.utils import get_fields_from_path
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.text import smart_split, unescape_string_literal
+
+from .db import estimate_count
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never counts a large table exactly. Up to `exact_count_limit` rows are counted
+    with a COUNT bounded by a LIMIT; beyond that the database's estimate is used, so the last pages
+    of a very large changelist may be empty or cut short.
+    """
+
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        queryset = self.object_list.order_by()
+        limit = self.exact_count_limit + 1
+        count = queryset[:limit].count()
+        if count < limit:
+            return count
+        return max(estimate_count(queryset) or 0, count)
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Foreign key list filter that searches the related objects through the admin's autocomplete
+    view instead of listing all of them in the sidebar. The related model's admin must define
+    `search_fields`. Use it as `list_filter = (("borrower", AutocompleteFilter),)` on an admin
+    derived from `LargeTableAdminMixin`, which adds the widget's media.
+    """
+
+    template = "admin/core/autocomplete_filter.html"
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        self.autocomplete_url = AutocompleteSelect(field, model_admin.admin_site).get_url()
+        self.app_label = field.model._meta.app_label
+        self.model_name = field.model._meta.model_name
+        self.field_name = field.name
+
+    def has_output(self):
+        return True
+
+    def field_choices(self, field, request, model_admin):
+        # Only the selected object is loaded, to label the current value.
+        if self.lookup_val is None:
+            return []
+        try:
+            return [
+                (obj.pk, str(obj))
+                for obj in field.related_model._default_manager.filter(**{field.target_field.name: self.lookup_val})
+            ]
+        except (ValidationError, ValueError):
+            return []
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin defaults for tables too large to count or list in full: an estimated-count
+    paginator, no second COUNT for the unfiltered total, and the media of `AutocompleteFilter`s.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Search fields across a foreign key ("borrower__name") are matched against the related
+        table in a subquery, where a trigram index can serve them, and the rows are filtered
+        through the foreign key index instead of joining every row to test the term. Fields with a
+        lookup prefix ("^", "=", "@") fall back to the default search.
+        """
+        search_fields = self.get_search_fields(request)
+        if not search_term or not search_fields or any(field[0] in "^=@" for field in search_fields):
+            return super().get_search_results(request, queryset, search_term)
+
+        for term in smart_split(search_term):
+            if term.startswith(('"', "'")) and term[0] == term[-1]:
+                term = unescape_string_literal(term)
+            condition = Q()
+            for field_path in search_fields:
+                relation, _, related_path = field_path.partition("__")
+                related_model = self.model._meta.get_field(relation).related_model if related_path else None
+                if related_model is None:
+                    condition |= Q(**{f"{field_path}__icontains": term})
+                else:
+                    keys = related_model._default_manager.filter(**{f"{related_path}__icontains": term})
+                    condition |= Q(**{f"{relation}__in": keys.values("pk")})
+            queryset = queryset.filter(condition)
+        return queryset, False
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, (list, tuple)) and issubclass(list_filter[1], AutocompleteFilter):
+                field = get_fields_from_path(self.model, list_filter[0])[-1]
+                return (
+                    media
+                    + AutocompleteSelect(field, self.admin_site).media
+                    + forms.Media(js=["core/js/autocomplete_filter.js"])
+                )
+        return media
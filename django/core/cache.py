@@ -0,0 +1,131 @@
+import functools
+import hashlib
+import threading
+import time
+from collections import Counter, defaultdict
+from typing import Callable, TypeVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+F = TypeVar("F", bound=Callable)
+
+# Marks a cached None, which Django's cache cannot tell apart from a miss.
+_NONE = ("__cached_none__",)
+
+_metrics = defaultdict(Counter)
+_metrics_lock = threading.Lock()
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def record(name, event, value=1):
+    """
+    Count a cache `event` ("hits", "misses", "waits") of the lookup called `name`.
+    """
+    with _metrics_lock:
+        _metrics[name][event] += value
+
+
+def get_cache_metrics():
+    """
+    Snapshot of the cache lookups of this process: per lookup name, the "hits", "misses" and
+    "waits" (callers that waited for another caller to fill the entry) and the hit ratio.
+    """
+    with _metrics_lock:
+        snapshot = {name: dict(counter) for name, counter in _metrics.items()}
+    for counter in snapshot.values():
+        lookups = counter.get("hits", 0) + counter.get("misses", 0)
+        counter["hit_ratio"] = round(counter.get("hits", 0) / lookups, 3) if lookups else None
+    return snapshot
+
+
+def make_key(prefix, args, kwargs):
+    arguments = ":".join([str(arg) for arg in args] + [f"{key}={value}" for key, value in sorted(kwargs.items())])
+    # Keep keys short and free of characters memcached rejects.
+    if len(arguments) > 64 or not arguments.isprintable() or " " in arguments:
+        arguments = hashlib.sha1(arguments.encode()).hexdigest()
+    return f"{prefix}:{arguments}"
+
+
+def cached(prefix, timeout=60, version=None, alias=None, lock_timeout=10) -> Callable[[F], F]:
+    """
+    Cache-aside decorator: return the cached result of the decorated function for the same
+    arguments, or call it and cache the result for `timeout` seconds.
+
+    - `version` is an int or a callable returning one (e.g. a generation counter); it becomes part
+      of the key, so bumping it invalidates every entry at once. `wrapper.invalidate_all()` does the
+      same with a per-prefix version kept in the cache, `wrapper.invalidate(*args)` drops one entry.
+    - Concurrent misses of the same key are single-flight: threads of this process wait on a lock,
+      other processes on a short-lived `cache.add` marker, and only the first caller computes.
+    - Hits and misses are counted under `prefix` in `get_cache_metrics()`.
+    """
+    alias = alias or settings.CACHE_ASIDE_ALIAS
+    version_key = f"{prefix}:__version__"
+
+    def current_key(cache, args, kwargs):
+        key_version = version() if callable(version) else version
+        namespace = cache.get(version_key)
+        if namespace is None:
+            # A missing namespace (first use or eviction) restarts from the clock, which is ahead of
+            # every namespace handed out before.
+            with _flights_lock:
+                cache.add(version_key, time.time_ns() // 1000, timeout=None)
+                namespace = cache.get(version_key)
+        return make_key(f"{prefix}:{namespace}:{key_version}", args, kwargs)
+
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            cache = caches[alias]
+            key = current_key(cache, args, kwargs)
+            value = cache.get(key)
+            if value is not None:
+                record(prefix, "hits")
+                return None if value == _NONE else value
+
+            with _flights_lock:
+                flight = _flights.setdefault(key, threading.Lock())
+            with flight:
+                value = cache.get(key)
+                if value is None:
+                    value = compute(cache, key, args, kwargs)
+                else:
+                    record(prefix, "waits")
+            with _flights_lock:
+                _flights.pop(key, None)
+            return None if value == _NONE else value
+
+        def compute(cache, key, args, kwargs):
+            lock_key = f"{key}:__lock__"
+            deadline = time.monotonic() + lock_timeout
+            while not cache.add(lock_key, 1, timeout=lock_timeout):
+                # Another process is computing the same entry; wait for it rather than stampede.
+                time.sleep(0.01)
+                value = cache.get(key)
+                if value is not None:
+                    record(prefix, "waits")
+                    return value
+                if time.monotonic() > deadline:
+                    break
+            record(prefix, "misses")
+            try:
+                result = function(*args, **kwargs)
+                value = _NONE if result is None else result
+                cache.set(key, value, timeout)
+            finally:
+                cache.delete(lock_key)
+            return value
+
+        def invalidate(*args, **kwargs):
+            cache = caches[alias]
+            cache.delete(current_key(cache, args, kwargs))
+
+        def invalidate_all():
+            caches[alias].set(version_key, time.time_ns() // 1000, timeout=None)
+
+        wrapper.invalidate = invalidate
+        wrapper.invalidate_all = invalidate_all
+        return wrapper
+
+    return decorator
@@ -0,0 +1,130 @@
+import json
+import re
+
+from django.db import connections, router
+from django.utils import timezone
+
+
+def close_unusable_connections(**kwargs):
+    """
+    Close persistent connections that no longer answer, so the next query reconnects.
+
+    Django 3.2 only drops a persistent connection after a query on it has failed. Databases
+    configured with "CONN_HEALTH_CHECKS" are pinged before they are reused instead, which keeps a
+    restarted database or an idle-timeout on the server from failing the first query of a request.
+    """
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict.get("CONN_HEALTH_CHECKS")
+            and not connection.in_atomic_block
+            and not connection.is_usable()
+        ):
+            connection.close()
+
+
+def estimate_count(queryset):
+    """
+    The database's estimate of the number of rows of `queryset`, or None when it cannot give one
+    cheaply. PostgreSQL answers from the table statistics for an unfiltered queryset and from the
+    planner otherwise; SQLite only for an unfiltered queryset of a table, from the largest rowid.
+    Unmanaged models may be backed by views, which have neither statistics nor rowids.
+    """
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    is_table = queryset.model._meta.managed
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            if not queryset.query.where and is_table:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [table])
+            else:
+                sql, params = queryset.query.sql_with_params()
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                return int(plan[0]["Plan"]["Plan Rows"])
+        elif connection.vendor == "sqlite" and not queryset.query.where and is_table:
+            cursor.execute(f'SELECT MAX(rowid) FROM "{table}"')
+        else:
+            return None
+        row = cursor.fetchone()
+    # reltuples is -1 (or 0 on old versions) before the table was first analyzed.
+    return row[0] if row and row[0] and row[0] > 0 else None
+
+
+def insert_rows(model, rows):
+    """
+    Insert `rows`, dicts of field attname -> value that all have the same keys, into the table of
+    `model` with multi-row INSERTs. Unlike bulk_create no model instances are built, which is most
+    of the cost of inserting many narrow rows. Fields missing from the rows get their default,
+    timestamps are set to now, and no signals are sent.
+    """
+    if not rows:
+        return
+    connection = connections[router.db_for_write(model)]
+    fields = model._meta.local_concrete_fields
+    now = timezone.now()
+    # Values that are the same for every row are prepared once.
+    constants = {}
+    for field in fields:
+        if getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            constants[field.attname] = field.get_db_prep_save(now, connection)
+        elif field.attname not in rows[0] and not callable(field.default):
+            constants[field.attname] = field.get_db_prep_save(field.get_default(), connection)
+
+    sql = "INSERT INTO %s (%s) " % (
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+    )
+    batch_size = connection.ops.bulk_batch_size(fields, rows)
+    with connection.cursor() as cursor:
+        while rows:
+            batch, rows = rows[:batch_size], rows[batch_size:]
+            params = []
+            for row in batch:
+                for field in fields:
+                    if field.attname in constants:
+                        params.append(constants[field.attname])
+                    else:
+                        value = row[field.attname] if field.attname in row else field.get_default()
+                        params.append(field.get_db_prep_save(value, connection))
+            placeholders = connection.ops.bulk_insert_sql(fields, [["%s"] * len(fields)] * len(batch))
+            cursor.execute(sql + placeholders, params)
+
+
+def used_indexes(sql, params=(), using="default"):
+    """
+    Names of the indexes the database plans to use for `sql`. The automatic indexes SQLite creates
+    for table-level unique constraints are reported under the constraint's name.
+    """
+    connection = connections[using]
+    names = set()
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            plans = json.loads(plan) if isinstance(plan, str) else plan
+            while plans:
+                node = plans.pop()
+                node = node.get("Plan", node)
+                if "Index Name" in node:
+                    names.add(node["Index Name"])
+                plans.extend(node.get("Plans", []))
+        elif connection.vendor == "sqlite":
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            for row in cursor.fetchall():
+                match = re.search(r"\bINDEX (\S+)", row[-1])
+                if match:
+                    names.add(match.group(1))
+            for name in [name for name in names if name.startswith("sqlite_autoindex_")]:
+                table = name.replace("sqlite_autoindex_", "", 1).rsplit("_", 1)[0]
+                cursor.execute(f"PRAGMA index_info({connection.ops.quote_name(name)})")
+                columns = [row[2] for row in sorted(cursor.fetchall())]
+                for constraint, info in connection.introspection.get_constraints(cursor, table).items():
+                    if info["unique"] and info["columns"] == columns and not constraint.startswith("__"):
+                        names.discard(name)
+                        names.add(constraint)
+                        break
+        else:
+            raise NotImplementedError(f"Cannot read the query plans of {connection.vendor}")
+    return names
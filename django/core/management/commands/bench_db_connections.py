@@ -0,0 +1,50 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = "Compare the cost of a tiny query on a fresh connection with the same query on a persistent one."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        iterations = options["iterations"]
+
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+
+        def fresh():
+            # What every request paid with CONN_MAX_AGE=0: connect, query, disconnect.
+            connection.close()
+            query()
+
+        def persistent():
+            query()
+
+        def health_checked():
+            # What a request pays with persistent connections and CONN_HEALTH_CHECKS enabled.
+            connection.is_usable()
+            query()
+
+        self.stdout.write(f"{connection.vendor} {connection.settings_dict['NAME']}, {iterations} iterations")
+        for name, func in (("fresh", fresh), ("persistent", persistent), ("health-checked", health_checked)):
+            func()
+            timings = []
+            for _ in range(iterations):
+                started = time.perf_counter()
+                func()
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            self.stdout.write(
+                f"{name:>15}: mean {statistics.mean(timings):.3f} ms, "
+                f"p50 {timings[len(timings) // 2]:.3f} ms, p95 {timings[int(len(timings) * 0.95)]:.3f} ms"
+            )
+        connection.close()
@@ -0,0 +1,77 @@
+import time
+import uuid
+
+from core.models.uuid import uuid7
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+TABLE = "bench_uuid_rental_log"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare insert throughput of uuid4 and uuid7 primary keys on a scratch table shaped like "
+        "bookmanager_rentallog. The table is dropped afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=2_000_000)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--report-every", type=int, default=500_000)
+
+    def handle(self, *args, **options):
+        for name, generate in (("uuid4", uuid.uuid4), ("uuid7", uuid7)):
+            self.stdout.write(f"{name}: inserting {options['rows']} rows")
+            self.create_table()
+            try:
+                self.run(generate, options["rows"], options["batch_size"], options["report_every"])
+                size = self.index_size()
+                if size is not None:
+                    self.stdout.write(f"  primary key index size: {size / 1024 / 1024:.1f} MiB")
+            finally:
+                self.drop_table()
+
+    def create_table(self):
+        uuid_type = "uuid" if connection.vendor == "postgresql" else "char(32)"
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            cursor.execute(
+                f"CREATE TABLE {TABLE} (uuid {uuid_type} PRIMARY KEY, book_id {uuid_type} NOT NULL, "
+                f"borrower_id {uuid_type} NOT NULL, borrowed_at timestamp NOT NULL)"
+            )
+
+    def drop_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+
+    def index_size(self):
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_relation_size(%s)", [f"{TABLE}_pkey"])
+            return cursor.fetchone()[0]
+
+    def run(self, generate, rows, batch_size, report_every):
+        to_db = str if connection.vendor == "postgresql" else (lambda value: value.hex)
+        book_id, borrower_id = to_db(uuid.uuid4()), to_db(uuid.uuid4())
+        borrowed_at = timezone.now().replace(tzinfo=None)
+        sql = f"INSERT INTO {TABLE} (uuid, book_id, borrower_id, borrowed_at) VALUES (%s, %s, %s, %s)"
+
+        inserted, elapsed, window_started, window_rows = 0, 0.0, 0.0, 0
+        while inserted < rows:
+            count = min(batch_size, rows - inserted)
+            batch = [(to_db(generate()), book_id, borrower_id, borrowed_at) for _ in range(count)]
+            started = time.perf_counter()
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.executemany(sql, batch)
+            took = time.perf_counter() - started
+            inserted += count
+            elapsed += took
+            window_started += took
+            window_rows += count
+            if window_rows >= report_every or inserted == rows:
+                self.stdout.write(f"  {inserted:>10} rows: {window_rows / window_started:,.0f} rows/s")
+                window_started, window_rows = 0.0, 0
+        self.stdout.write(f"  total: {rows / elapsed:,.0f} rows/s")
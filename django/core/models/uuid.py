@@ -1,10 +1,36 @@
+import os
+import time
 import uuid
 
+from django.conf import settings
 from django.db import models
 
 
+def uuid7():
+    """
+    Time-ordered UUID (version 7): a 48-bit Unix timestamp in milliseconds followed by random bits.
+
+    Keys generated later sort after earlier ones, so inserts append to the right edge of the
+    primary key index instead of landing on random pages.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def generate_uuid():
+    """
+    Primary key default: uuid7 when settings.UUID_TIME_ORDERED is enabled, uuid4 otherwise.
+    Both are stored in the same column type, so existing uuid4 rows stay valid either way.
+    """
+    if getattr(settings, "UUID_TIME_ORDERED", False):
+        return uuid7()
+    return uuid.uuid4()
+
+
 class UuidModelMixin(models.Model):
     class Meta:
         abstract = True
 
-    uuid = models.UUIDField(default=uuid.uuid4, editable=False, unique=True, primary_key=True)
+    uuid = models.UUIDField(default=generate_uuid, editable=False, unique=True, primary_key=True)
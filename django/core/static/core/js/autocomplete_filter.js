@@ -0,0 +1,16 @@
+'use strict';
+{
+    const $ = django.jQuery;
+
+    // Reload the changelist filtered by the object picked in an AutocompleteFilter.
+    $(document).on('change', 'select.admin-autocomplete[data-lookup-kwarg]', function() {
+        const params = new URLSearchParams(window.location.search);
+        params.delete('p');
+        if (this.value) {
+            params.set(this.dataset.lookupKwarg, this.value);
+        } else {
+            params.delete(this.dataset.lookupKwarg);
+        }
+        window.location.search = params.toString();
+    });
+}
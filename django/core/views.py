@@ -0,0 +1,16 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .cache import get_cache_metrics
+
+
+class CacheMetricsAPIView(APIView):
+    """
+    Cache hit/miss counters of the process that serves the request.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, format=None):
+        return Response(get_cache_metrics())